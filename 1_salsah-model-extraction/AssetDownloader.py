@@ -0,0 +1,308 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urljoin, urlsplit
+from SalsahModelToJson import Converter, selectProjects
+from SalsahClient import SalsahClient
+from SalsahDataExport import DataExporter
+from ResponseCache import ResponseCache
+import argparse
+import hashlib
+import json
+import os
+import requests
+import sys
+import tempfile
+import threading
+import time
+
+# Classes of SALSAH resource types with a file (Still-/MovingImageRepresentation in Converter.fetchResources)
+representationClasses = ("image", "movie")
+
+
+class IncompleteDownloadError(IOError):
+    """Raised when a transfer ended before the whole file was received."""
+
+
+class AssetDownloader:
+    """
+    Downloads the files of the image and movie resources of a SALSAH project into a directory, named like the
+    bitstreams of the data export (DataExporter.assetName).
+
+    The resources are enumerated page by page while a worker pool downloads their files, at most perHost of
+    them from the same host at a time. Every file is streamed in chunks into <name>.part (sha256 computed on the
+    way) and renamed when its size matches the size announced by the server; an interrupted transfer continues
+    from the end of its .part file with a Range request. manifest.json in the directory records url, size and
+    sha256 of every completed file, so a rerun skips them (verify=True checks their sha256 again).
+    """
+
+    chunkSize = 1024 * 1024
+
+    def __init__(self, run: Converter, project: dict, directory: str = "assets", workers: int = 4,
+                 perHost: int = 2, pageSize: int = 100, verify: bool = False):
+        """
+        :param run: converter of the extraction run of the project
+        :param workers: number of files downloaded at the same time
+        :param perHost: maximum number of concurrent downloads from the same host
+        :param pageSize: number of resources fetched per search request
+        :param verify: check the sha256 of completed files against the manifest
+        """
+        self.run = run
+        self.project = project
+        self.directory = directory
+        self.workers = max(1, workers)
+        self.perHost = max(1, perHost)
+        self.pageSize = pageSize
+        self.verify = verify
+        self.client: SalsahClient = run.client
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self.counts = {"downloaded": 0, "resumed": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        self.failures: Dict[str, str] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self.manifestFile = os.path.join(directory, "manifest.json")
+        self.manifest = {"files": {}}
+        if os.path.exists(self.manifestFile):
+            with open(self.manifestFile) as f:
+                self.manifest = json.load(f)
+        self.lastSave = time.monotonic()
+
+    # ==================================================================================================================
+    # Manifest
+    def saveManifest(self):
+        with self.lock:
+            content = json.dumps(self.manifest, indent=4, sort_keys=True)
+            self.lastSave = time.monotonic()
+        # written atomically, an interrupted run never leaves a broken manifest
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmpPath, self.manifestFile)
+
+    def record(self, asset: dict, size: int, sha256: str):
+        with self.lock:
+            self.manifest["files"][asset["name"]] = {"url": asset["url"], "resource": asset["resource"], "size": size, "sha256": sha256}
+            due = time.monotonic() - self.lastSave > 5
+        if due:
+            self.saveManifest()
+
+    @classmethod
+    def fileDigest(cls, path: str):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.chunkSize), b""):
+                digest.update(chunk)
+        return digest
+
+    # ==================================================================================================================
+    # Enumeration of the files
+    def assets(self) -> Iterator[dict]:
+        """
+        :return: name, url and resource id of the file of every image and movie resource of the project
+        """
+        exporter = DataExporter(self.run, self.project, self.pageSize)
+        for vocabulary in self.run.vocabulariesOf(self.project):
+            for resourceTypeId, resTypeInfo in self.run.getResourceTypes(vocabulary).items():
+                if resTypeInfo["class"] not in representationClasses:
+                    continue
+                for ids in exporter.resourceIds(resourceTypeId):
+                    for resource in self.client.map(exporter.fetchResource, ids):
+                        resourceId = (resource.get("resdata") or {}).get("res_id")
+                        location = (resource.get("resinfo") or {}).get("locdata")
+                        if location and location.get("path") and location.get("origname"):
+                            yield {
+                                "name": DataExporter.assetName(resourceId, location),
+                                "url": urljoin(self.run.serverpath.rstrip("/") + "/", location["path"]),
+                                "resource": resourceId
+                            }
+
+    # ==================================================================================================================
+    # Downloads
+    @contextmanager
+    def hostSlot(self, url: str):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = threading.BoundedSemaphore(self.perHost)
+            semaphore = self.hosts[host]
+        with semaphore:
+            yield
+
+    @staticmethod
+    def totalSize(response: requests.Response, offset: int) -> Optional[int]:
+        # "Content-Range: bytes 100-199/200" (206, 416) or Content-Length of the rest of the file
+        contentRange = response.headers.get("Content-Range")
+        if contentRange and "/" in contentRange and not contentRange.endswith("/*"):
+            return int(contentRange.rsplit("/", 1)[1])
+        if "Content-Length" in response.headers:
+            return offset + int(response.headers["Content-Length"])
+        return None
+
+    def fetch(self, url: str, partFile: str):
+        """
+        Stream url into partFile, continuing after the bytes already in it. Retries transient failures like
+        SalsahClient.fetch, every retry continues where the previous attempt stopped.
+        :return: sha256 and size of the complete file and whether an earlier transfer was continued
+        """
+        resumed = False
+        for attempt in range(self.client.retries + 1):
+            offset = os.path.getsize(partFile) if os.path.exists(partFile) else 0
+            self.client.rateLimiter.wait()
+            try:
+                with self.client.session.get(url, headers={"Range": f"bytes={offset}-"} if offset else None,
+                                             stream=True, timeout=self.client.timeout) as response:
+                    if response.status_code == 416 and offset:
+                        # nothing left to send: the .part file is complete, or longer than the file
+                        if self.totalSize(response, offset) == offset:
+                            return self.fileDigest(partFile).hexdigest(), offset, True
+                        os.remove(partFile)
+                        raise IncompleteDownloadError(f"{partFile} is longer than {url}")
+                    if response.status_code in self.client.retryStatus:
+                        raise requests.HTTPError(f"{response.status_code} Server Error for url: {url}", response=response)
+                    response.raise_for_status()
+
+                    # a server that ignores the Range header sends the whole file again
+                    append = response.status_code == 206 and response.headers.get("Content-Range", "").startswith(f"bytes {offset}-")
+                    if not append:
+                        offset = 0
+                    resumed = resumed or offset > 0
+                    digest = self.fileDigest(partFile) if append else hashlib.sha256()
+                    total = self.totalSize(response, offset)
+                    with open(partFile, "ab" if append else "wb") as f:
+                        for chunk in response.iter_content(self.chunkSize):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            with self.lock:
+                                self.counts["bytes"] += len(chunk)
+
+                size = os.path.getsize(partFile)
+                if total is not None and size != total:
+                    raise IncompleteDownloadError(f"{url}: received {size} of {total} bytes")
+                return digest.hexdigest(), size, resumed
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in self.client.retryStatus:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    IncompleteDownloadError) as e:
+                error = e
+
+            if attempt == self.client.retries:
+                raise error
+            self.client.profile.recordRetry(url)
+            time.sleep(self.client.backoffDelay(attempt))
+
+    def download(self, asset: dict) -> str:
+        """
+        :return: "skipped", "downloaded" or "resumed"
+        """
+        target = os.path.join(self.directory, asset["name"])
+        with self.lock:
+            entry = self.manifest["files"].get(asset["name"])
+        if os.path.exists(target):
+            if entry is None:
+                # completed, but the run ended before the manifest was saved
+                self.record(asset, os.path.getsize(target), self.fileDigest(target).hexdigest())
+                return "skipped"
+            if entry["size"] == os.path.getsize(target) and (not self.verify or self.fileDigest(target).hexdigest() == entry["sha256"]):
+                return "skipped"
+            print(f"{asset['name']}: does not match the manifest, downloading it again")
+            os.remove(target)
+
+        with self.hostSlot(asset["url"]):
+            sha256, size, resumed = self.fetch(asset["url"], target + ".part")
+        os.replace(target + ".part", target)
+        self.record(asset, size, sha256)
+        return "resumed" if resumed else "downloaded"
+
+    def collect(self, futures: dict, done: set):
+        for future in done:
+            asset = futures.pop(future)
+            try:
+                self.counts[future.result()] += 1
+            except Exception as e:
+                self.counts["failed"] += 1
+                self.failures[asset["name"]] = f"{type(e).__name__}: {e}"
+
+    def downloadAll(self):
+        """
+        Download the files of the project. Files are submitted while the resources are enumerated; at most two
+        per worker wait in the queue, so memory does not grow with the number of files.
+        """
+        futures = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for asset in self.assets():
+                    if len(futures) >= 2 * self.workers:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        self.collect(futures, done)
+                    futures[executor.submit(self.download, asset)] = asset
+                done, _ = wait(futures)
+                self.collect(futures, done)
+        finally:
+            self.saveManifest()
+
+
+def downloadProject(project: dict, converterOptions: dict, clientOptions: dict, cacheOptions: dict,
+                    downloadOptions: dict) -> dict:
+    start = time.perf_counter()
+    summary = {"shortname": project["shortname"], "counts": None, "failures": {}, "error": None}
+    try:
+        responseCache = ResponseCache(**cacheOptions) if cacheOptions is not None else None
+        converter = Converter(SalsahClient(cache=responseCache, **clientOptions), **converterOptions)
+        downloader = AssetDownloader(converter.extractRun(project), project, **downloadOptions)
+        downloader.downloadAll()
+        summary["counts"] = downloader.counts
+        summary["failures"] = downloader.failures
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download the files of the image and movie resources of SALSAH projects.")
+    parser.add_argument("projects", nargs="*", default=["6"], metavar="PROJECT",
+                        help='ids or shortnames of the projects, "all" for every project (default: 6, Webern)')
+    parser.add_argument("--server", default=Converter.serverpath, help=f"SALSAH server (default: {Converter.serverpath})")
+    parser.add_argument("--shortcodes-url", default=Converter.shortcodesUrl, help="CSV file mapping project shortnames to shortcodes")
+    parser.add_argument("--output", default="assets", help="directory of the files and the manifest (default: assets)")
+    parser.add_argument("--workers", type=int, default=4, help="files downloaded at the same time (default: 4)")
+    parser.add_argument("--per-host", type=int, default=2, help="maximum concurrent downloads from one host (default: 2)")
+    parser.add_argument("--verify", action="store_true", help="check the sha256 of already downloaded files")
+    parser.add_argument("--page-size", type=int, default=100, help="resources per search request (default: 100)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="connect timeout in seconds (default: 10)")
+    parser.add_argument("--read-timeout", type=float, default=60.0, help="read timeout in seconds (default: 60)")
+    parser.add_argument("--retries", type=int, default=5, help="retries of a failed request (default: 5)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="maximum number of concurrent API requests (default: 8)")
+    parser.add_argument("--rate-limit", type=float, default=20.0, help="maximum requests per second, 0 for no limit (default: 20)")
+    parser.add_argument("--cache-dir", default=".salsah_cache", help="directory of the response cache (default: .salsah_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the response cache")
+    args = parser.parse_args()
+
+    cacheOptions = None if args.no_cache else {"directory": args.cache_dir}
+    converterOptions = {"serverpath": args.server, "shortcodesUrl": args.shortcodes_url}
+    clientOptions = {"timeout": args.timeout, "readTimeout": args.read_timeout, "retries": args.retries,
+                     "maxInFlight": args.max_in_flight, "rateLimit": args.rate_limit}
+    downloadOptions = {"directory": args.output, "workers": args.workers, "perHost": args.per_host,
+                       "pageSize": args.page_size, "verify": args.verify}
+
+    catalogClient = SalsahClient(**clientOptions)
+    selectedProjects = selectProjects(catalogClient.getJson(f'{args.server.rstrip("/")}/api/projects')["projects"], args.projects)
+
+    failed = False
+    for project in selectedProjects:
+        summary = downloadProject(project, converterOptions, clientOptions, cacheOptions, downloadOptions)
+        if summary["error"] is not None:
+            print(f'{summary["shortname"]}: FAILED {summary["error"]}')
+            failed = True
+            continue
+        counts = summary["counts"]
+        print(f'{summary["shortname"]}: {counts["downloaded"]} downloaded, {counts["resumed"]} resumed, '
+              f'{counts["skipped"]} already complete, {counts["failed"]} failed '
+              f'({counts["bytes"] / 1e6:.1f} MB in {summary["seconds"]}s) -> {args.output}')
+        for name, error in summary["failures"].items():
+            print(f"  {name}: {error}")
+        failed = failed or bool(summary["failures"])
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,93 @@
+from MockSalsahServer import FixtureBuilder, MockSalsahServer, latestSnapshot
+from SalsahModelToJson import Converter
+from SalsahClient import SalsahClient
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+
+# ======================================================================================================================
+# Run the complete Converter pipeline against the local SALSAH stand-in and measure it
+def benchmark(server: MockSalsahServer, project: dict, clientOptions: dict, repeat: int = 1) -> dict:
+    converterOptions = {"serverpath": server.url, "shortcodesUrl": f"{server.url}/shortcodes.csv"}
+
+    # wall time, request count and bytes transferred (best of repeat runs)
+    seconds = []
+    for _ in range(repeat):
+        server.resetCounters()
+        start = time.perf_counter()
+        Converter(SalsahClient(**clientOptions), **converterOptions).extract(project)
+        seconds.append(time.perf_counter() - start)
+    requests, bytesTransferred = server.requestCount, server.bytesSent
+
+    # peak memory in a separate run, tracing slows down the pipeline
+    tracemalloc.start()
+    Converter(SalsahClient(**clientOptions), **converterOptions).extract(project)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(min(seconds), 3),
+        "requests": requests,
+        "bytes": bytesTransferred,
+        "peak_memory": peakMemory
+    }
+
+
+# ======================================================================================================================
+# Compare results with a baseline. A metric regresses if it is more than tolerance (relative) above the baseline
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(case, {}).get(metric)
+            if reference and value > reference * (1 + tolerance):
+                found.append(f"{case} {metric}: {value} (baseline {reference})")
+    return found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark SalsahModelToJson.py against a local SALSAH stand-in.")
+    parser.add_argument("--snapshot", help="extracted model to build the fixtures from (default: newest webern_*.json)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100], help="synthetic scale factors (default: 1 10 100)")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0], help="server latencies in seconds (default: 0)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the fastest one counts (default: 1)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="maximum number of concurrent requests (default: 8)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="maximum requests per second, 0 for no limit (default: 0)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier benchmark; exit with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    with open(args.snapshot or latestSnapshot()) as f:
+        snapshot = json.load(f)
+    clientOptions = {"retries": 0, "maxInFlight": args.max_in_flight, "rateLimit": args.rate_limit}
+
+    results = {}
+    print(f"{'case':<24} {'seconds':>9} {'requests':>9} {'bytes':>12} {'peak memory':>12}")
+    for scale in args.scale:
+        builder = FixtureBuilder(snapshot, scale)
+        fixtures = builder.build()
+        project = next(project for project in fixtures["/api/projects"]["projects"] if project["id"] == builder.projectId)
+        for latency in args.latency:
+            server = MockSalsahServer(fixtures, latency).start(process=True)
+            try:
+                case = f"scale={scale} latency={latency}"
+                results[case] = benchmark(server, project, clientOptions, args.repeat)
+            finally:
+                server.stop()
+            metrics = results[case]
+            print(f"{case:<24} {metrics['seconds']:>9} {metrics['requests']:>9} {metrics['bytes']:>12} {metrics['peak_memory']:>12}")
+
+    if args.output:
+        with open(args.output, 'w') as jsonFile:
+            jsonFile.write(json.dumps(results, indent=4))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if found else 0)
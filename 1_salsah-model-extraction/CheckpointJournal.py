@@ -0,0 +1,108 @@
+from OntologyModel import modelJson
+import json
+import os
+import threading
+import time
+
+
+class CheckpointJournal:
+    """
+    Append-only journal (JSON lines) of the completed steps of an extraction run.
+
+    Every step records its result under a key as soon as it succeeded. A resumed run loads the
+    journal of the failed run and takes the recorded results instead of fetching them again.
+    The first line identifies the run (e.g. project id, server and the options that change the model) and
+    records when it started; a journal of another run or one older than maxAge seconds is discarded, so no
+    stale results are mixed into a new model. Lines that cannot be read are skipped; a last line that was cut
+    off by a crash is removed before the resumed run appends to the journal. With path None nothing is recorded.
+    """
+
+    def __init__(self, path: str = None, run: dict = None, resume: bool = False, maxAge: float = 24 * 3600):
+        """
+        :param path: journal file, None disables the journal
+        :param run: identification of the run, written as first line
+        :param resume: load the results of an existing journal of the same run
+        :param maxAge: seconds after which a journal is too old to be resumed
+        """
+        self.path = path
+        self.run = run or {}
+        self.maxAge = maxAge
+        self.entries: dict = {}
+        self.lock = threading.Lock()
+        self.file = None
+        # length of the complete lines of the loaded journal
+        self.loadedSize = 0
+        if path is None:
+            return
+
+        if resume and os.path.exists(path):
+            self.load()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.entries:
+            os.truncate(path, self.loadedSize)
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+            self.write({"run": self.run, "started": time.time()})
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            try:
+                header = json.loads(header)
+            except ValueError:
+                return  # empty journal or incomplete header of a crashed run
+            if header.get("run") != self.run:
+                print(f"Ignoring checkpoint journal {self.path}: it belongs to another run {header.get('run')}")
+                return
+            if time.time() - header.get("started", 0) > self.maxAge:
+                print(f"Ignoring checkpoint journal {self.path}: older than {self.maxAge / 3600:g} hours")
+                return
+            size = f.tell()
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # incomplete last line of a crashed run
+                size += len(line)
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry["value"]
+                except (ValueError, KeyError, TypeError):
+                    print(f"Skipping an unreadable line of checkpoint journal {self.path}")
+            self.loadedSize = size
+
+    def write(self, line: dict):
+        # encoded chunk by chunk, model objects one at a time
+        json.dump(line, self.file, default=modelJson)
+        self.file.write("\n")
+        self.file.flush()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str):
+        """
+        :return: the recorded result of the step or None
+        """
+        return self.entries.get(key)
+
+    def record(self, key: str, value):
+        """
+        Record the result of a successful step (must be JSON serializable, may contain model objects).
+        """
+        if self.file is None:
+            return
+        with self.lock:
+            self.write({"key": key, "value": value})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """
+        Close and delete the journal, e.g. after the run completed.
+        """
+        self.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
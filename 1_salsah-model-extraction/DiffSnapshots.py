@@ -0,0 +1,225 @@
+from SnapshotStore import SnapshotStore
+from typing import Dict
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+# Sections of the structural index of a snapshot
+sections = ("project", "lists", "listnodes", "resources", "cardinalities", "properties")
+
+
+# ======================================================================================================================
+# Helper functions
+def elementHash(element) -> str:
+    return hashlib.sha1(json.dumps(element, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def snapshotDate(path: str) -> str:
+    match = re.search(r"_(\d{8})\.json$", path)
+    return match.group(1) if match else os.path.basename(path)
+
+
+# Snapshots of a SnapshotStore are given as "store:<file name>"
+storePrefix = "store:"
+
+
+# Snapshots <shortname>_<date>.json of a project in the store, in archive/ and in the working directory (not the
+# <shortname>_<date>_profile.json reports next to them)
+def projectSnapshots(shortname: str, store: SnapshotStore) -> list:
+    stored = [storePrefix + entry["name"] for entry in store.versions(shortname + ".json")]
+    pattern = re.escape(shortname) + r"_\d{8}\.json"
+    return stored + [path for directory in ("./archive", ".") for path in glob.glob(os.path.join(directory, glob.escape(shortname) + "_*.json"))
+                     if re.fullmatch(pattern, os.path.basename(path))]
+
+
+def sortedSnapshots(paths: list) -> list:
+    # the same snapshot can be in the working directory, the archive and the store; keep one per file name
+    unique = {os.path.basename(path).replace(storePrefix, ""): path for path in paths}
+    return sorted(unique.values(), key=lambda path: (snapshotDate(path), path))
+
+
+# ======================================================================================================================
+# Index all elements of a snapshot by name: project fields, lists, list nodes, resources, cardinalities and properties.
+# Resources and properties are qualified with their ontology, cardinalities with their resource and list nodes with
+# their list. Nested elements are indexed separately, e.g. a changed cardinality does not change its resource.
+def indexSnapshot(document: dict) -> Dict[str, Dict[str, dict]]:
+    index = {section: {} for section in sections}
+    project = document["project"]
+
+    for field in ("shortcode", "shortname", "longname", "descriptions", "keywords"):
+        index["project"][field] = {"value": project.get(field)}
+    for prefix, iri in document.get("prefixes", {}).items():
+        index["project"]["prefix " + prefix] = {"value": iri}
+
+    for lst in project.get("lists", []):
+        index["lists"][lst["name"]] = {key: value for key, value in lst.items() if key != "nodes"}
+        # walk the nodes iteratively, hierarchical lists can be deep
+        stack = [(lst["name"], node) for node in reversed(lst.get("nodes") or [])] if isinstance(lst.get("nodes"), list) else []
+        while stack:
+            parent, node = stack.pop()
+            index["listnodes"][f'{lst["name"]}/{node["name"]}'] = {
+                "parent": parent,
+                **{key: value for key, value in node.items() if key != "nodes"}
+            }
+            stack.extend((node["name"], child) for child in reversed(node.get("nodes") or []))
+
+    for ontology in project.get("ontologies", []):
+        for resource in ontology.get("resources", []):
+            name = f'{ontology["name"]}:{resource["name"]}'
+            index["resources"][name] = {key: value for key, value in resource.items() if key != "cardinalities"}
+            for cardinality in resource.get("cardinalities", []):
+                index["cardinalities"][f'{name}/{cardinality["propname"]}'] = {
+                    key: value for key, value in cardinality.items() if key != "propname"
+                }
+        for prop in ontology.get("properties", []):
+            index["properties"][f'{ontology["name"]}:{prop["name"]}'] = prop
+
+    return index
+
+
+class SnapshotIndex:
+    """
+    Element hashes of snapshot files (section -> name -> hash), cached in a JSON file.
+    A snapshot is only parsed again if its size or modification time changed, so comparing
+    a growing archive costs one parse per new snapshot.
+    """
+
+    def __init__(self, cacheFile: str = ".snapshot_index.json", store: SnapshotStore = None):
+        self.cacheFile = cacheFile
+        self.store = store
+        self.entries: dict = {}
+        self.changed = False
+        if cacheFile is not None and os.path.exists(cacheFile):
+            try:
+                with open(cacheFile) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+
+    def hashes(self, path: str) -> Dict[str, Dict[str, str]]:
+        return self.entry(path)["hashes"]
+
+    def fileHash(self, path: str) -> str:
+        return self.entry(path)["sha256"]
+
+    def entry(self, path: str) -> dict:
+        if path.startswith(storePrefix):
+            # snapshots in the SnapshotStore never change, their sha256 identifies them
+            stored = self.store.find(path[len(storePrefix):])
+            key, size, mtime = storePrefix + stored["sha256"], None, None
+        else:
+            stat = os.stat(path)
+            key, size, mtime = os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+        entry = self.entries.get(key)
+        if entry is None or entry["size"] != size or entry["mtime"] != mtime:
+            content = self.read(path)
+            entry = {"size": size, "mtime": mtime, "sha256": hashlib.sha256(content).hexdigest()}
+            index = indexSnapshot(json.loads(content))
+            entry["hashes"] = {section: {name: elementHash(element) for name, element in elements.items()}
+                               for section, elements in index.items()}
+            self.entries[key] = entry
+            self.changed = True
+        return entry
+
+    def read(self, path: str) -> bytes:
+        if path.startswith(storePrefix):
+            return self.store.get(path[len(storePrefix):])
+        with open(path, "rb") as f:
+            return f.read()
+
+    def save(self):
+        if self.cacheFile is not None and self.changed:
+            with open(self.cacheFile, "w") as f:
+                json.dump(self.entries, f)
+            self.changed = False
+
+
+# ======================================================================================================================
+# Compare two indexes (of element hashes or of elements). Returns per section the added, removed and changed names
+def diffIndexes(old: Dict[str, dict], new: Dict[str, dict]) -> Dict[str, Dict[str, list]]:
+    result = {}
+    for section in sections:
+        oldElements, newElements = old.get(section, {}), new.get(section, {})
+        added = [name for name in newElements if name not in oldElements]
+        removed = [name for name in oldElements if name not in newElements]
+        changed = [name for name in newElements if name in oldElements and oldElements[name] != newElements[name]]
+        if added or removed or changed:
+            result[section] = {"added": added, "removed": removed, "changed": changed}
+    return result
+
+
+# Names of the fields that differ between two versions of an element
+def changedFields(old: dict, new: dict) -> list:
+    return [key for key in list(old) + [key for key in new if key not in old] if old.get(key) != new.get(key)]
+
+
+def diffSnapshots(oldPath: str, newPath: str, snapshotIndex: SnapshotIndex = None, details: bool = False) -> dict:
+    """
+    Structural diff of two snapshot files.
+    :param details: also report which fields of the changed elements differ (parses both snapshots)
+    :return: section -> {"added": [...], "removed": [...], "changed": [...]}; with details, changed is a dict name -> fields
+    """
+    snapshotIndex = snapshotIndex if snapshotIndex is not None else SnapshotIndex(None)
+    if snapshotIndex.fileHash(oldPath) == snapshotIndex.fileHash(newPath):
+        return {}
+    diff = diffIndexes(snapshotIndex.hashes(oldPath), snapshotIndex.hashes(newPath))
+    if details and diff:
+        oldIndex = indexSnapshot(json.loads(snapshotIndex.read(oldPath)))
+        newIndex = indexSnapshot(json.loads(snapshotIndex.read(newPath)))
+        for section, changes in diff.items():
+            changes["changed"] = {name: changedFields(oldIndex[section][name], newIndex[section][name])
+                                  for name in changes["changed"]}
+    return diff
+
+
+def formatDiff(diff: dict) -> list:
+    lines = []
+    for section, changes in diff.items():
+        lines.append(f'  {section}: +{len(changes["added"])} -{len(changes["removed"])} ~{len(changes["changed"])}')
+        lines.extend(f"    + {name}" for name in changes["added"])
+        lines.extend(f"    - {name}" for name in changes["removed"])
+        for name in changes["changed"]:
+            fields = changes["changed"][name] if isinstance(changes["changed"], dict) else None
+            lines.append(f"    ~ {name}" + (f' ({", ".join(fields)})' if fields else ""))
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Structural diff of extracted SALSAH model snapshots.")
+    parser.add_argument("snapshots", nargs="*", help="two snapshots to compare, or the snapshots of the changelog")
+    parser.add_argument("--changelog", action="store_true",
+                        help="compare every snapshot with its predecessor (default: <shortname>_<date>.json here, in archive/ and in the store)")
+    parser.add_argument("--shortname", default="webern", help="project of the changelog snapshots (default: webern)")
+    parser.add_argument("--details", action="store_true", help="show the changed fields of changed elements")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--store", default="archive/store",
+                        help="SnapshotStore whose snapshots are part of the changelog, single ones are given as store:<file name> (default: archive/store)")
+    parser.add_argument("--index-cache", default=".snapshot_index.json", help="cache file of the snapshot indexes (default: .snapshot_index.json)")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+    snapshotIndex = SnapshotIndex(args.index_cache, store)
+    if args.changelog:
+        paths = sortedSnapshots(args.snapshots or projectSnapshots(args.shortname, store))
+    elif len(args.snapshots) == 2:
+        paths = args.snapshots
+    else:
+        parser.error("give two snapshots or --changelog")
+
+    changelog = []
+    for oldPath, newPath in zip(paths, paths[1:]):
+        changelog.append({"from": oldPath, "to": newPath, "changes": diffSnapshots(oldPath, newPath, snapshotIndex, args.details)})
+    snapshotIndex.save()
+
+    if args.json:
+        print(json.dumps(changelog if args.changelog else changelog[0], indent=4))
+    else:
+        for entry in changelog:
+            if entry["changes"] or not args.changelog:
+                print(f'{entry["from"]} -> {entry["to"]}')
+                print("\n".join(formatDiff(entry["changes"])) or "  no changes")
+    sys.exit(0)
@@ -0,0 +1,445 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict
+import argparse
+import hashlib
+import multiprocessing
+import threading
+import json
+import time
+import glob
+
+
+class FixtureBuilder:
+    """
+    Builds SALSAH API responses from an extracted model snapshot (e.g. archive/webern_20210929.json).
+    The snapshot is the DSP side of the mapping in SalsahModelToJson.py, so the builder simply
+    runs that mapping backwards. Every ontology becomes a vocabulary of the project (the lists
+    belong to the first one). With scale > 1 every resource type, property and list node
+    is replicated (suffix _2, _3, ...) to simulate bigger projects.
+    """
+
+    guiNameMap = {
+        "SimpleText": "text",
+        "Textarea": "textarea",
+        "Richtext": "richtext",
+        "Date": "date",
+        "Geonames": "geoname",
+        "Spinbox": "spinbox",
+        "Radio": "radio",
+        "Pulldown": "pulldown",
+        "Searchbox": "searchbox",
+        "IntervalValue": "interval",
+        "Fileupload": "fileupload"
+    }  # Reverse of guiEleMap in Converter.fetchProperties
+
+    vtNameMap = {
+        "TextValue": "Text",
+        "DateValue": "Date",
+        "TimeValue": "Time",
+        "DecimalValue": "Floating point number",
+        "GeonameValue": "Geoname",
+        "IntValue": "Integer value",
+        "ListValue": "Selection"
+    }  # Reverse of objectMap in Converter.fetchProperties
+
+    classMap = {
+        "MovingImageRepresentation": "movie",
+        "Resource": "object",
+        "StillImageRepresentation": "image"
+    }  # Reverse of superMap in Converter.fetchResources
+
+    salsahPropertyMap = {
+        "isPartOf": "part_of",
+        "seqnum": "seqnum"
+    }
+
+    def __init__(self, snapshot: dict, scale: int = 1, projectId: str = "6", resources: int = 0, fileSize: int = 64 * 1024):
+        """
+        :param resources: number of resources (instances) per resource type, for the data export
+        :param fileSize: size (bytes) of the file of every image and movie resource
+        """
+        self.snapshot = snapshot
+        self.scale = scale
+        self.projectId = projectId
+        self.resources = resources
+        self.fileSize = fileSize
+        self.responses: Dict[str, dict] = {}
+        self.nextId = 1000
+
+    def newId(self) -> str:
+        self.nextId += 1
+        return str(self.nextId)
+
+    @staticmethod
+    def labelList(labels: dict, key: str = "label") -> list:
+        return [{"shortname": lang, key: text} for lang, text in labels.items()]
+
+    @staticmethod
+    def suffix(name: str, copy: int) -> str:
+        return name if copy == 1 else f"{name}_{copy}"
+
+    def build(self) -> Dict[str, dict]:
+        project = self.snapshot["project"]
+        ontologies = project["ontologies"]
+        vocName = ontologies[0]["name"]
+
+        self.responses["/api/projects"] = {"projects": [
+            {"id": self.projectId, "shortname": project["shortname"], "longname": project["longname"]},
+            {"id": "1", "shortname": "salsah", "longname": "SALSAH system project"}
+        ]}
+        self.responses["/api/vocabularies"] = {"vocabularies": [
+            {"id": "1", "shortname": "salsah", "longname": "SALSAH", "description": None, "project_id": "1"},
+            {"id": "2", "shortname": "dc", "longname": "Dublin Core", "description": None, "project_id": "0"}
+        ] + [
+            {"id": str(3 + number), "shortname": ontology["name"], "longname": ontology["label"],
+             "description": (ontology.get("comment") or {}).get("en"), "project_id": self.projectId}
+            for number, ontology in enumerate(ontologies)
+        ]}
+        self.responses["/api/projects/salsah"] = {"project_info": {
+            "shortname": "salsah", "longname": "SALSAH system project", "description": None, "keywords": None
+        }}
+        self.responses[f"/api/projects/{vocName}"] = {"project_info": {
+            "shortname": project["shortname"],
+            "longname": project["longname"],
+            "description": self.labelList(project["descriptions"], "description") or None,
+            "keywords": ", ".join(project["keywords"]) or None
+        }}
+        self.responses["/shortcodes.csv"] = {"text": f"Shortcode,Shortname,Host\n{project['shortcode']},{project['shortname']},data.dasch.swiss\n"}
+
+        listIds = self.buildLists(project["lists"], vocName)
+        for ontology in ontologies:
+            self.buildResourceTypes(ontology, ontology["name"], listIds)
+            if self.resources:
+                self.buildResources(ontology["name"])
+        return self.responses
+
+    def buildLists(self, lists: list, vocName: str) -> Dict[str, str]:
+        selections, hlists, listIds = [], [], {}
+
+        def hlistNodes(nodes: list, copy: int) -> list:
+            result = []
+            for node in nodes:
+                entry = {
+                    "id": self.newId() if copy > 1 else node["name"][2:],
+                    "name": self.suffix(node["name"], copy),
+                    "label": self.labelList(node["labels"])
+                }
+                if node.get("nodes"):
+                    entry["children"] = hlistNodes(node["nodes"], copy)
+                result.append(entry)
+            return result
+
+        for copy in range(1, self.scale + 1):
+            for lst in lists:
+                listId = self.newId()
+                name = self.suffix(lst["name"], copy)
+                listIds[name] = listId
+                entry = {
+                    "id": listId,
+                    "name": name,
+                    "label": self.labelList(lst["labels"]),
+                    "description": self.labelList(lst["comments"], "description") if lst.get("comments") else None
+                }
+                nodes = lst.get("nodes", [])
+                if nodes and nodes[0]["name"].startswith("S_"):
+                    selections.append(entry)
+                    self.responses[f"/api/selections/{listId}"] = {"selection": [{
+                        "id": self.newId() if copy > 1 else node["name"][2:],
+                        "name": self.suffix(node["name"], copy),
+                        "label": node["labels"]
+                    } for node in nodes]}
+                else:
+                    hlists.append(entry)
+                    self.responses[f"/api/hlists/{listId}"] = {"hlist": hlistNodes(nodes, copy)}
+
+        self.responses[f"/api/selections?vocabulary={vocName}"] = {"selections": selections}
+        self.responses[f"/api/hlists?vocabulary={vocName}"] = {"hlists": hlists}
+        # the global listings also contain lists of other SALSAH projects
+        foreign = [{"id": self.newId(), "name": f"foreign_list_{i}", "label": [], "description": None} for i in range(50 * self.scale)]
+        self.responses["/api/selections"] = {"selections": selections + foreign}
+        self.responses["/api/hlists"] = {"hlists": hlists + foreign}
+        return listIds
+
+    def buildResourceTypes(self, ontology: dict, vocName: str, listIds: Dict[str, str]):
+        properties = {prop["name"]: prop for prop in ontology["properties"]}
+        propertyIds: Dict[str, str] = {}
+        listing, foreignTypes = [], {}
+
+        # assign ids first, link targets need them
+        resourceIds: Dict[str, str] = {}
+        for copy in range(1, self.scale + 1):
+            for resource in ontology["resources"]:
+                resourceIds[self.suffix(resource["name"].lower(), copy)] = self.newId()
+
+        def resolveTarget(target: str, copy: int) -> str:
+            if target.startswith(":"):
+                return resourceIds.get(self.suffix(target[1:].lower(), copy), "0")
+            if target not in foreignTypes:
+                foreignTypes[target] = self.newId()
+                voc, name = target.split(":", 1)
+                self.responses[f"/api/resourcetypes/{foreignTypes[target]}"] = {"restype_info": {
+                    "name": target, "label": [{"shortname": "en", "label": name}], "description": None,
+                    "class": "object", "properties": []
+                }}
+            return foreignTypes[target]
+
+        def buildProperty(propname: str, occurrence: str, copy: int) -> dict:
+            if propname in self.salsahPropertyMap:
+                return {"id": self.salsahPropertyMap[propname], "name": self.salsahPropertyMap[propname],
+                        "vocabulary": "salsah", "occurrence": occurrence, "label": [], "description": None,
+                        "gui_name": "searchbox", "vt_name": "Resource pointer", "attributes": "restypeid=0"}
+            baseName = propname.lstrip(":")
+            prop = properties.get(baseName, {"labels": {}, "comments": {}, "object": "TextValue", "gui_element": "SimpleText"})
+            vocabulary, name = vocName, baseName
+            for prefix in ("dc", "salsah"):
+                if baseName.startswith(prefix + "_"):
+                    vocabulary, name = prefix, baseName[len(prefix) + 1:]
+            if vocabulary == vocName:
+                name = self.suffix(name, copy)
+            key = f"{vocabulary}:{name}"
+            propertyIds.setdefault(key, self.newId())
+
+            attributes = []
+            guiName = self.guiNameMap.get(prop["gui_element"], "text")
+            for attrKey, attrValue in prop.get("gui_attributes", {}).items():
+                if attrKey == "hlist":
+                    listName = self.suffix(attrValue, copy)
+                    listKind = "hlist" if f"/api/hlists/{listIds.get(listName)}" in self.responses else "selection"
+                    guiName = "hlist" if listKind == "hlist" else "pulldown"
+                    attributes.append(f"{listKind}={listIds.get(listName, attrValue)}")
+                else:
+                    attributes.append(f"{attrKey}={attrValue}")
+
+            vtName = self.vtNameMap.get(prop["object"])
+            if vtName == "Selection" and guiName == "hlist":
+                vtName = "Hierarchical list"
+            if vtName is None:
+                vtName = "Resource pointer"
+                if prop["object"] != ":LinkValue":
+                    attributes.append(f"restypeid={resolveTarget(prop['object'], copy)}")
+
+            return {
+                "id": propertyIds[key],
+                "name": name,
+                "vocabulary": vocabulary,
+                "occurrence": occurrence,
+                "label": self.labelList(prop["labels"]),
+                "description": self.labelList(prop["comments"], "description") or None,
+                "gui_name": guiName,
+                "vt_name": vtName,
+                "attributes": ";".join(attributes) or None
+            }
+
+        for copy in range(1, self.scale + 1):
+            for resource in ontology["resources"]:
+                name = self.suffix(resource["name"].lower(), copy)
+                resourceId = resourceIds[name]
+                listing.append({"id": resourceId, "label": self.labelList(resource["labels"])})
+                self.responses[f"/api/resourcetypes/{resourceId}"] = {"restype_info": {
+                    "name": f"{vocName}:{name}",
+                    "label": self.labelList(resource["labels"]),
+                    "description": self.labelList(resource["comments"], "description") or None,
+                    "class": self.classMap.get(resource["super"], "object"),
+                    "properties": [
+                        {"id": "0", "name": "__location__", "vocabulary": "salsah", "occurrence": "0-n", "label": [], "description": None}
+                    ] + [buildProperty(card["propname"], card["cardinality"], copy) for card in resource["cardinalities"]]
+                }}
+
+        self.responses[f"/api/resourcetypes?vocabulary={vocName}"] = {"resourcetypes": listing}
+
+
+    def buildResources(self, vocName: str):
+        """
+        Resources of every resource type with one value per property: /api/search/?filter_by_restype=<id> lists
+        their ids (paged by the server), /api/resources/<id> returns a resource and /files/<id>.<extension>
+        the file of an image or movie resource.
+        """
+        resourceTypes = {path.rsplit("/", 1)[1]: response["restype_info"] for path, response in self.responses.items()
+                         if path.startswith("/api/resourcetypes/") and response["restype_info"]["name"].startswith(vocName + ":")}
+        instanceIds = {typeId: [self.newId() for _ in range(self.resources)] for typeId in resourceTypes}
+
+        def value(prop: dict, number: int):
+            attributes = dict(attribute.split("=", 1) for attribute in (prop.get("attributes") or "").split(";") if "=" in attribute)
+            vtName = prop.get("vt_name")
+            if vtName in ("Selection", "Hierarchical list"):
+                kind = "selection" if "selection" in attributes else "hlist"
+                nodes = self.responses.get(f"/api/{kind}s/{attributes.get(kind)}", {}).get(kind)
+                return nodes[number % len(nodes)]["id"] if nodes else None
+            if vtName == "Resource pointer":
+                targets = instanceIds.get(attributes.get("restypeid"))
+                return targets[number % len(targets)] if targets else None
+            if vtName == "Date":
+                return {"dateval1": f"{1900 + number % 50}-01-01", "dateval2": f"{1900 + number % 50}-12-31", "calendar": "GREGORIAN"}
+            if vtName == "Integer value":
+                return number
+            if vtName == "Geoname":
+                return "2761369"
+            return {"utf8str": f'{prop["name"]} {number}'}
+
+        for typeId, restypeInfo in resourceTypes.items():
+            self.responses[f"/api/search?filter_by_restype={typeId}"] = {"ids": instanceIds[typeId]}
+            for number, resourceId in enumerate(instanceIds[typeId]):
+                resinfo = {"restype_name": restypeInfo["name"], "firstproperty": f'{restypeInfo["name"]} {number}'}
+                if restypeInfo["class"] in ("image", "movie"):
+                    extension = "jpg" if restypeInfo["class"] == "image" else "mp4"
+                    resinfo["locdata"] = {"path": f"/files/{resourceId}.{extension}", "origname": f"file_{resourceId}.{extension}"}
+                    self.responses[f"/files/{resourceId}.{extension}"] = {"file": self.fileSize}
+                self.responses[f"/api/resources/{resourceId}"] = {
+                    "resinfo": resinfo,
+                    "resdata": {"res_id": resourceId, "restype_name": restypeInfo["name"]},
+                    "props": {f'{prop["vocabulary"]}:{prop["name"]}': {"vt_name": prop.get("vt_name"), "values": [value(prop, number)]}
+                              for prop in restypeInfo["properties"] if "vt_name" in prop}
+                }
+
+
+class MockSalsahServer:
+    """
+    Threaded HTTP server answering the SALSAH API endpoints used by SalsahModelToJson.py
+    from prebuilt fixtures. Counts requests and bytes sent; latency (seconds) is added to every response.
+    Listings of a vocabulary without fixtures are empty, like those of a vocabulary without resource types.
+    start(process=True) serves from a forked process, so that measurements in the calling process
+    (time, memory) are not disturbed by the server; the counters are shared with that process.
+    """
+
+    listings = {"/api/resourcetypes": "resourcetypes", "/api/selections": "selections", "/api/hlists": "hlists"}
+
+    def __init__(self, responses: Dict[str, dict], latency: float = 0.0, port: int = 0):
+        self.responses = responses
+        self.latency = latency
+        self.counters = multiprocessing.Array("q", 2)  # requests, bytes sent
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self.handlerClass())
+        self.httpd.daemon_threads = True
+        self.thread = None
+        self.process = None
+
+    @property
+    def requestCount(self) -> int:
+        return self.counters[0]
+
+    @property
+    def bytesSent(self) -> int:
+        return self.counters[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def handlerClass(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body, contentType = server.respond(self.path)
+                headers = {}
+                if status == 200 and contentType == "application/octet-stream":
+                    status, body, headers = server.byteRange(body, self.headers.get("Range"))
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", contentType)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with server.counters.get_lock():
+                    server.counters[0] += 1
+                    server.counters[1] += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def respond(self, rawPath: str):
+        parts = urlsplit(rawPath)
+        path = parts.path.rstrip("/")
+        query = parse_qs(parts.query)
+        # listings of a vocabulary never fall back to the global listing
+        candidates = [f"{path}?vocabulary={query['vocabulary'][0]}"] if "vocabulary" in query else [path]
+        if path == "/api/search" and "filter_by_restype" in query:
+            # one page of the resources of a resource type
+            ids = self.responses.get(f"{path}?filter_by_restype={query['filter_by_restype'][0]}", {}).get("ids", [])
+            start = int(query.get("start_at", ["0"])[0])
+            rows = int(query.get("show_nrows", ["25"])[0])
+            page = {"subjects": [{"obj_id": resourceId} for resourceId in ids[start:start + rows]], "nhits": str(len(ids))}
+            return 200, json.dumps(page).encode("utf-8"), "application/json"
+        for candidate in candidates:
+            if candidate in self.responses:
+                response = self.responses[candidate]
+                if "file" in response and len(response) == 1:
+                    # generated file content, the same on every request
+                    block = hashlib.sha256(path.encode("utf-8")).digest()
+                    return 200, (block * (response["file"] // len(block) + 1))[:response["file"]], "application/octet-stream"
+                if "text" in response and len(response) == 1:
+                    return 200, response["text"].encode("utf-8"), "text/csv"
+                return 200, json.dumps(response).encode("utf-8"), "application/json"
+        if "vocabulary" in query and path in self.listings:
+            return 200, json.dumps({self.listings[path]: []}).encode("utf-8"), "application/json"
+        return 404, json.dumps({"status": 404, "errormsg": f"Not found: {path}"}).encode("utf-8"), "application/json"
+
+    @staticmethod
+    def byteRange(body: bytes, rangeHeader: str = None):
+        """
+        :return: status, body and headers of the answer to a request with the given Range header (bytes=start-[end])
+        """
+        headers = {"Accept-Ranges": "bytes"}
+        if not rangeHeader or not rangeHeader.startswith("bytes="):
+            return 200, body, headers
+        start, _, end = rangeHeader[len("bytes="):].partition("-")
+        start = int(start)
+        end = min(int(end), len(body) - 1) if end else len(body) - 1
+        if start >= len(body):
+            headers["Content-Range"] = f"bytes */{len(body)}"
+            return 416, b"", headers
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+        return 206, body[start:end + 1], headers
+
+    def start(self, process: bool = False):
+        if process:
+            self.process = multiprocessing.get_context("fork").Process(target=self.httpd.serve_forever, daemon=True)
+            self.process.start()
+        else:
+            self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+        else:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def resetCounters(self):
+        with self.counters.get_lock():
+            self.counters[0] = 0
+            self.counters[1] = 0
+
+
+def latestSnapshot() -> str:
+    # file names end with the date (YYYYMMDD), so sorting them sorts by date
+    return sorted(glob.glob("./webern_*.json") + glob.glob("./archive/webern_*.json"), key=lambda f: f[-13:])[-1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the SALSAH API from a model snapshot.")
+    parser.add_argument("--snapshot", help="extracted model to build the fixtures from (default: newest webern_*.json)")
+    parser.add_argument("--scale", type=int, default=1, help="replicate resource types, properties and list nodes n times")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency added to every response")
+    parser.add_argument("--resources", type=int, default=0, help="resources (instances) per resource type for the data export (default: 0)")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="size (bytes) of the file of every image and movie resource")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    with open(args.snapshot or latestSnapshot()) as f:
+        fixtures = FixtureBuilder(json.load(f), args.scale, resources=args.resources, fileSize=args.file_size).build()
+
+    mockServer = MockSalsahServer(fixtures, args.latency, args.port)
+    print(f"Serving SALSAH stand-in on {mockServer.url} (shortcodes at {mockServer.url}/shortcodes.csv)")
+    try:
+        mockServer.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mockServer.stop()
@@ -0,0 +1,390 @@
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+import hashlib
+import json
+
+# JSON schema of the dsp-tools ontology files
+schemaUrl = "https://raw.githubusercontent.com/dasch-swiss/dsp-tools/main/knora/dsplib/schemas/ontology.json"
+
+
+class ListNode:
+    """
+    Node of a list (selection or hlist). The root node of a list has comments, leaves have no nodes.
+    The root node of a list in its own file (large-list mode) has no nodes but the file, referenced as
+    {"file": ..., "worksheet": <name of the list>}: the form of a file reference the dsp-tools schema accepts.
+    """
+    __slots__ = ("name", "labels", "comments", "nodes", "file")
+
+    def __init__(self, name: str, labels: Dict[str, str], comments: Optional[Dict[str, str]] = None,
+                 nodes: Optional[List["ListNode"]] = None, file: Optional[str] = None):
+        self.name = name
+        self.labels = labels
+        self.comments = comments
+        self.nodes = nodes
+        self.file = file
+
+    def toJson(self) -> dict:
+        result = {"name": self.name, "labels": self.labels}
+        if self.comments is not None:
+            result["comments"] = self.comments
+        if self.file is not None:
+            result["nodes"] = {"file": self.file, "worksheet": self.name}
+        elif self.nodes is not None:
+            result["nodes"] = [node.toJson() for node in self.nodes]
+        return result
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "ListNode":
+        nodes = data.get("nodes")
+        if isinstance(nodes, dict):
+            return cls(data["name"], data["labels"], data.get("comments"), file=nodes["file"])
+        return cls(data["name"], data["labels"], data.get("comments"),
+                   [cls.fromJson(node) for node in nodes] if nodes is not None else None)
+
+
+class Cardinality:
+    __slots__ = ("propname", "cardinality", "gui_order")
+
+    def __init__(self, propname: str, cardinality: str, gui_order: int):
+        self.propname = propname
+        self.cardinality = cardinality
+        self.gui_order = gui_order
+
+    def toJson(self) -> dict:
+        return {"propname": self.propname, "cardinality": self.cardinality, "gui_order": self.gui_order}
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "Cardinality":
+        return cls(data["propname"], data["cardinality"], data["gui_order"])
+
+
+class ResourceClass:
+    __slots__ = ("name", "super", "labels", "comments", "cardinalities")
+
+    def __init__(self, name: str = "", super: str = "", labels: Dict[str, str] = None,
+                 comments: Dict[str, str] = None, cardinalities: List[Cardinality] = None):
+        self.name = name
+        self.super = super
+        self.labels = labels if labels is not None else {}
+        self.comments = comments if comments is not None else {}
+        self.cardinalities = cardinalities if cardinalities is not None else []
+
+    def toJson(self) -> dict:
+        return {
+            "name": self.name,
+            "super": self.super,
+            "labels": self.labels,
+            "comments": self.comments,
+            "cardinalities": [cardinality.toJson() for cardinality in self.cardinalities]
+        }
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "ResourceClass":
+        return cls(data["name"], data["super"], data["labels"], data["comments"],
+                   [Cardinality.fromJson(cardinality) for cardinality in data["cardinalities"]])
+
+
+class Property:
+    """
+    Property of an ontology. gui_attributes is None if the SALSAH property has no attributes.
+    """
+    __slots__ = ("name", "labels", "comments", "super", "object", "gui_element", "gui_attributes")
+
+    def __init__(self, name: str = "", labels: Dict[str, str] = None, comments: Dict[str, str] = None,
+                 super: List[str] = None, object: str = "", gui_element: str = "", gui_attributes: Optional[dict] = None):
+        self.name = name
+        self.labels = labels if labels is not None else {}
+        self.comments = comments if comments is not None else {}
+        self.super = super if super is not None else []
+        self.object = object
+        self.gui_element = gui_element
+        self.gui_attributes = gui_attributes
+
+    def toJson(self) -> dict:
+        result = {
+            "name": self.name,
+            "labels": self.labels,
+            "comments": self.comments,
+            "super": self.super,
+            "object": self.object,
+            "gui_element": self.gui_element
+        }
+        if self.gui_attributes is not None:
+            result["gui_attributes"] = self.gui_attributes
+        return result
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "Property":
+        return cls(data["name"], data["labels"], data["comments"], data["super"], data["object"],
+                   data["gui_element"], data.get("gui_attributes"))
+
+
+class Ontology:
+    """
+    Ontology (SALSAH vocabulary) of a project. comment is None if the vocabulary has no description.
+    """
+    __slots__ = ("name", "label", "comment", "properties", "resources")
+
+    def __init__(self, name: str = "", label: str = "", comment: Optional[Dict[str, str]] = None,
+                 properties: List[Property] = None, resources: List[ResourceClass] = None):
+        self.name = name
+        self.label = label
+        self.comment = comment if comment is not None else {}
+        self.properties = properties if properties is not None else []
+        self.resources = resources if resources is not None else []
+
+    def toJson(self) -> dict:
+        result = self.jsonParts()
+        result["properties"] = [prop.toJson() for prop in self.properties]
+        result["resources"] = [resource.toJson() for resource in self.resources]
+        return result
+
+    def jsonParts(self) -> dict:
+        # like toJson(), but properties and resources are not converted yet (see writeJson)
+        result = {"name": self.name, "label": self.label}
+        if self.comment is not None:
+            result["comment"] = self.comment
+        result["properties"] = self.properties
+        result["resources"] = self.resources
+        return result
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "Ontology":
+        ontology = cls(data["name"], data["label"], None,
+                       [Property.fromJson(prop) for prop in data["properties"]],
+                       [ResourceClass.fromJson(resource) for resource in data["resources"]])
+        ontology.comment = data.get("comment")
+        return ontology
+
+
+class Project:
+    """
+    Project with its lists and ontologies. toJson() gives the complete dsp-tools ontology document
+    (including $schema and prefixes), fromJson() reads such a document.
+    """
+    __slots__ = ("shortcode", "shortname", "longname", "descriptions", "keywords", "lists", "ontologies", "prefixes")
+
+    def __init__(self):
+        self.shortcode: str = ""
+        self.shortname: str = ""
+        self.longname: str = ""
+        self.descriptions: Dict[str, str] = {}
+        self.keywords: List[str] = []
+        self.lists: List[ListNode] = []
+        self.ontologies: List[Ontology] = [Ontology()]
+        self.prefixes: Dict[str, str] = {}
+
+    def toJson(self) -> dict:
+        result = self.jsonParts()
+        result["project"]["lists"] = [lst.toJson() for lst in self.lists]
+        result["project"]["ontologies"] = [ontology.toJson() for ontology in self.ontologies]
+        return result
+
+    def jsonParts(self) -> dict:
+        # like toJson(), but lists and ontologies are not converted yet (see writeJson)
+        return {
+            "$schema": schemaUrl,
+            "prefixes": self.prefixes,
+            "project": {
+                "shortcode": self.shortcode,
+                "shortname": self.shortname,
+                "longname": self.longname,
+                "descriptions": self.descriptions,
+                "keywords": self.keywords,
+                "lists": self.lists,
+                "ontologies": self.ontologies
+            }
+        }
+
+    @classmethod
+    def fromJson(cls, data: dict) -> "Project":
+        project = cls()
+        project.prefixes = data["prefixes"]
+        projectData = data["project"]
+        project.shortcode = projectData["shortcode"]
+        project.shortname = projectData["shortname"]
+        project.longname = projectData["longname"]
+        project.descriptions = projectData["descriptions"]
+        project.keywords = projectData["keywords"]
+        project.lists = [ListNode.fromJson(lst) for lst in projectData["lists"]]
+        project.ontologies = [Ontology.fromJson(ontology) for ontology in projectData["ontologies"]]
+        return project
+
+
+def modelJson(value):
+    """
+    Default of the JSON encoders for model objects: a Project or Ontology becomes a dict whose lists, ontologies,
+    properties and resources are still model objects, so the encoder converts them one at a time.
+    """
+    if hasattr(value, "jsonParts"):
+        return value.jsonParts()
+    if hasattr(value, "toJson"):
+        return value.toJson()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def jsonHash(value) -> str:
+    """
+    sha256 of the compact JSON of value (no whitespace, keys in the order of writeJson), encoded chunk by chunk.
+    The same as JsonReader.hash() of a file that writeJson wrote from value, whatever its indentation.
+    :param value: model object or JSON value that may contain model objects
+    """
+    digest = hashlib.sha256()
+    for chunk in json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=modelJson).iterencode(value):
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def writeJson(value, file: TextIO, indent: Optional[int] = 4, level: int = 0):
+    """
+    Write value as JSON into file, section by section: model objects are converted and serialized one at a time,
+    so the complete document is never built as one string. The output is the same as json.dump(value.toJson(), file,
+    indent=indent); indent None writes compact JSON without any whitespace. JsonReader reads it back section by section.
+    :param value: model object (Project, Ontology, ...) or JSON value that may contain model objects
+    :param level: nesting level of value, for the indentation
+    """
+    separators = (",", ": ") if indent is not None else (",", ":")
+    if hasattr(value, "jsonParts"):
+        value = value.jsonParts()
+    elif hasattr(value, "toJson"):
+        value = value.toJson()
+    if not isinstance(value, (dict, list)) or not value or not any(
+            hasattr(item, "toJson") or isinstance(item, (dict, list)) for item in (value.values() if isinstance(value, dict) else value)):
+        # nothing to stream inside, serialize as a whole
+        text = json.dumps(value, indent=indent, separators=separators)
+        file.write(text.replace("\n", "\n" + " " * (indent * level)) if indent is not None else text)
+        return
+
+    newline = "\n" + " " * (indent * (level + 1)) if indent is not None else ""
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    file.write("{" if isinstance(value, dict) else "[")
+    for position, (key, item) in enumerate(items):
+        file.write((separators[0] if position else "") + newline)
+        if isinstance(value, dict):
+            file.write(json.dumps(key) + separators[1])
+        writeJson(item, file, indent, level + 1)
+    file.write(("\n" + " " * (indent * level) if indent is not None else "") + ("}" if isinstance(value, dict) else "]"))
+
+
+class JsonReader:
+    """
+    Reads a JSON document from a file piece by piece, the counterpart of writeJson. members() and elements() step
+    through an object or array, value() reads the next complete value; only the part of the file that holds the
+    value being read is in memory. After every key of members() and every step of elements() the caller reads the
+    value, with value() or by stepping into it.
+    """
+
+    decoder = json.JSONDecoder()
+    whitespace = " \t\n\r"
+    numberCharacters = "0123456789+-.eE"
+
+    def __init__(self, file: TextIO, blockSize: int = 64 * 1024):
+        self.file = file
+        self.blockSize = blockSize
+        self.buffer = ""
+        self.position = 0
+        self.atEnd = False
+
+    # Read more of the file into the buffer (at least as much as is buffered, so a long value is read in a few
+    # steps); what was read already is dropped. False at the end of the file
+    def fill(self) -> bool:
+        block = self.file.read(max(self.blockSize, len(self.buffer) - self.position)) if not self.atEnd else ""
+        if not block:
+            self.atEnd = True
+            return False
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+        return True
+
+    # The next character that is not whitespace ("" at the end of the file)
+    def peek(self) -> str:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in self.whitespace:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters} at {character or 'the end of the file'}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """
+        :return: the next complete value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # the value may go on in the rest of the file
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the buffer may go on in the rest of the file as well
+            if isinstance(value, (int, float)) and not self.buffer[end:].strip(self.numberCharacters) and self.fill():
+                continue
+            self.position = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """
+        Step through the object that comes next.
+        :return: its keys
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def elements(self) -> Iterator[int]:
+        """
+        Step through the array that comes next.
+        :return: the positions of its elements
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        position = 0
+        while True:
+            yield position
+            if self.expect(",]") == "]":
+                return
+            position += 1
+
+    def copy(self, write: Callable[[str], None]):
+        # Write the next value as compact JSON, container by container
+        character = self.peek()
+        if character == "{":
+            write("{")
+            for position, key in enumerate(self.members()):
+                write(("," if position else "") + json.dumps(key, ensure_ascii=False) + ":")
+                self.copy(write)
+            write("}")
+        elif character == "[":
+            write("[")
+            for position in self.elements():
+                write("," if position else "")
+                self.copy(write)
+            write("]")
+        else:
+            write(json.dumps(self.value(), ensure_ascii=False))
+
+    def hash(self) -> str:
+        """
+        :return: sha256 of the compact JSON of the next value (see jsonHash)
+        """
+        digest = hashlib.sha256()
+        self.copy(lambda text: digest.update(text.encode("utf-8")))
+        return digest.hexdigest()
@@ -0,0 +1,216 @@
+from typing import List, Optional, Tuple
+import copy
+import json
+import sys
+
+try:
+    import jsonschema
+except ImportError:  # optional, without it only the references are checked
+    jsonschema = None
+
+# Properties of knora-base that cardinalities may use without prefix
+knoraProperties = {"isPartOf", "seqnum", "hasColor", "hasComment", "hasGeometry", "hasLinkTo", "hasValue"}
+
+# Arrays of the document whose elements are checked one at a time (None: every element of an array)
+sections = (("project", "lists"), ("project", "ontologies", None, "properties"), ("project", "ontologies", None, "resources"))
+
+
+# Elements of a document can be model objects (see OntologyModel), they are converted when they are checked
+def jsonOf(element):
+    return element.toJson() if hasattr(element, "toJson") else element
+
+
+def partsOf(element):
+    return element.jsonParts() if hasattr(element, "jsonParts") else element
+
+
+def nameOf(element) -> str:
+    return element.name if hasattr(element, "toJson") else element["name"]
+
+
+class OntologyValidationError(ValueError):
+    """Raised when an extracted model does not pass the OntologyValidator."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__(f"{len(problems)} problem(s) in the extracted model")
+        self.problems = problems
+
+
+class OntologyValidator:
+    """
+    Validates dsp-tools ontology documents and Project models.
+
+    The JSON schema validator is compiled once (needs the optional jsonschema package) and reused for
+    every document. The lists, properties and resources are checked one at a time against their item schema and
+    the rest of the document without them, so a Project is converted element by element, never as a whole.
+    The reference checks work without it: every cardinality names a property, every
+    hlist attribute an existing list and every link property an existing resource class; objects must
+    not be empty or the ":LinkValue" fallback of the Converter.
+    Problems are errors; references into ontologies outside the project can not be checked and are warnings.
+    """
+
+    def __init__(self, schema: dict = None):
+        self.validator = None
+        if schema is not None and jsonschema is not None:
+            validatorClass = jsonschema.validators.validator_for(schema)
+            validatorClass.check_schema(schema)
+            self.validator = validatorClass(schema)
+            # validators of the elements of the sections, and of the document around them (any element is valid)
+            self.elementValidators = {}
+            skeletonSchema = copy.deepcopy(schema)
+            for section in sections:
+                arraySchema = self.subschema(schema, section)
+                if arraySchema is not None and "items" in arraySchema:
+                    self.elementValidators[section] = self.validator.evolve(schema=arraySchema["items"])
+                    self.subschema(skeletonSchema, section)["items"] = {}
+            self.skeletonValidator = validatorClass(skeletonSchema)
+
+    @staticmethod
+    def subschema(schema: dict, path: tuple) -> Optional[dict]:
+        # Schema of the value at path (None: the items of an array), following local references. None if the
+        # schema does not describe it with properties and items
+        def resolve(node):
+            while isinstance(node, dict) and "$ref" in node and "properties" not in node and "items" not in node:
+                if not node["$ref"].startswith("#/"):
+                    return None
+                target = schema
+                for part in node["$ref"][2:].split("/"):
+                    target = target.get(part.replace("~1", "/").replace("~0", "~")) if isinstance(target, dict) else None
+                node = target
+            return node if isinstance(node, dict) else None
+
+        node = resolve(schema)
+        for key in path:
+            if node is None:
+                return None
+            node = resolve(node.get("items") if key is None else node.get("properties", {}).get(key))
+        return node
+
+    def schemaProblems(self, document) -> List[str]:
+        if self.validator is None:
+            return []
+        problems = []
+
+        def check(validator, instance, path: list):
+            problems.extend((path + list(error.absolute_path), error.message) for error in validator.iter_errors(instance))
+
+        def skeleton(container, key: str, section: tuple, path: list):
+            # container without the elements of its array key, which are checked one at a time
+            elements = container.get(key) if isinstance(container, dict) else None
+            if not isinstance(elements, list):
+                return container
+            if section not in self.elementValidators:
+                return dict(container, **{key: [jsonOf(element) for element in elements]})
+            for position, element in enumerate(elements):
+                check(self.elementValidators[section], jsonOf(element), path + [key, position])
+            # numbers as placeholders, so the array keeps its length and its items stay unique
+            return dict(container, **{key: list(range(len(elements)))})
+
+        document = partsOf(document)
+        project = skeleton(document.get("project") if isinstance(document, dict) else None, "lists", sections[0], ["project"])
+        if isinstance(project, dict) and isinstance(project.get("ontologies"), list):
+            ontologies = []
+            for position, ontology in enumerate(project["ontologies"]):
+                ontology = partsOf(ontology)
+                for key, section in (("properties", sections[1]), ("resources", sections[2])):
+                    ontology = skeleton(ontology, key, section, ["project", "ontologies", position])
+                ontologies.append(ontology)
+            project = dict(project, ontologies=ontologies)
+        check(self.skeletonValidator, dict(document, project=project) if project is not None else document, [])
+        return [f'{"/".join(str(part) for part in path) or "(document)"}: {message}'
+                for path, message in sorted(problems, key=lambda problem: problem[0])]
+
+    @staticmethod
+    def referenceProblems(document) -> Tuple[List[str], List[str]]:
+        errors, warnings = [], []
+        document = partsOf(document)
+        project = document["project"]
+        ontologies = {ontology["name"]: ontology for ontology in map(partsOf, project.get("ontologies", []))}
+        prefixes = set(document.get("prefixes", {}))
+        lists = {nameOf(lst) for lst in project.get("lists", [])}
+
+        def qualify(name: str, ontology: str):
+            # "x" -> knora-base, ":x" -> own ontology, "prefix:x" -> other ontology
+            if ":" not in name:
+                return None, name
+            prefix, localName = name.split(":", 1)
+            return prefix or ontology, localName
+
+        for ontologyName, ontology in ontologies.items():
+            properties = {nameOf(prop) for prop in ontology.get("properties", [])}
+            resources = {nameOf(resource) for resource in ontology.get("resources", [])}
+
+            def known(prefix: str, localName: str, kind: str, where: str) -> bool:
+                if prefix in ontologies:
+                    names = {nameOf(element) for element in ontologies[prefix].get(kind, [])} \
+                        if prefix != ontologyName else (properties if kind == "properties" else resources)
+                    if localName not in names:
+                        errors.append(f"{where}: {prefix}:{localName} does not exist")
+                    return True
+                if prefix not in prefixes:
+                    warnings.append(f"{where}: prefix {prefix} of {prefix}:{localName} is not declared")
+                return False
+
+            for resource in map(jsonOf, ontology.get("resources", [])):
+                where = f'{ontologyName}:{resource["name"]}'
+                for cardinality in resource.get("cardinalities", []):
+                    prefix, localName = qualify(cardinality["propname"], ontologyName)
+                    if prefix is None:
+                        if localName not in knoraProperties:
+                            errors.append(f"{where}: cardinality of unknown property {localName}")
+                    else:
+                        known(prefix, localName, "properties", f"{where} cardinality")
+
+            for prop in map(jsonOf, ontology.get("properties", [])):
+                where = f'{ontologyName}:{prop["name"]}'
+                obj = prop.get("object", "")
+                if obj in ("", ":LinkValue"):
+                    errors.append(f'{where}: object is "{obj}"')
+                elif "hasLinkTo" in prop.get("super", []) or obj.startswith(":"):
+                    prefix, localName = qualify(obj, ontologyName)
+                    known(prefix, localName, "resources", f"{where} link target")
+                for superProperty in prop.get("super", []):
+                    prefix, _ = qualify(superProperty, ontologyName)
+                    if prefix is not None and prefix not in prefixes and prefix not in ontologies:
+                        errors.append(f"{where}: prefix {prefix} of super property {superProperty} is not declared")
+                hlist = (prop.get("gui_attributes") or {}).get("hlist")
+                if hlist is not None and hlist not in lists:
+                    errors.append(f"{where}: hlist {hlist} does not exist")
+
+        return errors, warnings
+
+    def validate(self, document) -> Tuple[List[str], List[str]]:
+        """
+        :param document: dsp-tools ontology document or Project
+        :return: errors and warnings
+        """
+        errors, warnings = self.referenceProblems(document)
+        return self.schemaProblems(document) + errors, warnings
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate extracted dsp-tools ontology files.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--schema", help="dsp-tools ontology JSON schema (default: only check the references)")
+    args = parser.parse_args()
+
+    schema = None
+    if args.schema:
+        with open(args.schema) as f:
+            schema = json.load(f)
+        if jsonschema is None:
+            print("jsonschema is not installed, only the references are checked")
+    validator = OntologyValidator(schema)
+
+    valid = True
+    for path in args.files:
+        with open(path) as f:
+            errors, warnings = validator.validate(json.load(f))
+        for problem in errors:
+            print(f"{path}: ERROR {problem}")
+        for problem in warnings:
+            print(f"{path}: WARNING {problem}")
+        valid = valid and not errors
+    sys.exit(0 if valid else 1)
@@ -0,0 +1,144 @@
+from urllib.parse import urlencode
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class CachedResponse:
+    """
+    Response replayed from the ResponseCache. Offers the parts of requests.Response the converter uses.
+    """
+
+    def __init__(self, url: str, text: str, status_code: int = 200, fromCache: bool = True):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.fromCache = fromCache
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a request has no entry in the cache."""
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of API responses, keyed by url + query parameters.
+
+    Every entry is a small JSON file named after the sha256 of its key. Entries older than ttl
+    seconds are not served (except in offline mode). When the cache grows beyond maxSize bytes,
+    entries not used within ttl and then the least recently used ones are removed, down to evictionTarget
+    of maxSize, so the directory is only scanned once per batch of writes. Files are written
+    atomically, so several processes can share one cache directory.
+    """
+
+    # Fraction of maxSize the cache is reduced to by an eviction
+    evictionTarget = 0.9
+
+    def __init__(self, directory: str = ".salsah_cache", ttl: float = 7 * 24 * 3600, maxSize: int = 200 * 1024 * 1024):
+        """
+        :param directory: folder of the cache entries (created if missing)
+        :param ttl: time to live of an entry in seconds
+        :param maxSize: maximum size of all entries in bytes
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self.entries())
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        if params:
+            url = url + ("&" if "?" in url else "?") + urlencode(sorted(params.items()))
+        return url
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def entries(self):
+        return (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json") and entry.is_file())
+
+    def load(self, url: str, params: dict = None, ignoreTtl: bool = False):
+        """
+        :return: the CachedResponse of the request or None if there is no (valid) entry
+        """
+        key = self.key(url, params)
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["key"] != key or (not ignoreTtl and time.time() - entry["fetched"] > self.ttl):
+            return None
+        # remember the access for the least recently used eviction
+        os.utime(path)
+        return CachedResponse(entry["url"], entry["text"], entry["status"])
+
+    def store(self, url: str, params: dict, response):
+        key = self.key(url, params)
+        entry = {
+            "key": key,
+            "url": response.url,
+            "status": response.status_code,
+            "fetched": time.time(),
+            "text": response.text
+        }
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        size = os.path.getsize(tmpPath)
+        path = self.path(key)
+        with self.lock:
+            # an entry that is replaced does not count any more
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmpPath, path)
+            self.size += size
+            if self.size > self.maxSize:
+                self.evict()
+
+    def evict(self):
+        """
+        Remove entries not used within ttl, then the least recently used ones until the cache fits into
+        evictionTarget * maxSize.
+        """
+        now = time.time()
+        entries = []
+        for entry in self.entries():
+            stat = entry.stat()
+            if now - stat.st_mtime > self.ttl:
+                self.remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self.size <= self.evictionTarget * self.maxSize:
+                break
+            self.remove(path)
+            self.size -= size
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already removed by another process
+
+    def clear(self):
+        for entry in self.entries():
+            self.remove(entry.path)
+        self.size = 0
@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import math
+import threading
+import time
+
+
+class RunProfile:
+    """
+    Instrumentation of an extraction run.
+
+    Records every request per endpoint family (resourcetypes, selections, hlists, projects,
+    vocabularies; everything else is "other") with its latency, response size, whether it was
+    answered from the cache and how many retries it needed, plus the duration of every stage.
+    The latencies are round trips to the server, cache hits are only counted.
+    report() summarizes everything as a JSON serializable dict.
+    """
+
+    families = ("resourcetypes", "selections", "hlists", "projects", "vocabularies")
+
+    def __init__(self):
+        self.requests: dict = {}
+        self.stages: dict = {}
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    @classmethod
+    def family(cls, url: str) -> str:
+        parts = urlsplit(url).path.strip("/").split("/")
+        if len(parts) > 1 and parts[0] == "api" and parts[1] in cls.families:
+            return parts[1]
+        return "other"
+
+    def entry(self, family: str) -> dict:
+        if family not in self.requests:
+            self.requests[family] = {"calls": 0, "cache_hits": 0, "retries": 0, "bytes": 0, "latencies": []}
+        return self.requests[family]
+
+    def recordRequest(self, url: str, seconds: float, size: int, fromCache: bool):
+        with self.lock:
+            entry = self.entry(self.family(url))
+            entry["calls"] += 1
+            entry["cache_hits"] += fromCache
+            entry["bytes"] += size
+            if not fromCache:
+                entry["latencies"].append(seconds)
+
+    def recordRetry(self, url: str):
+        with self.lock:
+            self.entry(self.family(url))["retries"] += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @staticmethod
+    def percentile(values: list, p: float) -> float:
+        # nearest-rank percentile of sorted values: the smallest value with at least p percent of the values <= it
+        index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+        return values[index]
+
+    def report(self) -> dict:
+        requests = {}
+        with self.lock:
+            for family, entry in sorted(self.requests.items()):
+                latencies = sorted(entry["latencies"])
+                requests[family] = {
+                    "calls": entry["calls"],
+                    "cache_hits": entry["cache_hits"],
+                    "retries": entry["retries"],
+                    "bytes": entry["bytes"],
+                    # None if no request of the family reached the server (cache hits only, or only failed retries)
+                    "latency_ms": {
+                        "p50": round(self.percentile(latencies, 50) * 1000, 2),
+                        "p90": round(self.percentile(latencies, 90) * 1000, 2),
+                        "p99": round(self.percentile(latencies, 99) * 1000, 2),
+                        "max": round(latencies[-1] * 1000, 2),
+                        "total": round(sum(latencies) * 1000, 2)
+                    } if latencies else None
+                }
+        return {
+            "seconds": round(time.perf_counter() - self.start, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "requests": requests,
+            "totals": {
+                "calls": sum(entry["calls"] for entry in requests.values()),
+                "cache_hits": sum(entry["cache_hits"] for entry in requests.values()),
+                "retries": sum(entry["retries"] for entry in requests.values()),
+                "bytes": sum(entry["bytes"] for entry in requests.values())
+            }
+        }
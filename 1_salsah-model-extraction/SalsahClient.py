@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from ResponseCache import ResponseCache, CacheMissError
+from RunProfile import RunProfile
+import copy
+import requests
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly so that at most rate requests per second are started (shared by all threads).
+    A rate of 0 or None disables the limit.
+    """
+
+    def __init__(self, rate: float = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.nextSlot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.nextSlot)
+            self.nextSlot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SalsahClient:
+    """
+    HTTP client used for every request of a Converter run.
+
+    All requests go through one requests.Session, so connections to the SALSAH server are
+    kept alive and reused from a connection pool instead of opening a new TCP+TLS connection
+    per call. Connection errors, timeouts and transient server errors (429, 5xx) are retried
+    with exponential backoff and full jitter; the delay of attempt n is a random value between
+    0 and min(maxBackoff, backoff * 2^n). A Retry-After header of the server takes precedence.
+
+    With a ResponseCache, successful responses are stored on disk and replayed on later runs.
+    In offline mode every request is answered from the cache (CacheMissError if an entry is
+    missing), in refresh mode the cache is not read but updated with the fresh responses.
+
+    getJsonAll fetches a batch of urls concurrently with at most maxInFlight requests at a time,
+    and never starts more than rateLimit requests per second on the server. Cache hits are not
+    rate limited. The results are returned in the order of the urls.
+
+    Every request is recorded in the RunProfile of the client (latency, size, cache hit, retries).
+    """
+
+    retryStatus = {429, 500, 502, 503, 504}
+
+    def __init__(self, timeout: float = 10.0, readTimeout: float = 60.0, retries: int = 5,
+                 backoff: float = 0.5, maxBackoff: float = 30.0, poolSize: int = 10,
+                 cache: ResponseCache = None, offline: bool = False, refresh: bool = False,
+                 maxInFlight: int = 8, rateLimit: float = 20.0, profile: RunProfile = None):
+        """
+        :param timeout: seconds to wait for a connection to be established
+        :param readTimeout: seconds to wait for the server to send data
+        :param retries: number of retries after the first attempt failed
+        :param backoff: base delay (seconds) of the exponential backoff
+        :param maxBackoff: upper limit (seconds) of a single backoff delay
+        :param poolSize: number of connections kept alive per host
+        :param cache: optional response cache
+        :param offline: answer all requests from the cache, never touch the network
+        :param refresh: bypass the cache when reading, but store the fresh responses
+        :param maxInFlight: maximum number of concurrent requests of getJsonAll
+        :param rateLimit: maximum number of requests per second sent to the server (0: no limit)
+        :param profile: instrumentation of the requests (a new one if not given)
+        """
+        if offline and (cache is None or refresh):
+            raise ValueError("offline mode needs a cache and cannot be combined with refresh")
+        self.timeout = (timeout, readTimeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.cache = cache
+        self.offline = offline
+        self.refresh = refresh
+        self.maxInFlight = max(1, maxInFlight)
+        self.rateLimiter = RateLimiter(rateLimit)
+        self.profile = profile if profile is not None else RunProfile()
+
+        self.session = requests.Session()
+        # retries are handled in fetch(), so the adapter must not retry on its own
+        poolSize = max(poolSize, self.maxInFlight)
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, params: dict = None):
+        """
+        GET the given url, from the cache if possible. Retries transient failures and raises
+        the last error (requests.RequestException) if all attempts failed.
+        :param url: url to fetch
+        :param params: optional query parameters
+        :return: the successful response (requests.Response or CachedResponse)
+        """
+        start = time.perf_counter()
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.load(url, params, ignoreTtl=self.offline)
+            if cached is not None:
+                self.profile.recordRequest(url, time.perf_counter() - start, len(cached.content), True)
+                return cached
+        if self.offline:
+            raise CacheMissError(f"No cached response for {ResponseCache.key(url, params)} (offline mode)")
+
+        response = self.fetch(url, params)
+        if self.cache is not None:
+            self.cache.store(url, params, response)
+        return response
+
+    def uncached(self) -> "SalsahClient":
+        """
+        :return: client sharing the session, rate limit and profile of this one, but neither reading nor storing
+        cache entries (for responses that are not worth keeping, e.g. the resources of a data export)
+        """
+        client = copy.copy(self)
+        client.cache = None
+        return client
+
+    def fetch(self, url: str, params: dict = None) -> requests.Response:
+        for attempt in range(self.retries + 1):
+            retryAfter = None
+            self.rateLimiter.wait()
+            try:
+                start = time.perf_counter()
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code not in self.retryStatus:
+                    response.raise_for_status()
+                    # latency of the successful round trip (without rate limiting and backoff)
+                    self.profile.recordRequest(url, time.perf_counter() - start, len(response.content), False)
+                    return response
+                retryAfter = self.retryAfter(response)
+                error = requests.HTTPError(f"{response.status_code} Server Error for url: {response.url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise error
+            self.profile.recordRetry(url)
+            time.sleep(retryAfter if retryAfter is not None else self.backoffDelay(attempt))
+
+    def getJson(self, url: str, params: dict = None):
+        return self.get(url, params).json()
+
+    def getJsonAll(self, urls: list, params: dict = None) -> list:
+        """
+        Fetch several urls concurrently (bounded by maxInFlight).
+        :param urls: urls to fetch
+        :param params: optional query parameters used for every url
+        :return: the decoded JSON responses in the same order as urls
+        """
+        return self.map(lambda url: self.getJson(url, params), urls)
+
+    def map(self, function, items: list) -> list:
+        """
+        Call function (which does requests with this client) for every item concurrently (bounded by maxInFlight).
+        :return: the results in the same order as items
+        """
+        if len(items) <= 1 or self.maxInFlight == 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.maxInFlight, len(items))) as executor:
+            return list(executor.map(function, items))
+
+    def backoffDelay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.maxBackoff, self.backoff * 2 ** attempt))
+
+    def retryAfter(self, response: requests.Response):
+        """
+        Parse the Retry-After header (seconds or HTTP date) of a response.
+        :return: delay in seconds (capped by maxBackoff) or None if the header is missing or invalid
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.maxBackoff, max(0.0, delay))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,286 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO
+from xml.etree import ElementTree
+from SalsahModelToJson import Converter, selectProjects
+from SalsahClient import SalsahClient
+from ResponseCache import ResponseCache
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Namespace of the dsp-tools XML import format
+xmlNamespace = "https://dasch.swiss/schema"
+
+# Default permissions of resources and values in the import
+permissionsXml = """    <permissions id="res-default">
+        <allow group="UnknownUser">V</allow>
+        <allow group="KnownUser">V</allow>
+        <allow group="ProjectMember">D</allow>
+        <allow group="ProjectAdmin">CR</allow>
+    </permissions>
+    <permissions id="prop-default">
+        <allow group="UnknownUser">V</allow>
+        <allow group="KnownUser">V</allow>
+        <allow group="ProjectMember">D</allow>
+        <allow group="ProjectAdmin">CR</allow>
+    </permissions>
+"""
+
+
+class DataExporter:
+    """
+    Exports the resources (instances of the resource types) of a SALSAH project into a dsp-tools XML import file.
+
+    Works on the converter of an extraction run (Converter.extractRun), so resource classes, property names and
+    list nodes are named exactly as in the extracted ontology; values are mapped with Converter.objectMap.
+    The resources of every resource type are paged through with /api/search and every page is fetched with the
+    client's bounded concurrency, converted and written before the next page is fetched: memory stays constant
+    however many resources there are. Resources and search pages bypass the response cache; they would fill it
+    and push out the model responses that offline extractions depend on.
+    """
+
+    # Value types (Converter.objectMap) -> dsp-tools XML property and value elements
+    valueElements: Dict[str, str] = {
+        "TextValue": "text",
+        "DateValue": "date",
+        "TimeValue": "time",
+        "DecimalValue": "decimal",
+        "GeonameValue": "geoname",
+        "IntValue": "integer",
+        "ColorValue": "color",
+        "BooleanValue": "boolean",
+        "UriValue": "uri",
+        "IntervalValue": "interval",
+        "ListValue": "list",
+        "LinkValue": "resptr"
+    }
+
+    def __init__(self, run: Converter, project: dict, pageSize: int = 100):
+        """
+        :param run: converter of the extraction run of the project
+        :param pageSize: number of resources fetched per search request
+        """
+        self.run = run
+        self.project = project
+        self.pageSize = pageSize
+        self.client: SalsahClient = run.client.uncached()
+        # Per vocabulary of the project: SALSAH property (vocabulary:name) -> (DSP property name, value type, list name)
+        self.properties: Dict[str, Dict[str, tuple]] = {}
+        # Resource types of the project: id -> DSP resource class name and vocabulary
+        self.resourceClasses: Dict[str, tuple] = {}
+        # Properties without mapping (SALSAH name -> number of values skipped)
+        self.skipped: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+
+        for vocabulary in run.vocabulariesOf(project):
+            # names in the default ontology (the first one) are written as ":name", all others as "ontology:name"
+            prefix = "" if vocabulary["shortname"] == run.model.ontologies[0].name else vocabulary["shortname"]
+            properties = self.properties.setdefault(vocabulary["shortname"], {})
+            for resourceTypeId, resTypeInfo in run.getResourceTypes(vocabulary).items():
+                resourceClass = prefix + ":" + run.names.resourceName(resTypeInfo["name"])
+                self.resourceClasses[resourceTypeId] = (resourceClass, vocabulary["shortname"])
+                for property in resTypeInfo["properties"]:
+                    if "vt_name" in property:
+                        propertyName = run.names.cardinalityName(vocabulary["shortname"], property)
+                        properties[f'{property["vocabulary"]}:{property["name"]}'] = (
+                            prefix + propertyName if propertyName.startswith(":") else propertyName,
+                            run.objectMap.get(property["vt_name"]),
+                            self.listName(property.get("attributes"))
+                        )
+
+    def listName(self, attributes: Optional[str]) -> Optional[str]:
+        for attribute in (attributes or "").split(";"):
+            key, _, value = attribute.partition("=")
+            if key == "selection":
+                return self.run.selection_mapping.get(value, value)
+            if key == "hlist":
+                return self.run.hlist_mapping.get(value, value)
+        return None
+
+    # ==================================================================================================================
+    # Paging through the resources
+    def resourceIds(self, resourceTypeId: str) -> Iterator[List[str]]:
+        """
+        :return: the ids of the resources of a resource type, page by page
+        """
+        start = 0
+        while True:
+            result = self.client.getJson(f'{self.run.serverpath}/api/search/', params={
+                "searchtype": "extended",
+                "filter_by_restype": resourceTypeId,
+                "show_nrows": self.pageSize,
+                "start_at": start
+            })
+            ids = [subject["obj_id"] for subject in result.get("subjects") or []]
+            if not ids:
+                return
+            yield ids
+            start += len(ids)
+            if start >= int(result.get("nhits") or 0):
+                return
+
+    def fetchResource(self, resourceId: str) -> dict:
+        return self.client.getJson(f'{self.run.serverpath}/api/resources/{resourceId}')
+
+    # ==================================================================================================================
+    # Mapping of resources and values
+    @staticmethod
+    def resourceXmlId(resourceId) -> str:
+        return f"res_{resourceId}"
+
+    @staticmethod
+    def assetName(resourceId, location: dict) -> str:
+        # file name of the file of a representation (AssetDownloader downloads it under this name)
+        return f'{resourceId}_{os.path.basename(location["origname"])}'
+
+    @staticmethod
+    def dateValue(value) -> str:
+        # SALSAH dates have a calendar and a start and end date, e.g. GREGORIAN:CE:1913-05-01:CE:1913-05-31
+        if not isinstance(value, dict):
+            return str(value)
+        start, end = value.get("dateval1"), value.get("dateval2")
+        result = f'{value.get("calendar", "GREGORIAN")}:CE:{start}'
+        return result + f":CE:{end}" if end and end != start else result
+
+    def listNodeName(self, value) -> str:
+        # list nodes are named S_<id> (selections) and H_<id> (hlists) in the ontology
+        nodeId = str(value)
+        return ("S_" if nodeId in self.run.selection_node_mapping else "H_") + nodeId
+
+    def valueText(self, valueType: str, value) -> str:
+        if valueType == "TextValue":
+            return value.get("utf8str", "") if isinstance(value, dict) else str(value)
+        if valueType == "DateValue":
+            return self.dateValue(value)
+        if valueType == "ListValue":
+            return self.listNodeName(value)
+        if valueType == "LinkValue":
+            return self.resourceXmlId(value)
+        return str(value)
+
+    def resourceElement(self, resource: dict, resourceClass: str, vocabularyName: str) -> ElementTree.Element:
+        resinfo = resource.get("resinfo") or {}
+        resourceId = (resource.get("resdata") or {}).get("res_id")
+        element = ElementTree.Element("resource", {
+            "label": str(resinfo.get("firstproperty") or resourceId),
+            "restype": resourceClass,
+            "id": self.resourceXmlId(resourceId),
+            "permissions": "res-default"
+        })
+
+        # the file of a representation
+        location = resinfo.get("locdata")
+        if location and location.get("origname"):
+            ElementTree.SubElement(element, "bitstream").text = os.path.join("assets", self.assetName(resourceId, location))
+
+        for salsahName, prop in (resource.get("props") or {}).items():
+            values = [value for value in prop.get("values") or [] if value not in (None, "")]
+            if not values:
+                continue
+            propertyName, valueType, listName = self.properties[vocabularyName].get(salsahName, (None, None, None))
+            if propertyName is None or valueType not in self.valueElements or propertyName == "__location__":
+                self.skipped[salsahName] = self.skipped.get(salsahName, 0) + len(values)
+                continue
+            if propertyName == "seqnum":
+                valueType = "IntValue"
+            tag = self.valueElements[valueType]
+            propElement = ElementTree.SubElement(element, f"{tag}-prop", {"name": propertyName})
+            if valueType == "ListValue" and listName is not None:
+                propElement.set("list", listName)
+            for value in values:
+                valueElement = ElementTree.SubElement(propElement, tag, {"permissions": "prop-default"})
+                if valueType == "TextValue":
+                    valueElement.set("encoding", "utf8")
+                valueElement.text = self.valueText(valueType, value)
+        return element
+
+    # ==================================================================================================================
+    def export(self, xmlFile: TextIO):
+        """
+        Write the XML import of all resources of the project into xmlFile, resource by resource.
+        """
+        xmlFile.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        xmlFile.write(f'<knora xmlns="{xmlNamespace}" shortcode="{self.run.model.shortcode}" '
+                      f'default-ontology="{self.run.model.ontologies[0].name}">\n')
+        xmlFile.write(permissionsXml)
+        for resourceTypeId, (resourceClass, vocabularyName) in self.resourceClasses.items():
+            self.counts[resourceClass] = 0
+            for ids in self.resourceIds(resourceTypeId):
+                # one page at a time, fetched concurrently (the client keeps the order)
+                for resource in self.client.map(self.fetchResource, ids):
+                    element = self.resourceElement(resource, resourceClass, vocabularyName)
+                    ElementTree.indent(element, "    ", 1)
+                    xmlFile.write("    " + ElementTree.tostring(element, encoding="unicode") + "\n")
+                    self.counts[resourceClass] += 1
+        xmlFile.write("</knora>\n")
+
+        if self.skipped:
+            print(f"{sum(self.skipped.values())} value(s) of {len(self.skipped)} property/properties without mapping skipped:")
+            for salsahName, count in self.skipped.items():
+                print(f"  {salsahName}: {count}")
+
+
+def exportProject(project: dict, converterOptions: dict, clientOptions: dict, cacheOptions: dict, now: str,
+                  pageSize: int = 100) -> dict:
+    start = time.perf_counter()
+    summary = {"shortname": project["shortname"], "file": None, "resources": 0, "error": None}
+    try:
+        responseCache = ResponseCache(**cacheOptions) if cacheOptions is not None else None
+        converter = Converter(SalsahClient(cache=responseCache, **clientOptions), **converterOptions)
+        exporter = DataExporter(converter.extractRun(project), project, pageSize)
+
+        # written into a temporary file first, an interrupted export leaves no partial import file
+        fileName = project["shortname"] + "_" + now + "_data.xml"
+        fd, tmpPath = tempfile.mkstemp(dir=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as xmlFile:
+                exporter.export(xmlFile)
+            os.replace(tmpPath, fileName)
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+        summary["file"] = fileName
+        summary["resources"] = sum(exporter.counts.values())
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the resources of SALSAH projects into dsp-tools XML import files.")
+    parser.add_argument("projects", nargs="*", default=["6"], metavar="PROJECT",
+                        help='ids or shortnames of the projects to export, "all" for every project (default: 6, Webern)')
+    parser.add_argument("--server", default=Converter.serverpath, help=f"SALSAH server (default: {Converter.serverpath})")
+    parser.add_argument("--shortcodes-url", default=Converter.shortcodesUrl, help="CSV file mapping project shortnames to shortcodes")
+    parser.add_argument("--page-size", type=int, default=100, help="resources per search request (default: 100)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="connect timeout in seconds (default: 10)")
+    parser.add_argument("--read-timeout", type=float, default=60.0, help="read timeout in seconds (default: 60)")
+    parser.add_argument("--retries", type=int, default=5, help="retries of a failed request (default: 5)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="maximum number of concurrent requests (default: 8)")
+    parser.add_argument("--rate-limit", type=float, default=20.0, help="maximum requests per second, 0 for no limit (default: 20)")
+    parser.add_argument("--cache-dir", default=".salsah_cache", help="directory of the response cache (default: .salsah_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the response cache")
+    args = parser.parse_args()
+
+    cacheOptions = None if args.no_cache else {"directory": args.cache_dir}
+    converterOptions = {"serverpath": args.server, "shortcodesUrl": args.shortcodes_url}
+    clientOptions = {"timeout": args.timeout, "readTimeout": args.read_timeout, "retries": args.retries,
+                     "maxInFlight": args.max_in_flight, "rateLimit": args.rate_limit}
+
+    catalogClient = SalsahClient(**clientOptions)
+    selectedProjects = selectProjects(catalogClient.getJson(f'{args.server.rstrip("/")}/api/projects')["projects"], args.projects)
+    now = datetime.today().strftime('%Y%m%d')
+
+    failed = False
+    for project in selectedProjects:
+        summary = exportProject(project, converterOptions, clientOptions, cacheOptions, now, args.page_size)
+        if summary["error"] is None:
+            print(f'{summary["shortname"]}: {summary["resources"]} resource(s) in {summary["seconds"]}s -> {summary["file"]}')
+        else:
+            print(f'{summary["shortname"]}: FAILED {summary["error"]}')
+            failed = True
+    sys.exit(1 if failed else 0)
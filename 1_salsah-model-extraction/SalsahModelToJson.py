@@ -1,13 +1,37 @@
 from datetime import datetime
 from pprint import pprint
-from re import sub, search
-from typing import Dict
-import requests
+from re import search
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+from OntologyModel import Project, Ontology, ResourceClass, Property, Cardinality, ListNode, schemaUrl, writeJson, jsonHash, JsonReader
+from SalsahClient import SalsahClient
+from CheckpointJournal import CheckpointJournal
+from ResponseCache import ResponseCache
+from SnapshotStore import SnapshotStore, canonicalHash
+from OntologyValidator import OntologyValidator, OntologyValidationError
+import argparse
 import copy
+import glob
+import hashlib
 import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Exit status of a run in which no model changed and no file was written
+unchangedStatus = 3
 
 
 class Utils:
+    # Separators of the words of a name, compiled once
+    separatorPattern = re.compile(r"(_|-|\s)+")
+    underscoreHyphenPattern = re.compile(r"(_|-)+")
+
     def camel_case(self, str: str, firstLetterCase = None) -> str:
         """
         Helper function to transform a given string str to camelCase.
@@ -26,9 +50,9 @@ class Utils:
         """
         s = str
         # Look for underscores, hyphens or white space
-        if search(r"(_|-|\s)+", str):
+        if self.separatorPattern.search(str):
             # Convert _ and - to white space
-            s = sub(r"(_|-)+", " ", str)
+            s = self.underscoreHyphenPattern.sub(" ", str)
             # Capitalize first character of a every substring (while keeping case of other letters)
             s = ' '.join(substr[:1].upper() + substr[1:] for substr in s.split(' '))
             # Remove white space
@@ -63,77 +87,334 @@ class Utils:
         return self.camel_case(str, 'upper')
 
 
+class NameRegistry:
+    """
+    Translates the names of SALSAH resource types and properties into the names of the DSP ontology. The ontology
+    (properties, cardinalities, resource classes, link targets) and the data export take all names from the
+    registry of their run, so they cannot disagree. Every translation is computed once per run and memoized.
+
+    Two different SALSAH names that are translated into the same DSP name in the same ontology collide (e.g. the
+    property "dc_title" of a vocabulary and "title" of the vocabulary dc), the ontology would merge them into one.
+    Collisions are recorded in collisions.
+    """
+
+    # SALSAH properties that are replaced by knora-base properties in the cardinalities
+    salsahPropertyMap: Dict[str, str] = {
+        "part_of": "isPartOf",
+        "seqnum": "seqnum",
+        "__location__": "__location__"
+    }
+
+    def __init__(self, utils: Utils = None):
+        self.utils = utils if utils is not None else Utils()
+        # (kind, vocabulary, SALSAH vocabulary, SALSAH name) -> DSP name
+        self.names: Dict[tuple, str] = {}
+        # (kind, ontology, DSP name) -> SALSAH name translated first
+        self.owners: Dict[tuple, str] = {}
+        # Colliding names (description of the collision -> SALSAH names)
+        self.collisions: Dict[str, List[str]] = {}
+
+    def register(self, kind: str, ontology: str, salsahName: str, name: str):
+        owner = self.owners.setdefault((kind, ontology, name), salsahName)
+        if owner != salsahName:
+            salsahNames = self.collisions.setdefault(f'{kind} {ontology}:{name}', [owner])
+            if salsahName not in salsahNames:
+                salsahNames.append(salsahName)
+
+    def propertyName(self, vocabulary: str, property: dict) -> str:
+        """
+        :param vocabulary: shortname of the vocabulary of the ontology
+        :param property: SALSAH property (vocabulary and name)
+        :return: name of the property in the ontology: the name for properties of vocabulary, vocabulary_name for all others
+        """
+        key = ("property", vocabulary, property["vocabulary"], property["name"])
+        name = self.names.get(key)
+        if name is None:
+            propertyVocabulary = property["vocabulary"].lower()
+            if propertyVocabulary == vocabulary.lower():
+                name = property["name"]
+            else:
+                name = propertyVocabulary + "_" + property["name"]
+            self.names[key] = name
+            self.register("property", vocabulary, f'{propertyVocabulary}:{property["name"]}', name)
+        return name
+
+    def cardinalityName(self, vocabulary: str, property: dict) -> str:
+        """
+        :return: name of a SALSAH property in the cardinalities of the ontology of vocabulary (and in the data export):
+        ":name" for properties of that vocabulary, the knora-base property for some SALSAH properties and
+        ":vocabulary_name" for all others
+        """
+        key = ("cardinality", vocabulary, property["vocabulary"], property["name"])
+        name = self.names.get(key)
+        if name is None:
+            propertyVocabulary = property["vocabulary"].lower()
+            if propertyVocabulary != vocabulary.lower() and propertyVocabulary == "salsah" and property["name"] in self.salsahPropertyMap:
+                name = self.salsahPropertyMap[property["name"]]
+            else:
+                name = ":" + self.propertyName(vocabulary, property)
+            self.names[key] = name
+        return name
+
+    def resourceName(self, resourceTypeName: str) -> str:
+        """
+        :param resourceTypeName: name of a SALSAH resource type (vocabulary:name)
+        :return: name of its resource class (UpperCamelCase)
+        """
+        key = ("resource", "", "", resourceTypeName)
+        name = self.names.get(key)
+        if name is None:
+            vocabulary, _, resourceType = resourceTypeName.partition(":")
+            name = self.utils.upper_camel_case(resourceType)
+            self.names[key] = name
+            self.register("resource", vocabulary, resourceTypeName, name)
+        return name
+
+    def linkTarget(self, vocabulary: str, resourceTypeName: str) -> str:
+        """
+        :return: object of a link property of the ontology of vocabulary that points to a resource type: ":Name" for
+        resource types of vocabulary, "vocabulary:Name" for all others
+        """
+        resourceVocabulary = resourceTypeName.partition(":")[0]
+        return ("" if resourceVocabulary == vocabulary else resourceVocabulary) + ":" + self.resourceName(resourceTypeName)
+
+
 class Converter:
+    """
+    Converts the data model of a SALSAH project into the dsp-tools ontology model (OntologyModel.Project).
+
+    Creating a converter does no I/O. The catalogs (projects, vocabularies, shortcodes) are loaded on first use,
+    each one from its source (url, through the client and its response cache, or local file), and are shared by
+    all extractions of a converter; they are indexed once (vocabularies by project, shortcodes by shortname).
+    An extraction loads the vocabularies and shortcodes, the projects catalog only if it is used.
+    Every vocabulary of a project becomes an ontology of its own.
+    Every call of extract() runs on its own shallow copy of the converter with a fresh model and
+    fresh mappings, so one converter can run several extractions (also in parallel threads).
+    """
+    serverpath: str = "https://www.salsah.org"
+    shortcodesUrl: str = "https://raw.githubusercontent.com/dhlab-basel/dasch-ark-resolver-data/master/data/shortcodes.csv"
+    objectMap: Dict[str, str] = {
+        "Text": "TextValue",
+        "Richtext": "TextValue",
+        "Iconclass": "TextValue",
+        "": "ColorValue",
+        "Date": "DateValue",
+        "Time": "TimeValue",
+        "Floating point number": "DecimalValue",
+        "": "GeomValue",
+        "Geoname": "GeonameValue",
+        "Integer value": "IntValue",
+        "": "BooleanValue",
+        "": "UriValue",
+        "": "IntervalValue",
+        "Selection": "ListValue",
+        "Hierarchical list": "ListValue",
+        "Resource pointer": "LinkValue"
+    }  # Dict that maps the old vt-name from salsa to the new Object type from knorapy (also used for the data export)
+
+    def __init__(self, client: SalsahClient = None, serverpath: str = None, shortcodesUrl: str = None, listDir: str = None,
+                 projectsUrl: str = None, vocabulariesUrl: str = None):
+        """
+        :param shortcodesUrl: url or local file of the shortcodes CSV
+        :param listDir: large-list mode, write every list into its own file in this directory
+        :param projectsUrl: url or local file of the projects catalog (default: <serverpath>/api/projects)
+        :param vocabulariesUrl: url or local file of the vocabularies catalog (default: <serverpath>/api/vocabularies)
+        """
+        # Directory of the list files in large-list mode (None: the lists are part of the ontology)
+        self.listDir = listDir
+        if serverpath is not None:
+            self.serverpath = serverpath.rstrip("/")
+        if shortcodesUrl is not None:
+            self.shortcodesUrl = shortcodesUrl
+        # All requests of a run go through this client (connection pooling, timeouts and retries)
+        self.client: SalsahClient = client if client is not None else SalsahClient()
+        self.utils = Utils()
+        self.resetRun()
+
+        # Sources of the catalogs; the loaded catalogs are shared by the runs (shallow copies) of the converter
+        self.projectsUrl = projectsUrl or f'{self.serverpath}/api/projects'
+        self.vocabulariesUrl = vocabulariesUrl or f'{self.serverpath}/api/vocabularies'
+        self.catalogs: dict = {}
+        self.catalogLock = threading.RLock()
 
-    def __init__(self):
-        self.serverpath: str = "https://www.salsah.org"
+    # ==================================================================================================================
+    # Catalogs, loaded on first use
+    def catalog(self, name: str, load):
+        with self.catalogLock:
+            if name not in self.catalogs:
+                self.catalogs[name] = load()
+            return self.catalogs[name]
+
+    # Drop the loaded catalogs, they are loaded again on next use
+    def resetCatalogs(self):
+        with self.catalogLock:
+            self.catalogs.clear()
+
+    # Text of a catalog source: a url (fetched through the client) or a local file
+    def readSource(self, source: str) -> str:
+        if urlsplit(source).scheme in ("http", "https"):
+            return self.client.get(source).text
+        with open(source, encoding="utf-8") as f:
+            return f.read()
+
+    @property
+    def salsahJson(self) -> dict:
+        return self.catalog("projects", lambda: json.loads(self.readSource(self.projectsUrl)))
+
+    @property
+    def salsahVocabularies(self) -> dict:
+        return self.catalog("vocabularies", lambda: json.loads(self.readSource(self.vocabulariesUrl)))
+
+    # Vocabularies of every project (project id -> vocabularies in the order of the listing)
+    @property
+    def projectVocabularies(self) -> Dict[str, List[dict]]:
+        def load():
+            projectVocabularies: Dict[str, List[dict]] = {}
+            for vocabulary in self.salsahVocabularies["vocabularies"]:
+                projectVocabularies.setdefault(vocabulary["project_id"], []).append(vocabulary)
+            return projectVocabularies
+        return self.catalog("projectVocabularies", load)
+
+    # Knora project shortcodes (project shortname -> shortcode). Using https://raw.githubusercontent.com/dhlab-basel/dasch-ark-resolver-data/master/data/shortcodes.csv
+    @property
+    def shortcodes(self) -> Dict[str, str]:
+        def load():
+            shortcodes: Dict[str, str] = {}
+            for line in self.readSource(self.shortcodesUrl).split('\n'):
+                parts = line.split(',')
+                if len(parts) > 1:
+                    shortcodes[parts[1]] = parts[0]
+            return shortcodes
+        return self.catalog("shortcodes", load)
+
+    # Options of the converter that change the extracted model (a checkpoint journal is only resumed with the same ones)
+    def runIdentity(self) -> dict:
+        return {"shortcodesUrl": self.shortcodesUrl, "projectsUrl": self.projectsUrl,
+                "vocabulariesUrl": self.vocabulariesUrl, "listDir": self.listDir}
+
+    # State of a single extraction
+    def resetRun(self, journal: CheckpointJournal = None):
+        # The model of the project that is extracted
+        self.model: Project = Project()
         self.selection_mapping: Dict[str, str] = {}
         self.selection_node_mapping: Dict[str, str] = {}
         self.hlist_node_mapping: Dict[str, str] = {}
         self.hlist_mapping: Dict[str, str] = {}
+        # Resource types per vocabulary (id -> restype_info), fetched once and shared by fetchResources and fetchProperties
+        self.resourceTypes: Dict[str, Dict[str, dict]] = {}
+        # Names of all resource types loaded in this run (id -> vocabulary:name), used to resolve link targets
+        self.resourceTypeNames: Dict[str, str] = {}
+        # Link properties whose target could not be resolved ((vocabulary, property name) -> reason)
+        self.unresolvedLinks: Dict[Tuple[str, str], str] = {}
+        # Names of the resource classes and properties of the run
+        self.names = NameRegistry(self.utils)
+        # Large-list mode: sha256 of the list files of the run (file name -> sha256)
+        self.listHashes: Dict[str, str] = {}
+        # Checkpoints of the extraction (disabled unless a journal is passed to extract)
+        self.journal: CheckpointJournal = journal if journal is not None else CheckpointJournal(None)
 
+    # ==================================================================================================================
+    # Extract the complete model of a project. With a checkpoint journal, the state after every stage is recorded,
+    # and stages that are already recorded in the journal (of a failed run) are restored instead of run again
+    def extract(self, project, journal: CheckpointJournal = None) -> Project:
+        return self.extractRun(project, journal).model
+
+    # Like extract, but returns the converter of the run: its model and the mappings of lists, list nodes and
+    # resource types (used by the data export)
+    def extractRun(self, project, journal: CheckpointJournal = None) -> "Converter":
+        run = copy.copy(self)  # Its necessary to have a fresh state for each project. Otherwhise they will overlap
+        run.resetRun(journal)
+        stages = [
+            ("projectInfo", run.fillProjectInfo),  # Fill the shortname as well as the longname into the empty ontology.
+            ("vocInfo", run.fillVocInfo),  # Fill in the vocabulary name and label
+            ("lists", run.fetchLists),
+            ("resources", run.fetchResources),
+            ("properties", run.fetchProperties)
+        ]
+        for name, stage in stages:
+            state = run.journal.get(f'stage/{name}')
+            if state is not None:
+                run.restoreState(state)
+                continue
+            with run.client.profile.stage(stage.__name__):
+                stage(project)
+            run.journal.record(f'stage/{name}', run.stageState())
+        return run
+
+    # State of the extraction that is recorded after a stage
+    def stageState(self) -> dict:
+        return {
+            "model": self.model,
+            "selection_mapping": self.selection_mapping,
+            "selection_node_mapping": self.selection_node_mapping,
+            "hlist_node_mapping": self.hlist_node_mapping,
+            "hlist_mapping": self.hlist_mapping,
+            "listHashes": self.listHashes
+        }
 
-        # Retrieving the necessary informations from Webpages.
-        self.salsahJson = requests.get(f'{self.serverpath}/api/projects').json()
-        self.r = requests.get(
-            'https://raw.githubusercontent.com/dhlab-basel/dasch-ark-resolver-data/master/data/shortcodes.csv')
-        self.salsahVocabularies = requests.get(f'{self.serverpath}/api/vocabularies').json()
-
-        # Testing stuff
-        # self.req = requests.get(f'{self.serverpath}/api/resourcetypes/')
-        # result = self.req.json()
-        # pprint(result)
+    def restoreState(self, state: dict):
+        self.model = Project.fromJson(state["model"])
+        self.selection_mapping = state["selection_mapping"]
+        self.selection_node_mapping = state["selection_node_mapping"]
+        self.hlist_node_mapping = state["hlist_node_mapping"]
+        self.hlist_mapping = state["hlist_mapping"]
+        self.listHashes = state["listHashes"]
+
+    # Vocabularies of a project (each one becomes an ontology)
+    def vocabulariesOf(self, project) -> List[dict]:
+        return self.projectVocabularies.get(project["id"], [])
+
+    # Ontology of a vocabulary in the model of the run (created by fillVocInfo)
+    def ontologyOf(self, vocabulary) -> Ontology:
+        for ontology in self.model.ontologies:
+            if ontology.name == vocabulary["shortname"]:
+                return ontology
+        raise KeyError(f'No ontology for vocabulary {vocabulary["shortname"]}')
 
     # ==================================================================================================================
     # Fill in the project info
     def fillProjectInfo(self, project):
-        for vocabulary in salsahConverter.salsahVocabularies["vocabularies"]:
-            if vocabulary["project_id"] == project["id"]:
-                # fetch project_info
-                req = requests.get(f'{self.serverpath}/api/projects/{vocabulary["shortname"]}?lang=all')
-                result = req.json()
-
-                if 'project_info' in result.keys():
-                    project_info = result['project_info']
-
-                    # Fill in shortname and longname of the project
-                    tmpOnto["project"]["shortname"] = project_info["shortname"]
-                    tmpOnto["project"]["longname"] = project_info["longname"]
-
-                    # Fill in the project shortcode. Using https://raw.githubusercontent.com/dhlab-basel/dasch-ark-resolver-data/master/data/shortcodes.csv
-                    lines = salsahConverter.r.text.split('\n')
-                    for line in lines:
-                        parts = line.split(',')
-                        if len(parts) > 1 and parts[1] == project["shortname"]:
-                            tmpOnto["project"]["shortcode"] = parts[0]
-                            # print('Found Knora project shortcode "{}" for "{}"!'.format(tmpOnto["project"]["shortcode"], parts[1]))
-
-                    # Fill the description - if present - into the empty ontology
-                    if project_info['description'] is not None:
-                        tmpOnto["project"]["descriptions"] = dict(map(lambda a: (a['shortname'], a['description']), project_info['description']))
-
-                    # Fill project keywords if present
-                    if project_info['keywords'] is not None:
-                        tmpOnto["project"]["keywords"] = list(
-                            map(lambda a: a.strip(), project_info['keywords'].split(',')))
-                    else:
-                        tmpOnto["project"]["keywords"] = [result['project_info']['shortname']]
+        for vocabulary in self.vocabulariesOf(project):
+            # fetch project_info (the same for every vocabulary of the project)
+            result = self.journaled(f'projectinfo/{vocabulary["shortname"]}',
+                                    lambda: self.client.getJson(f'{self.serverpath}/api/projects/{vocabulary["shortname"]}?lang=all'))
+
+            if 'project_info' in result.keys():
+                project_info = result['project_info']
+
+                # Fill in shortname and longname of the project
+                self.model.shortname = project_info["shortname"]
+                self.model.longname = project_info["longname"]
+
+                # Fill in the project shortcode
+                if project["shortname"] in self.shortcodes:
+                    self.model.shortcode = self.shortcodes[project["shortname"]]
+
+                # Fill the description - if present - into the empty ontology
+                if project_info['description'] is not None:
+                    self.model.descriptions = dict(map(lambda a: (a['shortname'], a['description']), project_info['description']))
+
+                # Fill project keywords if present
+                if project_info['keywords'] is not None:
+                    self.model.keywords = list(
+                        map(lambda a: a.strip(), project_info['keywords'].split(',')))
                 else:
-                    continue
+                    self.model.keywords = [result['project_info']['shortname']]
+                break
 
     # ==================================================================================================================
-    # Fill in the vocabulary info
+    # Fill in the vocabulary info, one ontology per vocabulary
     def fillVocInfo(self, project):
-        for vocabulary in salsahConverter.salsahVocabularies["vocabularies"]:
-            if vocabulary["project_id"] == project["id"]:
-                tmpOnto["project"]["ontologies"][0]["name"] = vocabulary["shortname"]
-                tmpOnto["project"]["ontologies"][0]["label"] = vocabulary["longname"]
-                if vocabulary["description"]:
-                    tmpOnto["project"]["ontologies"][0]["comment"].update({
-                        "en": vocabulary["description"]
-                    })
-                else:
-                    tmpOnto["project"]["ontologies"][0].pop("comment")
+        vocabularies = self.vocabulariesOf(project)
+        if vocabularies:
+            self.model.ontologies = []
+        for vocabulary in vocabularies:
+            ontology = Ontology(vocabulary["shortname"], vocabulary["longname"])
+            if vocabulary["description"]:
+                ontology.comment = {"en": vocabulary["description"]}
+            else:
+                ontology.comment = None
+            self.model.ontologies.append(ontology)
 
     # ==================================================================================================================
     # Fill in the vocabulary prefixes
@@ -142,105 +423,213 @@ class Converter:
             "dc": "http://purl.org/dc/terms/"
         }
         if prefix is not None and prefix in prefixMap:
-            tmpOnto["prefixes"].update({
-                prefix: prefixMap[prefix]
-            })
+            self.model.prefixes[prefix] = prefixMap[prefix]
 
     # ==================================================================================================================
     # Function that fetches the lists for a correspinding project
     def fetchLists(self, project):
-        for vocabulary in salsahConverter.salsahVocabularies["vocabularies"]:
-            if vocabulary["project_id"] == projects["id"]:
-                payload: dict = {
-                    'vocabulary': vocabulary["shortname"],
-                    'lang': 'all'
-                }
-                # fetch selections
-                req = requests.get(f'{self.serverpath}/api/selections/', params=payload)
-                selection_results = req.json()
-                selections = selection_results['selections']
-
-                # Let's make an empty list for the lists:
-                selections_container = []
-
-                for selection in selections:
-                    self.selection_mapping[selection['id']] = selection['name']
-                    root = {
-                        'name': selection['name'],
-                        'labels': dict(map(lambda a: (a['shortname'], a['label']), selection['label']))
-                    }
-                    if selection.get('description') is not None:
-                        root['comments'] = dict(
-                            map(lambda a: (a['shortname'], a['description']), selection['description']))
-                    payload = {'lang': 'all'}
-                    req_nodes = requests.get(f'{self.serverpath}/api/selections/' + selection['id'], params=payload)
-                    result_nodes = req_nodes.json()
-
-                    self.selection_node_mapping.update(
-                        dict(map(lambda a: (a['id'], a['name']), result_nodes['selection'])))
-                    root['nodes'] = list(map(lambda a: {
-                        'name': 'S_' + a['id'],
-                        'labels': a['label']
-                    }, result_nodes['selection']))
-                    selections_container.append(root)
-
-                    # pprint(selections_container)
-                    # time.sleep(15)
-
-                #
-                # now we get the hierarchical lists (hlists)
-                #
-                payload = {
-                    'vocabulary': vocabulary["shortname"],
-                    'lang': 'all'
-                }
-                # fetch hlists
-                req = requests.get(f'{self.serverpath}/api/hlists', params=payload)
-                hlist_results = req.json()
-
-                self.hlist_node_mapping.update(dict(map(lambda a: (a['id'], a['name']), hlist_results['hlists'])))
-
-                hlists = hlist_results['hlists']
-
-                # pprint(selections_container)
-                # time.sleep(15)
-
-                #
-                # this is a helper function for easy recursion
-                #
-                def process_children(children: list) -> list:
-                    newnodes = []
-                    for node in children:
-                        self.hlist_node_mapping[node['id']] = node['name']
-                        newnode = {
-                            'name': 'H_' + node['id'],
-                            'labels': dict(map(lambda a: (a['shortname'], a['label']), node['label']))
-                        }
-                        if node.get('children') is not None:
-                            newnode['nodes'] = process_children(node['children'])
-                        newnodes.append(newnode)
-                    return newnodes
-
-                for hlist in hlists:
-                    root = {
-                        'name': hlist['name'],
-                        'labels': dict(map(lambda a: (a['shortname'], a['label']), hlist['label']))
-                    }
-                    self.hlist_mapping[hlist['id']] = hlist['name']
-                    if hlist.get('description') is not None:
-                        root['comments'] = dict(
-                            map(lambda a: (a['shortname'], a['description']), hlist['description']))
-                    payload = {'lang': 'all'}
-                    req_nodes = requests.get(f'{self.serverpath}/api/hlists/' + hlist['id'], params=payload)
-                    result_nodes = req_nodes.json()
-
-                    root['nodes'] = process_children(result_nodes['hlist'])
-                    selections_container.append(root)
-
-                tmpOnto["project"]["lists"] = selections_container
-                # pprint(selections_container)
-                # pprint('==================================================================================================================')
-                # pprint('==================================================================================================================')
+        # in large-list mode every list is written into its own file (lists/<shortname>/<list>.json), first into the
+        # staging directory of the run
+        listDir = None
+        if self.listDir is not None:
+            listDir = self.stagingDirectory()
+            shutil.rmtree(listDir, ignore_errors=True)
+        # the lists of all vocabularies are lists of the project
+        self.model.lists = []
+        for vocabulary in self.vocabulariesOf(project):
+            payload: dict = {
+                'vocabulary': vocabulary["shortname"],
+                'lang': 'all'
+            }
+            # fetch selections
+            selections = self.journaled(f'selections/{vocabulary["shortname"]}',
+                                        lambda: self.client.getJson(f'{self.serverpath}/api/selections/', params=payload)['selections'])
+
+            # Let's make an empty list for the lists:
+            selections_container: List[ListNode] = []
+
+            def selection_node(node: dict):
+                self.selection_node_mapping[node['id']] = node['name']
+                return ListNode('S_' + node['id'], node['label']), None
+
+            for selection, result_nodes in zip(selections, self.fetchListNodes(
+                    "selection", [selection['id'] for selection in selections], listDir)):
+                self.selection_mapping[selection['id']] = selection['name']
+                root = ListNode(selection['name'], dict(map(lambda a: (a['shortname'], a['label']), selection['label'])))
+                if selection.get('description') is not None:
+                    root.comments = dict(
+                        map(lambda a: (a['shortname'], a['description']), selection['description']))
+                self.addListNodes(root, result_nodes['selection'], selection_node, listDir)
+                selections_container.append(root)
+
+            #
+            # now we get the hierarchical lists (hlists)
+            #
+            payload = {
+                'vocabulary': vocabulary["shortname"],
+                'lang': 'all'
+            }
+            # fetch hlists
+            hlists = self.journaled(f'hlists/{vocabulary["shortname"]}',
+                                    lambda: self.client.getJson(f'{self.serverpath}/api/hlists', params=payload)['hlists'])
+
+            self.hlist_node_mapping.update(dict(map(lambda a: (a['id'], a['name']), hlists)))
+
+            def hlist_node(node: dict):
+                self.hlist_node_mapping[node['id']] = node['name']
+                return ListNode('H_' + node['id'], dict(map(lambda a: (a['shortname'], a['label']), node['label']))), node.get('children')
+
+            for hlist, result_nodes in zip(hlists, self.fetchListNodes(
+                    "hlist", [hlist['id'] for hlist in hlists], listDir)):
+                root = ListNode(hlist['name'], dict(map(lambda a: (a['shortname'], a['label']), hlist['label'])))
+                self.hlist_mapping[hlist['id']] = hlist['name']
+                if hlist.get('description') is not None:
+                    root.comments = dict(
+                        map(lambda a: (a['shortname'], a['description']), hlist['description']))
+                self.addListNodes(root, result_nodes['hlist'], hlist_node, listDir)
+                selections_container.append(root)
+
+            self.model.lists.extend(selections_container)
+
+    # Nodes of the lists of a kind ("selection" or "hlist"). Normally all lists that are not recorded in the checkpoint
+    # journal are fetched concurrently (results keep the order of the lists); in large-list mode one after the other
+    # and not recorded, so only one list is in memory at a time
+    def fetchListNodes(self, kind: str, listIds: List[str], listDir: str = None):
+        payload = {'lang': 'all'}
+        urls = [f'{self.serverpath}/api/{kind}s/{listId}' for listId in listIds]
+        if listDir is not None:
+            return (self.client.getJson(url, params=payload) for url in urls)
+        results = [self.journal.get(f'{kind}/{listId}') for listId in listIds]
+        missing = [position for position, result in enumerate(results) if result is None]
+        for position, result in zip(missing, self.client.getJsonAll([urls[position] for position in missing], params=payload)):
+            self.journal.record(f'{kind}/{listIds[position]}', result)
+            results[position] = result
+        return results
+
+    # Add the nodes of a list to its root node. nodeOf turns a SALSAH node into a ListNode and its children (or None).
+    # The tree is walked iteratively, hierarchical lists can be deeper than the recursion limit.
+    # In large-list mode the nodes are streamed into the list's file in the staging directory listDir, and the root
+    # node references the file in the list directory of the project. The sha256 of the file goes into listHashes
+    def addListNodes(self, root: ListNode, children: list, nodeOf, listDir: str = None):
+        if listDir is not None:
+            os.makedirs(listDir, exist_ok=True)
+            root.file = os.path.join(self.listDirectory(), root.name + ".json")
+            fd, tmpPath = tempfile.mkstemp(dir=listDir, suffix=".tmp")
+            with os.fdopen(fd, "w") as listFile:
+                writeListNodes(listFile, root, children, nodeOf)
+            stagedPath = os.path.join(listDir, root.name + ".json")
+            os.replace(tmpPath, stagedPath)
+            digest = hashlib.sha256()
+            with open(stagedPath, "rb") as listFile:
+                for block in iter(lambda: listFile.read(1024 * 1024), b""):
+                    digest.update(block)
+            self.listHashes[root.name + ".json"] = digest.hexdigest()
+            return
+        root.nodes = []
+        stack = [(children, root.nodes)]
+        while stack:
+            nodes, container = stack.pop()
+            for node in nodes:
+                newnode, nodeChildren = nodeOf(node)
+                if nodeChildren is not None:
+                    newnode.nodes = []
+                    stack.append((nodeChildren, newnode.nodes))
+                container.append(newnode)
+
+    # ==================================================================================================================
+    # Large-list mode: the list files of a run are written into a staging directory and only moved into the list
+    # directory of the project by publishLists, once the model is validated and known to have changed. The staging
+    # directory survives a failed run, a resumed run publishes the lists of its restored lists stage.
+    # The sha256 of the published list files are kept in the manifest DIR/<shortname>.sha256.json
+    def listDirectory(self) -> str:
+        return os.path.join(self.listDir, self.model.shortname)
+
+    def listManifest(self) -> str:
+        return os.path.join(self.listDir, self.model.shortname + ".sha256.json")
+
+    def stagingDirectory(self) -> str:
+        return os.path.join(self.listDir, ".staging", self.model.shortname)
+
+    # Whether the list files of the run differ from the published ones (the model only references the files)
+    def listsChanged(self) -> bool:
+        if self.listDir is None:
+            return False
+        try:
+            with open(self.listManifest()) as f:
+                return json.load(f) != self.listHashes
+        except FileNotFoundError:
+            return True
+
+    def publishLists(self):
+        if self.listDir is None:
+            return
+        listDirectory = self.listDirectory()
+        os.makedirs(listDirectory, exist_ok=True)
+        files = set()
+        for root in self.model.lists:
+            if root.file is not None:
+                os.replace(os.path.join(self.stagingDirectory(), os.path.basename(root.file)), root.file)
+                files.add(os.path.basename(root.file))
+        # files of lists that are not part of the model any more
+        for entry in os.listdir(listDirectory):
+            if entry.endswith(".json") and entry not in files:
+                os.remove(os.path.join(listDirectory, entry))
+        # the manifest last: after an interrupted publication the lists count as changed
+        with open(self.listManifest(), "w") as f:
+            f.write(json.dumps(self.listHashes, indent=4, sort_keys=True))
+        self.discardLists()
+
+    def discardLists(self):
+        if self.listDir is not None:
+            shutil.rmtree(self.stagingDirectory(), ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(self.stagingDirectory()))
+            except OSError:
+                pass  # staging directories of other projects
+
+    # ==================================================================================================================
+    # Function that fetches the resource types of a vocabulary. Every resource type is only fetched once per run,
+    # all later calls return the same snapshot
+    def getResourceTypes(self, vocabulary) -> Dict[str, dict]:
+        if vocabulary["shortname"] not in self.resourceTypes:
+            payload: dict = {
+                'vocabulary': vocabulary["shortname"],
+                'lang': 'all'
+            }
+            # fetch resourcetypes
+            resourcetypes = self.journaled(f'resourcetypes/{vocabulary["shortname"]}',
+                                           lambda: self.client.getJson(f'{self.serverpath}/api/resourcetypes/', params=payload)["resourcetypes"])
+
+            # fetch restype_info of every resourcetype (concurrently, results keep the order of the listing)
+            resTypeInfos = self.client.map(lambda resourcetype: self.getResourceTypeInfo(resourcetype["id"]), resourcetypes)
+            self.resourceTypes[vocabulary["shortname"]] = {
+                resourcetype["id"]: resTypeInfo for resourcetype, resTypeInfo in zip(resourcetypes, resTypeInfos)
+            }
+            for resourcetype, resTypeInfo in zip(resourcetypes, resTypeInfos):
+                self.resourceTypeNames[resourcetype["id"]] = resTypeInfo["name"]
+
+        return self.resourceTypes[vocabulary["shortname"]]
+
+    # Add the names of the given resource types to self.resourceTypeNames. Only types that are not known yet
+    # (e.g. of other vocabularies) are fetched, all of them in one concurrent batch
+    def loadResourceTypeNames(self, resourcetypeIds: set):
+        missing = sorted(resourcetypeId for resourcetypeId in resourcetypeIds if resourcetypeId not in self.resourceTypeNames)
+        resTypeInfos = self.client.map(self.getResourceTypeInfo, missing)
+        for resourcetypeId, resTypeInfo in zip(missing, resTypeInfos):
+            self.resourceTypeNames[resourcetypeId] = resTypeInfo["name"]
+
+    # Fetch the restype_info of a single resource type (recorded in the checkpoint journal)
+    def getResourceTypeInfo(self, resourcetypeId: str) -> dict:
+        return self.journaled(f'resourcetype/{resourcetypeId}',
+                              lambda: self.client.getJson(f'{self.serverpath}/api/resourcetypes/{resourcetypeId}?lang=all')["restype_info"])
+
+    # Result of a request, recorded in the checkpoint journal under key; fetch is only called if it is not recorded yet
+    def journaled(self, key: str, fetch):
+        value = self.journal.get(key)
+        if value is None:
+            value = fetch()
+            self.journal.record(key, value)
+        return value
 
     # ==================================================================================================================
     # Function that fetches all the resources that correspond to a vocabulary/ontology
@@ -251,90 +640,47 @@ class Converter:
             "object": "Resource",
             "image": "StillImageRepresentation"
         }
-        salsahPropertyMap = {
-            "part_of": "isPartOf",
-            "seqnum": "seqnum",
-            "__location__": "__location__"
-        }
 
-        for vocabulary in salsahConverter.salsahVocabularies["vocabularies"]:
-            if project["id"] == vocabulary["project_id"]:
-                payload: dict = {
-                    'vocabulary': vocabulary["shortname"],
-                    'lang': 'all'
-                }
-                # fetch resourcetypes
-                req = requests.get(f'{self.serverpath}/api/resourcetypes/', params=payload)
-                resourcetype_result = req.json()
-                resourcetypes = resourcetype_result["resourcetypes"]
-
-                # prepare resources pattern
-                for resourcetype in resourcetypes:
-                    tmpOnto["project"]["ontologies"][0]["resources"].append({
-                        "name": "",
-                        "super": "",
-                        "labels": {},
-                        "comments": {},
-                        "cardinalities": []
-                    })
-
-                    # fetch restype_info
-                    req = requests.get(f'{self.serverpath}/api/resourcetypes/{resourcetype["id"]}?lang=all')
-                    resType = req.json()
-                    resTypeInfo = resType["restype_info"]
-
-                    # fill in the name
-                    nameSplit = resTypeInfo["name"].split(":")
-                    tmpOnto["project"]["ontologies"][0]["resources"][-1]["name"] = utils.upper_camel_case(nameSplit[1])
-
-                    # fill in the labels
-                    if resTypeInfo["label"] is not None and isinstance(resTypeInfo["label"], list):
-                        for label in resTypeInfo["label"]:
-                            tmpOnto["project"]["ontologies"][0]["resources"][-1]["labels"].update(
-                                {label["shortname"]: label["label"]})
-
-                    # fill in the description of the resources as comments
-                    if resTypeInfo["description"] is not None and isinstance(resTypeInfo["description"], list):
-                        for descriptionId in resTypeInfo["description"]:
-                            tmpOnto["project"]["ontologies"][0]["resources"][-1]["comments"].update({
-                                descriptionId["shortname"]: descriptionId["description"]
-                            })
-
-                    # fill in super attributes of the resource. Default is "Resource"
-                    if resTypeInfo["class"] is not None and resTypeInfo["class"] in superMap:
-                        tmpOnto["project"]["ontologies"][0]["resources"][-1]["super"] = superMap[resTypeInfo["class"]]
-                    else:
-                        # TODO: check if correct?
-                        # tmpOnto["project"]["ontologies"][0]["resources"][-1]["super"] = superMap["object"]
-                        pprint(resTypeInfo["class"])
-                        #     exit()
-
-                    gui_order: int = 1
-
-                    # fill in the cardinalities with propname and cardinality of occurences
-                    for propertyId in resTypeInfo["properties"]:
-                        if propertyId['name'] == '__location__':
-                            continue
+        for vocabulary in self.vocabulariesOf(project):
+            ontology = self.ontologyOf(vocabulary)
+            # prepare resources pattern
+            for resTypeInfo in self.getResourceTypes(vocabulary).values():
+                resource = ResourceClass()
+                ontology.resources.append(resource)
+
+                # fill in the name
+                resource.name = self.names.resourceName(resTypeInfo["name"])
+
+                # fill in the labels
+                if resTypeInfo["label"] is not None and isinstance(resTypeInfo["label"], list):
+                    for label in resTypeInfo["label"]:
+                        resource.labels[label["shortname"]] = label["label"]
+
+                # fill in the description of the resources as comments
+                if resTypeInfo["description"] is not None and isinstance(resTypeInfo["description"], list):
+                    for descriptionId in resTypeInfo["description"]:
+                        resource.comments[descriptionId["shortname"]] = descriptionId["description"]
+
+                # fill in super attributes of the resource. Default is "Resource"
+                if resTypeInfo["class"] is not None and resTypeInfo["class"] in superMap:
+                    resource.super = superMap[resTypeInfo["class"]]
+                else:
+                    # TODO: check if correct?
+                    # resource.super = superMap["object"]
+                    pprint(resTypeInfo["class"])
+                    #     exit()
 
-                        # check vocabulary of propertyId
-                        propertyName = ""
-                        if propertyId["vocabulary"].lower() is not None:
-                            if propertyId["vocabulary"].lower() == project["shortname"].lower():
-                                propertyName = ":" + propertyId["name"]
-                            elif propertyId["vocabulary"].lower() == "salsah" and propertyId["name"] in salsahPropertyMap:
-                                propertyName = salsahPropertyMap[propertyId["name"]]
-                            else:
-                                propertyName = ":" + propertyId["vocabulary"].lower() + "_" + propertyId["name"]
-
-                        tmpOnto["project"]["ontologies"][0]["resources"][-1]["cardinalities"].append({
-                            "propname": propertyName,
-                            "cardinality": str(propertyId["occurrence"]),
-                            'gui_order': gui_order
-                        })
-
-                        gui_order += 1
-            else:
-                continue
+                gui_order: int = 1
+
+                # fill in the cardinalities with propname and cardinality of occurences
+                for propertyId in resTypeInfo["properties"]:
+                    if propertyId['name'] == '__location__':
+                        continue
+
+                    propertyName = self.names.cardinalityName(vocabulary["shortname"], propertyId)
+                    resource.cardinalities.append(Cardinality(propertyName, str(propertyId["occurrence"]), gui_order))
+
+                    gui_order += 1
 
     # ==================================================================================================================
     def fetchProperties(self, project):
@@ -364,24 +710,6 @@ class Converter:
             "fileupload": "Fileupload"
         }  # Dict that maps the old guiname from salsa to the new guielement from knorapy
 
-        objectMap = {
-            "Text": "TextValue",
-            "Richtext": "TextValue",
-            "Iconclass": "TextValue",
-            "": "ColorValue",
-            "Date": "DateValue",
-            "Time": "TimeValue",
-            "Floating point number": "DecimalValue",
-            "": "GeomValue",
-            "Geoname": "GeonameValue",
-            "Integer value": "IntValue",
-            "": "BooleanValue",
-            "": "UriValue",
-            "": "IntervalValue",
-            "Selection": "ListValue",
-            "Hierarchical list": "ListValue",
-            "Resource pointer": "LinkValue"
-        }  # Dict that maps the old vt-name from salsa to the new Object type from knorapy
         # TODO right mapping from object map to super map
         superMap = {
             "": "hasValue",
@@ -395,220 +723,529 @@ class Converter:
             "": "seqnum"
         }  # Dict that maps the old the super corresponding to the object-type
 
-        hlist_node_mapping = {}
-
-        # fetch selections
-        req = requests.get(f'{self.serverpath}/api/selections/')
-        selection_results = req.json()
-        selections = selection_results["selections"]
-
-        # fetch hlists
-        req2 = requests.get(f'{self.serverpath}/api/hlists/')
-        hlist_results = req2.json()
-        hlists = hlist_results["hlists"]
-
-        for vocabulary in salsahConverter.salsahVocabularies["vocabularies"]:
-            if project["id"] == vocabulary["project_id"]:
-                payload: dict = {
-                    'vocabulary': vocabulary["shortname"],
-                    'lang': 'all'
-                }
-                # fetch all resourcetypes
-                req = requests.get(f'{self.serverpath}/api/resourcetypes/', params=payload)
-                resourcetype_results = req.json()
-                resourcetypes = resourcetype_results["resourcetypes"]
-
-                controlList.clear()  # The list needs to be cleared for every project / vocabulary
-
-                for resourcetype in resourcetypes:
-                    # fetch the single resourcetype info
-                    req = requests.get(f'{self.serverpath}/api/resourcetypes/{resourcetype["id"]}?lang=all')
-                    resType = req.json()
-                    resTypeInfo = resType["restype_info"]
-
-                    # loop through all properties of a resourcetype
-                    for property in resTypeInfo["properties"]:
-                        if "id" in property:
-                            # check vocabulary of property
-                            propertyName = ""
-                            propertySuperValue = ""
-                            if property["vocabulary"].lower() is not None:
-                                if property["vocabulary"].lower() == project["shortname"].lower():
-                                    propertyName = property["name"]
+        # list ids are resolved to list names with self.selection_mapping and self.hlist_mapping,
+        # which are filled by fetchLists (has to be called before fetchProperties)
+
+        for vocabulary in self.vocabulariesOf(project):
+            controlList.clear()  # The list needs to be cleared for every project / vocabulary
+            ontology = self.ontologyOf(vocabulary)
+
+            # same resourcetypes snapshot as in fetchResources
+            resTypeInfos = self.getResourceTypes(vocabulary).values()
+
+            # load the names of all link targets (resource pointers) before the properties are processed
+            linkTargets = set()
+            for resTypeInfo in resTypeInfos:
+                for property in resTypeInfo["properties"]:
+                    if property.get("vt_name") == "Resource pointer" and property.get("attributes"):
+                        for attribute in property["attributes"].split(";"):
+                            if attribute.startswith("restypeid=") and attribute != "restypeid=0":
+                                linkTargets.add(attribute.split("=", 1)[1])
+            self.loadResourceTypeNames(linkTargets)
+
+            for resTypeInfo in resTypeInfos:
+                # loop through all properties of a resourcetype
+                for property in resTypeInfo["properties"]:
+                    if "id" in property:
+                        # check vocabulary of property (the same name as in the cardinalities)
+                        propertyName = self.names.propertyName(vocabulary["shortname"], property)
+                        propertySuperValue = ""
+                        if property["vocabulary"].lower() not in (vocabulary["shortname"].lower(), "salsah"):
+                            self.fillPrefixes(property["vocabulary"].lower())
+                            propertySuperValue = property["vocabulary"].lower() + ":" + property["name"].removesuffix("_rt") # remove possible suffix from super value
+
+                        # exclude duplicates
+                        if propertyName in controlList:
+                            continue
+                        # exclude certain salsah properties
+                        elif property["vocabulary"].lower() == "salsah" and property["name"] in salsahControlList:
+                            continue
+                        # continue for everything else
+                        else:
+                            # prepare properties pattern
+                            prop = Property()
+                            ontology.properties.append(prop)
+
+                            # fill in the name of the property
+                            prop.name = propertyName
+                            controlList.append(propertyName)
+
+                            # fill in the labels of the properties
+                            for labelId in property["label"]:
+                                prop.labels[labelId["shortname"]] = labelId["label"]
+
+                            # fill in the descriptions of the property as comments
+                            if property["description"] is not None and isinstance(property["description"], list):
+                                for descriptionId in property["description"]:
+                                    prop.comments[descriptionId["shortname"]] = descriptionId["description"]
+
+                            # fill in gui_element
+                            prop.gui_element = guiEleMap[property["gui_name"]]
+
+                            # fill in object (has to happen before attributes)
+                            if "vt_name" in property and property["vt_name"] in self.objectMap:
+                                prop.object = self.objectMap[property["vt_name"]]
+
+                                # fill in super attributes of the property. Default is "hasValue"
+                                if self.objectMap[property["vt_name"]] in superMap:
+                                    prop.super.append(superMap[self.objectMap[property["vt_name"]]])
                                 else:
-                                    propertyName = property["vocabulary"].lower() + "_" + property["name"]
-                                    if property["vocabulary"].lower() != "salsah":
-                                        salsahConverter.fillPrefixes(property["vocabulary"].lower())
-                                        propertySuperValue = property["vocabulary"].lower() + ":" + property["name"].removesuffix("_rt") # remove possible suffix from super value
-
-                            # exclude duplicates
-                            if propertyName in controlList:
-                                continue
-                            # exclude certain salsah properties
-                            elif property["vocabulary"].lower() == "salsah" and property["name"] in salsahControlList:
-                                continue
-                            # continue for everything else
-                            else:
-                                # prepare properties pattern
-                                tmpOnto["project"]["ontologies"][0]["properties"].append({
-                                    "name": "",
-                                    "labels": {},
-                                    "comments": {},
-                                    "super": [],
-                                    "object": "",
-                                    "gui_element": ""
-                                })
-
-                                # fill in the name of the property
-                                tmpOnto["project"]["ontologies"][0]["properties"][-1]["name"] = propertyName
-                                controlList.append(propertyName)
-
-                                # fill in the labels of the properties
-                                for labelId in property["label"]:
-                                    tmpOnto["project"]["ontologies"][0]["properties"][-1]["labels"].update({
-                                        labelId["shortname"]: labelId["label"]
-                                    })
-
-                                # fill in the descriptions of the property as comments
-                                if property["description"] is not None and isinstance(property["description"], list):
-                                     for descriptionId in property["description"]:
-                                             tmpOnto["project"]["ontologies"][0]["properties"][-1]["comments"].update({
-                                                 descriptionId["shortname"]: descriptionId["description"]
-                                             })
-
-                                # fill in gui_element
-                                tmpOnto["project"]["ontologies"][0]["properties"][-1]["gui_element"] = guiEleMap[property["gui_name"]]
-
-                                # fill in object (has to happen before attributes)
-                                if "vt_name" in property and property["vt_name"] in objectMap:
-                                    tmpOnto["project"]["ontologies"][0]["properties"][-1]["object"] = objectMap[property["vt_name"]]
-
-                                    # fill in super attributes of the property. Default is "hasValue"
-                                    if objectMap[property["vt_name"]] in superMap:
-                                        tmpOnto["project"]["ontologies"][0]["properties"][-1]["super"].append(superMap[objectMap[property["vt_name"]]])
-                                    else:
-                                        tmpOnto["project"]["ontologies"][0]["properties"][-1]["super"].append("hasValue")
-                                    # external properties need another super value
-                                    if property["vocabulary"].lower() is not None and property["vocabulary"].lower() != project["shortname"].lower() and property["vocabulary"].lower() != "salsah":
-                                        tmpOnto["project"]["ontologies"][0]["properties"][-1]["super"].append(propertySuperValue)
-
-
-                                # fill in all attributes (gui_attributes and resource pointer)
-                                if "attributes" in property and property["attributes"] != "" and property["attributes"] is not None:
-                                    tmpOnto["project"]["ontologies"][0]["properties"][-1]["gui_attributes"] = {}
-                                    # split attributes entry
-                                    finalSplit = []
-                                    tmpstr = property["attributes"]
-                                    firstSplit = tmpstr.split(";")
-                                    for splits in firstSplit:
-                                        finalSplit.append(splits.split("="))
-
-                                    for numEle in range(len(finalSplit)): #  instead of the list id, insert the name of the list via the id .replace("selection", "hlist")
-                                        numEleKey = finalSplit[numEle][0]
-                                        numEleValue = finalSplit[numEle][1]
-
-                                        # add selections
-                                        if numEleKey == "selection":
-                                            numEleKey = "hlist"     # selections are converted into hlists
-                                            for selectionId in selections:
-                                                if numEleValue == selectionId["id"] and selectionId["name"] != "":
-                                                    numEleValue = selectionId["name"]
-
-                                        # add hlists
-                                        if numEleKey == "hlist":
-                                            for hlistsId in hlists:
-                                                if numEleValue == hlistsId["id"] and hlistsId["name"] != "":
-                                                    numEleValue = hlistsId["name"]
-
-                                        # convert gui attribute's string values to integers where necessary
-                                        if (numEleKey == "size" or numEleKey == "maxlength" or numEleKey == "numprops" or numEleKey == "cols" or numEleKey == "rows" or numEleKey == "min" or numEleKey == "max"):
-                                            try:
-                                                numEleValue = int(numEleValue)
-                                            except ValueError:
-                                                numEleValue = numEleValue
-
-                                        # fill in gui attributes (incl. hlists; but exlcude restypeid)
-                                        if numEleKey != "restypeid":
-                                            tmpOnto["project"]["ontologies"][0]["properties"][-1]["gui_attributes"].update({
-                                                numEleKey: numEleValue
-                                            })
-
-                                        # fill in ResourcePointer / LinkValue types
-                                        if (numEleKey == "restypeid" and tmpOnto["project"]["ontologies"][0]["properties"][-1]["object"] == "LinkValue"):
-                                            # get resource type by value of restypeid
-                                            if numEleValue != '0':
-                                                req = requests.get(
-                                                    f'{self.serverpath}/api/resourcetypes/{numEleValue}?lang=all')
-                                                linkValueResType = req.json()
-                                                linkValueResTypeInfo = linkValueResType["restype_info"]
-                                                linkValueResName = linkValueResTypeInfo["name"]
-
-                                                # if LinkValue is from the same vocabulary, remove vocabulary prefix
-                                                if linkValueResName.startswith(vocabulary["shortname"], 0):
-                                                    linkValueResName = linkValueResName.removeprefix(vocabulary["shortname"])
-
-                                                # replace "LinkValue" with resolved resource type name
-                                                tmpOnto["project"]["ontologies"][0]["properties"][-1]["object"] = linkValueResName
-
-                                if tmpOnto["project"]["ontologies"][0]["properties"][-1]["object"] == "LinkValue":
-                                    print(property)
-                                    tmpOnto["project"]["ontologies"][0]["properties"][-1]["object"] = ":LinkValue"
+                                    prop.super.append("hasValue")
+                                # external properties need another super value
+                                if property["vocabulary"].lower() is not None and property["vocabulary"].lower() != vocabulary["shortname"].lower() and property["vocabulary"].lower() != "salsah":
+                                    prop.super.append(propertySuperValue)
+
+
+                            # fill in all attributes (gui_attributes and resource pointer)
+                            if "attributes" in property and property["attributes"] != "" and property["attributes"] is not None:
+                                prop.gui_attributes = {}
+                                # split attributes entry
+                                finalSplit = []
+                                tmpstr = property["attributes"]
+                                firstSplit = tmpstr.split(";")
+                                for splits in firstSplit:
+                                    finalSplit.append(splits.split("="))
+
+                                for numEle in range(len(finalSplit)): #  instead of the list id, insert the name of the list via the id .replace("selection", "hlist")
+                                    numEleKey = finalSplit[numEle][0]
+                                    numEleValue = finalSplit[numEle][1]
+
+                                    # add selections
+                                    if numEleKey == "selection":
+                                        numEleKey = "hlist"     # selections are converted into hlists
+                                        numEleValue = self.selection_mapping.get(numEleValue) or numEleValue
+
+                                    # add hlists
+                                    elif numEleKey == "hlist":
+                                        numEleValue = self.hlist_mapping.get(numEleValue) or numEleValue
+
+                                    # convert gui attribute's string values to integers where necessary
+                                    if (numEleKey == "size" or numEleKey == "maxlength" or numEleKey == "numprops" or numEleKey == "cols" or numEleKey == "rows" or numEleKey == "min" or numEleKey == "max"):
+                                        try:
+                                            numEleValue = int(numEleValue)
+                                        except ValueError:
+                                            numEleValue = numEleValue
+
+                                    # fill in gui attributes (incl. hlists; but exlcude restypeid)
+                                    if numEleKey != "restypeid":
+                                        prop.gui_attributes[numEleKey] = numEleValue
+
+                                    # fill in ResourcePointer / LinkValue types
+                                    if (numEleKey == "restypeid" and prop.object == "LinkValue"):
+                                        # get resource type by value of restypeid
+                                        if numEleValue != '0':
+                                            # replace "LinkValue" with resolved resource type name, named like the resource classes
+                                            # (without vocabulary prefix if it is from the same vocabulary)
+                                            prop.object = self.names.linkTarget(vocabulary["shortname"], self.resourceTypeNames[numEleValue])
+
+                            if prop.object == "LinkValue":
+                                self.unresolvedLinks[(vocabulary["shortname"], propertyName)] = f'attributes "{property.get("attributes")}" name no target resource type'
+                                prop.object = ":LinkValue"
+
+        # report all link properties without target at once
+        if self.unresolvedLinks:
+            print(f'{len(self.unresolvedLinks)} link property/properties without target resource type, object set to ":LinkValue":')
+            for (vocabularyName, propertyName), reason in self.unresolvedLinks.items():
+                print(f'  {vocabularyName}:{propertyName}: {reason}')
+        # and all SALSAH names that were translated into the same DSP name
+        if self.names.collisions:
+            print(f'{len(self.names.collisions)} name collision(s), the first SALSAH name is used:')
+            for name, salsahNames in self.names.collisions.items():
+                print(f'  {name}: {", ".join(salsahNames)}')
 
     # ==================================================================================================================
 
 
-if __name__ == '__main__':
 
-    # This is a "blank" ontology. the json file is in the form we need in the new knora
-    emptyOnto = {
-        "$schema": "https://raw.githubusercontent.com/dasch-swiss/dsp-tools/main/knora/dsplib/schemas/ontology.json",
-        "prefixes": {},
-        "project": {
-            "shortcode": "",
-            "shortname": "",
-            "longname": "",
-            "descriptions": {},
-            "keywords": [],
-            "lists": [],
-            "ontologies": [{
-                "name": "",
-                "label": "",
-                "comment": {},
-                "properties": [],
-                "resources": []
-            }]
-        }
+# ======================================================================================================================
+# Write a list as JSON (formatted like json.dumps(indent=4)) without building it in memory: the SALSAH nodes are
+# converted and written one by one while walking the tree with an explicit stack
+def writeListNodes(listFile, root: ListNode, children: list, nodeOf):
+    def pad(width: int) -> str:
+        return " " * width
+
+    def dump(value, width: int) -> str:
+        return json.dumps(value, indent=4).replace("\n", "\n" + pad(width))
+
+    listFile.write("{")
+    for key, value in ListNode(root.name, root.labels, root.comments).toJson().items():
+        listFile.write(f"\n{pad(4)}{json.dumps(key)}: {dump(value, 4)},")
+    listFile.write(f'\n{pad(4)}"nodes": [')
+    # [children, position, depth]: the items of a nodes array at depth d are indented by 8 * d
+    stack = [[children, 0, 1]]
+    while stack:
+        entry = stack[-1]
+        nodes, position, depth = entry
+        if position == len(nodes):
+            # close the array and the object it belongs to
+            stack.pop()
+            listFile.write((f"\n{pad(8 * depth - 4)}]" if nodes else "]") + f"\n{pad(8 * depth - 8)}}}")
+            continue
+        entry[1] += 1
+        node, nodeChildren = nodeOf(nodes[position])
+        listFile.write(("," if position else "") + f"\n{pad(8 * depth)}{{")
+        listFile.write(f'\n{pad(8 * depth + 4)}"name": {json.dumps(node.name)},')
+        listFile.write(f'\n{pad(8 * depth + 4)}"labels": {dump(node.labels, 8 * depth + 4)}')
+        if nodeChildren is not None:
+            listFile.write(f',\n{pad(8 * depth + 4)}"nodes": [')
+            stack.append([nodeChildren, 0, depth + 1])
+        else:
+            listFile.write(f"\n{pad(8 * depth)}}}")
+
+
+# ======================================================================================================================
+# Select projects by id or shortname ("all" selects every project)
+def selectProjects(salsahProjects: list, selection: list) -> list:
+    if "all" in selection:
+        return list(salsahProjects)
+    selected = []
+    for key in selection:
+        matches = [project for project in salsahProjects if key in (project["id"], project["shortname"])]
+        if not matches:
+            raise SystemExit(f'Unknown SALSAH project "{key}"')
+        selected.extend(match for match in matches if match not in selected)
+    return selected
+
+
+# ======================================================================================================================
+# Newest earlier snapshot of a project, in the working directory or in the snapshot store. Returns its name and the
+# sha256 of its compact JSON (see jsonHash), a snapshot in the working directory is read section by section
+def latestSnapshot(shortname: str, storeDir: str = None):
+    candidates = {}
+    for path in glob.glob(glob.escape(shortname) + "_*.json"):
+        if search(r"_\d{8}\.json$", path) and path[len(shortname) + 1:-5].isdigit():
+            candidates[path] = None
+    store = SnapshotStore(storeDir) if storeDir is not None else None
+    latest = store.latest(shortname + ".json") if store is not None else None
+    if latest is not None:
+        candidates.setdefault(latest["name"], store)
+    if not candidates:
+        return None, None
+    name = max(candidates, key=lambda name: name[-13:-5])
+    if candidates[name] is not None:
+        return name, jsonHash(json.loads(candidates[name].get(name)))
+    with open(name) as f:
+        return name, JsonReader(f).hash()
+
+
+# ======================================================================================================================
+# Extract the model of a single project into <shortname>_<date>.json. Runs in a worker process for multi-project runs,
+# so it creates its own client and converter. The response cache directory is shared by all workers.
+def extractProject(project: dict, converterOptions: dict, clientOptions: dict, cacheOptions: dict, now: str,
+                   runOptions: dict = None, converter: Converter = None, journal: CheckpointJournal = None) -> dict:
+    """
+    Extract the model of a project and write it to <shortname>_<now>.json.
+    :param runOptions: checkpointDir, resume, checkpointMaxAge (seconds), profile, store (snapshot store directory), force (write unchanged models),
+                       validate, schema (dsp-tools ontology JSON schema) and compact (no indentation)
+    :param converter: converter to use instead of a new one (watch mode)
+    :param journal: journal to use instead of the one in checkpointDir (watch mode)
+    :return: summary of the run
+    """
+    runOptions = runOptions or {}
+    start = time.perf_counter()
+    summary = {"id": project["id"], "shortname": project["shortname"], "file": None, "unchanged": None, "error": None}
+    try:
+        if converter is None:
+            responseCache = ResponseCache(**cacheOptions) if cacheOptions is not None else None
+            converter = Converter(SalsahClient(cache=responseCache, **clientOptions), **converterOptions)
+
+        # the journal records every completed stage, so a failed run can be resumed
+        if journal is None:
+            journal = CheckpointJournal(
+                os.path.join(runOptions["checkpointDir"], project["shortname"] + ".jsonl") if runOptions.get("checkpointDir") else None,
+                run={"project": project["id"], "server": converter.serverpath, "options": converter.runIdentity()},
+                resume=runOptions.get("resume", False), maxAge=runOptions.get("checkpointMaxAge", 24 * 3600))
+        run = converter.extractRun(project, journal)
+        model = run.model
+        summary["lists"] = len(model.lists)
+        summary["resources"] = sum(len(ontology.resources) for ontology in model.ontologies)
+        summary["properties"] = sum(len(ontology.properties) for ontology in model.ontologies)
+
+        # Validate the model before anything is written (element by element, the model is never converted as a whole)
+        if runOptions.get("validate", True):
+            errors, warnings = OntologyValidator(runOptions.get("schema")).validate(model)
+            for problem in warnings:
+                print(f'{project["shortname"]}: WARNING {problem}')
+            if errors:
+                for problem in errors:
+                    print(f'{project["shortname"]}: ERROR {problem}')
+                raise OntologyValidationError(errors)
+
+        # Write the run profile next to the output file (also if the model is unchanged)
+        if runOptions.get("profile", False):
+            summary["profile"] = project["shortname"] + "_" + now + "_profile.json"
+            with open(summary["profile"], 'w') as profileFile:
+                profileFile.write(json.dumps(converter.client.profile.report(), indent=4))
+
+        # Nothing to write if the model is the same as in the latest snapshot
+        latestName, latestHash = latestSnapshot(project["shortname"], runOptions.get("store"))
+        # (in large-list mode also the list files have to be the same as the published ones)
+        if not runOptions.get("force", False) and latestHash is not None and latestHash == jsonHash(model) and not run.listsChanged():
+            run.discardLists()
+            journal.remove()
+            summary["unchanged"] = latestName
+            summary["seconds"] = round(time.perf_counter() - start, 2)
+            return summary
+
+        # Create the new json files, the list files of large-list mode first
+        run.publishLists()
+        fileName = project["shortname"] + "_" + now + ".json"
+        with open(fileName, 'w') as jsonFile:
+            writeJson(model, jsonFile, None if runOptions.get("compact", False) else 4)
+        journal.remove()
+
+        summary["file"] = fileName
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def printSummary(summaries: list, seconds: float):
+    print(f"{'project':<20} {'lists':>6} {'resources':>10} {'properties':>11} {'seconds':>8}  result")
+    for summary in summaries:
+        if summary["error"] is None:
+            result = summary["file"] if summary["unchanged"] is None else f"unchanged since {summary['unchanged']}"
+            print(f"{summary['shortname']:<20} {summary['lists']:>6} {summary['resources']:>10} {summary['properties']:>11} {summary['seconds']:>8}  {result}")
+        else:
+            print(f"{summary['shortname']:<20} {'':>6} {'':>10} {'':>11} {summary['seconds']:>8}  FAILED {summary['error']}")
+    failed = sum(summary["error"] is not None for summary in summaries)
+    print(f"{len(summaries) - failed} of {len(summaries)} project(s) extracted in {seconds:.2f}s")
+
+
+# ======================================================================================================================
+# Watch mode: keep the models of projects current with a few requests per cycle
+class WatchJournal(CheckpointJournal):
+    """
+    In-memory journal of the details (restype_info, list nodes, project info) and listings of a watched project.
+    The stages are not recorded, so every extraction builds the model anew from the recorded details.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+
+    def record(self, key: str, value):
+        if not key.startswith("stage/"):
+            self.entries[key] = value
+
+    def drop(self, key: str):
+        self.entries.pop(key, None)
+
+
+class ModelWatcher:
+    """
+    Watches the model of a project. A cycle fetches only the listings of the resource types, selections and hlists
+    of its vocabularies and fingerprints every entry (sha256 of its canonical JSON). If a listing changed, the
+    details of the entries that were added or changed are dropped from the journal, and the model is extracted
+    again from the journal: only the dropped details are fetched, everything else is taken from the last cycle.
+
+    Changes that do not show in a listing (e.g. a new property of a resource type whose label did not change,
+    the project info or the resource types of other vocabularies used as link targets) are picked up by a full
+    cycle, which fetches everything again, including the catalogs (new or renamed vocabularies of the project).
+    """
+
+    listings = {
+        "resourcetype": ("/api/resourcetypes/", "resourcetypes"),
+        "selection": ("/api/selections/", "selections"),
+        "hlist": ("/api/hlists", "hlists")
     }
 
-    # Create an empty ontology
-    tmpOnto = copy.deepcopy(emptyOnto)
+    def __init__(self, converter: Converter, project: dict):
+        self.converter = converter
+        self.project = project
+        self.journal = WatchJournal()
+        # fingerprints of the listing entries of the last cycle (kind/id -> sha256)
+        self.fingerprints: Dict[str, str] = {}
+        # the model has to be extracted in the next cycle, even if the listings did not change
+        self.pending = True
+
+    def requestCount(self) -> int:
+        return sum(entry["calls"] for entry in self.converter.client.profile.requests.values())
+
+    # Fetch the listings and drop the details of added and changed entries. Returns the keys of these entries
+    def poll(self) -> List[str]:
+        fingerprints = {}
+        for vocabulary in self.converter.vocabulariesOf(self.project):
+            payload = {'vocabulary': vocabulary["shortname"], 'lang': 'all'}
+            for kind, (path, field) in self.listings.items():
+                entries = self.converter.client.getJson(f'{self.converter.serverpath}{path}', params=payload)[field]
+                key = f'{field}/{vocabulary["shortname"]}'
+                if self.journal.get(key) != entries:
+                    self.pending = True
+                self.journal.entries[key] = entries
+                for entry in entries:
+                    fingerprints[f'{kind}/{entry["id"]}'] = canonicalHash(entry)
+
+        changed = [key for key, fingerprint in fingerprints.items() if self.fingerprints.get(key) != fingerprint]
+        for key in changed + [key for key in self.fingerprints if key not in fingerprints]:
+            self.journal.drop(key)
+        self.fingerprints = fingerprints
+        return changed
+
+    def cycle(self, now: str, runOptions: dict, full: bool = False) -> dict:
+        """
+        Poll the listings and write the model if it changed.
+        :param full: fetch the catalogs and all details again
+        :return: summary of the extraction (see extractProject), with the number of requests and changed entries
+        """
+        requests = self.requestCount()
+        start = time.perf_counter()
+        if full:
+            self.converter.resetCatalogs()
+            self.journal.entries.clear()
+            self.fingerprints = {}
+        try:
+            changed = self.poll()
+        except Exception as e:
+            return {"shortname": self.project["shortname"], "file": None, "unchanged": None, "changed": 0,
+                    "error": f"{type(e).__name__}: {e}", "requests": self.requestCount() - requests,
+                    "seconds": round(time.perf_counter() - start, 2)}
+
+        if self.pending:
+            summary = extractProject(self.project, None, None, None, now, runOptions, self.converter, self.journal)
+            # a failed extraction is repeated in the next cycle (the details that were fetched are kept)
+            self.pending = summary["error"] is not None
+        else:
+            summary = {"shortname": self.project["shortname"], "file": None, "unchanged": "the last cycle", "error": None}
+        summary["changed"] = len(changed)
+        summary["requests"] = self.requestCount() - requests
+        summary["seconds"] = round(time.perf_counter() - start, 2)
+        return summary
+
+
+def watchProjects(projects: list, converterOptions: dict, clientOptions: dict, runOptions: dict, interval: float,
+                  fullEvery: int = 0, cycles: int = None):
+    """
+    Watch the models of projects: every interval seconds run a cycle of ModelWatcher for every project.
+    :param fullEvery: every fullEvery-th cycle is a full cycle (0: only the first one)
+    :param cycles: stop after this number of cycles (None: run until interrupted)
+    """
+    # the listings have to be fresh, the details are kept by the watchers: no response cache
+    converter = Converter(SalsahClient(**clientOptions), **converterOptions)
+    watchers = [ModelWatcher(converter, project) for project in projects]
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        if cycle:
+            time.sleep(interval)
+        full = cycle == 0 or bool(fullEvery and cycle % fullEvery == 0)
+        now = datetime.today().strftime('%Y%m%d')
+        for watcher in watchers:
+            summary = watcher.cycle(now, runOptions, full)
+            if summary["error"] is not None:
+                result = f"FAILED {summary['error']}"
+            elif summary["file"] is not None:
+                result = f"written {summary['file']}"
+            else:
+                result = f"unchanged since {summary['unchanged']}"
+            changes = "full cycle" if full else f"{summary['changed']} changed listing entries"
+            print(f"{datetime.now():%H:%M:%S} {summary['shortname']}: {changes}, {summary['requests']} request(s), "
+                  f"{summary['seconds']}s, {result}", flush=True)
+        cycle += 1
 
-    # Creating the ontology converter object. This object will create the new jsons.
-    salsahConverter = Converter()
 
-    # Creating the helper functions object
-    utils = Utils()
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Extract the data model of SALSAH projects into dsp-tools ontology JSON files.")
+    parser.add_argument("projects", nargs="*", default=["6"], metavar="PROJECT",
+                        help='ids or shortnames of the projects to extract, "all" for every project (default: 6, Webern)')
+    parser.add_argument("--server", default=Converter.serverpath, help=f"SALSAH server (default: {Converter.serverpath})")
+    parser.add_argument("--shortcodes-url", default=Converter.shortcodesUrl, help="CSV file (url or local file) mapping project shortnames to shortcodes")
+    parser.add_argument("--projects-url", help="projects catalog, url or local file (default: <server>/api/projects)")
+    parser.add_argument("--vocabularies-url", help="vocabularies catalog, url or local file (default: <server>/api/vocabularies)")
+    parser.add_argument("--list-projects", action="store_true", help="print id, shortname and longname of every SALSAH project and exit")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="maximum number of projects extracted in parallel processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="connect timeout in seconds (default: 10)")
+    parser.add_argument("--read-timeout", type=float, default=60.0, help="read timeout in seconds (default: 60)")
+    parser.add_argument("--retries", type=int, default=5, help="retries of a failed request (default: 5)")
+    parser.add_argument("--backoff", type=float, default=0.5, help="base delay of the exponential backoff in seconds (default: 0.5)")
+    parser.add_argument("--cache-dir", default=".salsah_cache", help="directory of the response cache (default: .salsah_cache)")
+    parser.add_argument("--cache-ttl", type=float, default=24.0, help="hours a cached response stays valid (default: 24)")
+    parser.add_argument("--cache-size", type=int, default=200, help="maximum size of the response cache in MB (default: 200)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="maximum number of concurrent requests per project (default: 8)")
+    parser.add_argument("--rate-limit", type=float, default=20.0, help="maximum requests per second sent to SALSAH by all workers together, 0 for no limit (default: 20)")
+    parser.add_argument("--checkpoint-dir", default=".checkpoints", help="directory of the checkpoint journals (default: .checkpoints)")
+    parser.add_argument("--resume", action="store_true", help="resume failed runs from their checkpoint journals")
+    parser.add_argument("--checkpoint-max-age", type=float, default=24.0, help="hours after which a checkpoint journal is not resumed (default: 24)")
+    parser.add_argument("--profile", action="store_true", help="write a JSON report of requests and stage timings next to each output file")
+    parser.add_argument("--store", default="archive/store", help="snapshot store with the earlier snapshots (default: archive/store)")
+    parser.add_argument("--large-lists", action="store_true", help="write every list into its own file in <large-lists-dir>/<shortname>/, referenced from the ontology")
+    parser.add_argument("--large-lists-dir", default="lists", metavar="DIR", help="directory of the list files of --large-lists (default: lists)")
+    parser.add_argument("--compact", action="store_true", help="write the model without indentation")
+    parser.add_argument("--force", action="store_true", help="write the model even if it is the same as in the latest snapshot")
+    parser.add_argument("--schema", help=f"dsp-tools ontology JSON schema file (default: download {schemaUrl})")
+    parser.add_argument("--no-validate", action="store_true", help="write the model without validating it")
+    parser.add_argument("--watch", nargs="?", type=float, const=300.0, metavar="SECONDS",
+                        help="keep running and update the models when the listings of resource types and lists change, polled every SECONDS (default: 300)")
+    parser.add_argument("--watch-full", type=int, default=12, metavar="N",
+                        help="in watch mode, fetch all details again every N cycles, 0 for never (default: 12)")
+    cacheMode = parser.add_mutually_exclusive_group()
+    cacheMode.add_argument("--no-cache", action="store_true", help="do not use the response cache")
+    cacheMode.add_argument("--offline", action="store_true", help="replay all responses from the cache, no network access")
+    cacheMode.add_argument("--refresh", action="store_true", help="fetch everything again and update the cache")
+    args = parser.parse_args()
+    if args.watch is not None and args.offline:
+        parser.error("--watch needs the network, it cannot be combined with --offline")
+
+    cacheOptions = None
+    if not args.no_cache:
+        cacheOptions = {"directory": args.cache_dir, "ttl": args.cache_ttl * 3600, "maxSize": args.cache_size * 1024 * 1024}
+    converterOptions = {"serverpath": args.server, "shortcodesUrl": args.shortcodes_url, "listDir": args.large_lists_dir if args.large_lists else None,
+                        "projectsUrl": args.projects_url, "vocabulariesUrl": args.vocabularies_url}
+    clientOptions = {"timeout": args.timeout, "readTimeout": args.read_timeout, "retries": args.retries, "backoff": args.backoff,
+                     "offline": args.offline, "refresh": args.refresh, "maxInFlight": args.max_in_flight, "rateLimit": args.rate_limit}
+
+    # Get the catalog of all SALSAH projects (only this catalog, the workers load the others)
+    catalogClient = SalsahClient(cache=ResponseCache(**cacheOptions) if cacheOptions is not None else None, **clientOptions)
+    salsahProjects = Converter(catalogClient, **converterOptions).salsahJson["projects"]
+    if args.list_projects:
+        for project in salsahProjects:
+            print(f"{project['id']:>6}  {project['shortname']:<24} {project['longname']}")
+        sys.exit(0)
+    selectedProjects = selectProjects(salsahProjects, args.projects)
 
     # Get current date to append to file name
     now = datetime.today().strftime('%Y%m%d')
 
-    # Here the ontology object is being filled
-    for projects in salsahConverter.salsahJson["projects"]:
-        # do only extract model for Webern project (id=6)
-        if projects["id"] == "6":
-            #pprint("Making Deepcopy")
-            tmpOnto = copy.deepcopy(
-                emptyOnto)  # Its necessary to reset the tmpOnto for each project. Otherwhise they will overlap
-            #pprint("FillShortLongName")
-            salsahConverter.fillProjectInfo(projects)  # Fill the shortname as well as the longname into the empty ontology.
-            #pprint("FillVocName")
-            salsahConverter.fillVocInfo(projects)  # Fill in the vocabulary name and label
-            salsahConverter.fetchLists(projects)
-            #pprint("FetchRessources")
-            salsahConverter.fetchResources(projects)
-            #pprint("FetchProperties")
-            salsahConverter.fetchProperties(projects)
-            # Create the new json files
-            with open(projects["shortname"] + "_" + now + ".json", 'w') as jsonFile:
-                jsonFile.write(json.dumps(tmpOnto, indent=4))
-
+    # Options of the project runs; the validator compiles the dsp-tools JSON schema once per project
+    runOptions = {"checkpointDir": args.checkpoint_dir, "resume": args.resume, "checkpointMaxAge": args.checkpoint_max_age * 3600,
+                  "profile": args.profile, "store": args.store, "force": args.force, "validate": not args.no_validate, "schema": None,
+                  "compact": args.compact}
+    if not args.no_validate:
+        try:
+            if args.schema:
+                with open(args.schema) as f:
+                    runOptions["schema"] = json.load(f)
+            else:
+                runOptions["schema"] = catalogClient.getJson(schemaUrl)
+        except Exception as e:
+            print(f"Could not load the ontology schema ({type(e).__name__}: {e}), checking references only")
+
+    if args.watch is not None:
+        # one process for all projects, the watchers share the client and its rate limit
+        clientOptions.update(offline=False, refresh=False)
+        try:
+            watchProjects(selectedProjects, converterOptions, clientOptions, runOptions, args.watch, args.watch_full)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    start = time.perf_counter()
+    workers = max(1, min(args.workers, len(selectedProjects)))
+    if workers == 1:
+        summaries = [extractProject(project, converterOptions, clientOptions, cacheOptions, now, runOptions)
+                     for project in selectedProjects]
+    else:
+        # the workers share the rate limit, so the server sees the same load as with a single process
+        clientOptions["rateLimit"] = args.rate_limit / workers
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(extractProject, selectedProjects,
+                                          [converterOptions] * len(selectedProjects),
+                                          [clientOptions] * len(selectedProjects),
+                                          [cacheOptions] * len(selectedProjects),
+                                          [now] * len(selectedProjects),
+                                          [runOptions] * len(selectedProjects)))
+
+    printSummary(summaries, time.perf_counter() - start)
+    if any(summary["error"] is not None for summary in summaries):
+        sys.exit(1)
+    sys.exit(unchangedStatus if all(summary["unchanged"] is not None for summary in summaries) else 0)
@@ -0,0 +1,304 @@
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import zlib
+
+# Serializations tried to reproduce the exact bytes of a JSON snapshot from its parsed document
+jsonFormats = ({"indent": 4, "ensure_ascii": True}, {"indent": 4, "ensure_ascii": False}, {"separators": [",", ":"]})
+
+
+# Hash of the canonical form of a JSON document (sorted keys, no whitespace): equal for equal content, whatever
+# the formatting of the file
+def canonicalHash(document) -> str:
+    digest = hashlib.sha256()
+    # hashed chunk by chunk, the canonical form is never built as one string
+    for chunk in json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False).iterencode(document):
+        digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ======================================================================================================================
+# Structural deltas of JSON documents. Dicts are diffed by key and lists of named elements (resources, properties,
+# cardinalities, list nodes) by name, so an added resource does not shift all following ones.
+# Everything else that changed is replaced as a whole.
+def namedElements(value) -> bool:
+    return isinstance(value, list) and all(isinstance(element, dict) and "name" in element for element in value) \
+        and len({element["name"] for element in value}) == len(value)
+
+
+def sameJson(old, new) -> bool:
+    # == ignores the order of dict keys, the serialized snapshot does not
+    if isinstance(old, dict) and isinstance(new, dict):
+        return list(old) == list(new) and all(sameJson(old[key], new[key]) for key in old)
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(sameJson(a, b) for a, b in zip(old, new))
+    return type(old) == type(new) and old == new
+
+
+def jsonDelta(old, new):
+    """
+    :return: the delta that turns old into new, None if they are equal
+    """
+    if sameJson(old, new):
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        delta = {"keys": list(new)}
+        changes = {key: jsonDelta(old[key], new[key]) for key in new if key in old and not sameJson(old[key], new[key])}
+        if changes:
+            delta["sub"] = changes
+        added = {key: new[key] for key in new if key not in old}
+        if added:
+            delta["set"] = added
+        return {"dict": delta}
+    if namedElements(old) and namedElements(new) and old and new:
+        oldByName = {element["name"]: element for element in old}
+        delta = {"names": [element["name"] for element in new]}
+        changes = {element["name"]: jsonDelta(oldByName[element["name"]], element) for element in new
+                   if element["name"] in oldByName and not sameJson(oldByName[element["name"]], element)}
+        if changes:
+            delta["sub"] = changes
+        added = {element["name"]: element for element in new if element["name"] not in oldByName}
+        if added:
+            delta["set"] = added
+        return {"named": delta}
+    return {"value": new}
+
+
+def applyJsonDelta(old, delta):
+    if delta is None:
+        return old
+    if "dict" in delta:
+        delta = delta["dict"]
+        changes, added = delta.get("sub", {}), delta.get("set", {})
+        return {key: added[key] if key in added else applyJsonDelta(old[key], changes.get(key)) for key in delta["keys"]}
+    if "named" in delta:
+        delta = delta["named"]
+        changes, added = delta.get("sub", {}), delta.get("set", {})
+        oldByName = {element["name"]: element for element in old}
+        return [added[name] if name in added else applyJsonDelta(oldByName[name], changes.get(name))
+                for name in delta["names"]]
+    return delta["value"]
+
+
+# ======================================================================================================================
+# Deltas of text (SVG) files: the replaced ranges of the old version's tokens. PlantUML writes the whole drawing
+# into one line, so the text is split after every tag instead of into lines
+def tokens(text: str) -> list:
+    return re.findall(r"[^>\n]*(?:>|\n|$)", text)[:-1]
+
+
+def textDelta(old: str, new: str) -> list:
+    oldTokens, newTokens = tokens(old), tokens(new)
+    matcher = difflib.SequenceMatcher(None, oldTokens, newTokens, autojunk=False)
+    return [[i1, i2, newTokens[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def similarTokens(old: str, new: str, threshold: float = 0.5) -> bool:
+    # a changed model moves most shapes of the PlantUML layout; diffing such versions is slow and saves nothing
+    oldTokens = set(tokens(old))
+    newTokens = tokens(new)
+    return sum(token in oldTokens for token in newTokens) >= threshold * len(newTokens)
+
+
+def applyTextDelta(old: str, delta: list) -> str:
+    result = tokens(old)
+    # apply from the end, so the positions of the earlier ranges stay valid
+    for i1, i2, newTokens in reversed(delta):
+        result[i1:i2] = newTokens
+    return "".join(result)
+
+
+def seriesOf(filename: str):
+    """
+    :return: series and date of a snapshot file name, e.g. ("webern_plantuml.svg", "20210920") for webern_20210920_plantuml.svg
+    """
+    match = re.match(r"^(.*?)_(\d{8})(.*)$", os.path.basename(filename))
+    if not match:
+        raise ValueError(f"No date in snapshot file name {filename}")
+    return match.group(1) + match.group(3), match.group(2)
+
+
+class SnapshotStore:
+    """
+    Archive of dated snapshots (extracted JSON models and their PlantUML SVGs) as deltas.
+
+    Every series of snapshots (e.g. webern.json, webern_plantuml.svg) starts with a keyframe, the complete
+    file; each following version is stored as zlib compressed delta to its predecessor - structural for JSON,
+    tag by tag for the SVGs (a re-layouted SVG becomes a keyframe). Every keyframeInterval versions a new keyframe bounds the number of deltas
+    needed to reconstruct a version. index.json lists all versions with date, sha256 and object file;
+    reconstructed versions are verified against their sha256.
+    """
+
+    def __init__(self, directory: str = "archive/store", keyframeInterval: int = 20):
+        """
+        :param directory: folder of index.json and the objects (created if missing)
+        :param keyframeInterval: maximum number of versions between two keyframes
+        """
+        self.directory = directory
+        self.keyframeInterval = keyframeInterval
+        self.indexPath = os.path.join(directory, "index.json")
+        self.index = {"series": {}}
+        if os.path.exists(self.indexPath):
+            with open(self.indexPath) as f:
+                self.index = json.load(f)
+        # last reconstructed version per series, sequential access needs one delta per version
+        self.recent: dict = {}
+
+    def versions(self, series: str) -> list:
+        return self.index["series"].get(series, [])
+
+    def find(self, name: str) -> dict:
+        series, date = seriesOf(name)
+        for entry in self.versions(series):
+            if entry["date"] == date:
+                return entry
+        raise KeyError(f"No snapshot {name} in {self.directory}")
+
+    def latest(self, series: str):
+        versions = self.versions(series)
+        return versions[-1] if versions else None
+
+    def writeAtomic(self, path: str, content: bytes):
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmpPath, path)
+
+    def readObject(self, entry: dict):
+        with open(os.path.join(self.directory, entry["object"]), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    @staticmethod
+    def serialize(document, fmt: dict) -> bytes:
+        return json.dumps(document, **fmt).encode("utf-8")
+
+    def load(self, series: str, position: int):
+        """
+        :return: the content of a version: the parsed document of JSON snapshots, the text of all others
+        """
+        versions = self.versions(series)
+        recent = self.recent.get(series)
+        start = position
+        while not versions[start]["keyframe"] and not (recent and recent[0] == start):
+            start -= 1
+        if recent and recent[0] == start:
+            content = recent[1]
+        else:
+            content = self.readObject(versions[start])["content"]
+        for entry in versions[start + 1:position + 1]:
+            delta = self.readObject(entry)["delta"]
+            # JSON snapshots that are not reproducible from their document are stored as text, like the SVGs
+            content = applyJsonDelta(content, delta) if "format" in entry else applyTextDelta(content, delta)
+        self.recent[series] = (position, content)
+        return content
+
+    def get(self, name: str) -> bytes:
+        """
+        :param name: file name of the snapshot, e.g. webern_20210920.json
+        :return: the exact bytes of the snapshot
+        """
+        series, _ = seriesOf(name)
+        entry = self.find(name)
+        content = self.load(series, self.versions(series).index(entry))
+        data = self.serialize(content, entry["format"]) if "format" in entry else content.encode("utf-8")
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Reconstructed {name} does not match its sha256")
+        return data
+
+    def add(self, path: str) -> bool:
+        """
+        Add a snapshot file as the newest version of its series.
+        :return: False if the version is already stored
+        """
+        name = os.path.basename(path)
+        series, date = seriesOf(name)
+        with open(path, "rb") as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        versions = self.index["series"].setdefault(series, [])
+        for entry in versions:
+            if entry["date"] == date:
+                if entry["sha256"] != sha256:
+                    raise ValueError(f"{name} is already stored with different content")
+                return False
+        if versions and versions[-1]["date"] > date:
+            raise ValueError(f"{name} is older than the newest stored version {versions[-1]['name']}")
+
+        entry = {"date": date, "name": name, "sha256": sha256}
+        if series.endswith(".json"):
+            content = json.loads(data)
+            fmt = next((fmt for fmt in jsonFormats if self.serialize(content, fmt) == data), None)
+            if fmt is None:
+                # not reproducible from the parsed document, store the text
+                content = data.decode("utf-8")
+            else:
+                entry["format"] = fmt
+        else:
+            content = data.decode("utf-8")
+
+        previous = versions[-1] if versions else None
+        sinceKeyframe = next((i for i, version in enumerate(reversed(versions)) if version["keyframe"]), len(versions))
+        keyframe = previous is None or sinceKeyframe + 1 >= self.keyframeInterval \
+            or ("format" in previous) != ("format" in entry)
+        if not keyframe:
+            previousContent = self.load(series, len(versions) - 1)
+            if "format" in entry:
+                obj = {"delta": jsonDelta(previousContent, content)}
+            elif similarTokens(previousContent, content):
+                obj = {"delta": textDelta(previousContent, content)}
+            else:
+                keyframe = True
+        if keyframe:
+            obj = {"content": content}
+
+        entry["keyframe"] = keyframe
+        entry["object"] = f"objects/{name}.z"
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        self.writeAtomic(os.path.join(self.directory, entry["object"]),
+                         zlib.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"), 9))
+        versions.append(entry)
+        self.recent[series] = (len(versions) - 1, content)
+        self.save()
+        return True
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.writeAtomic(self.indexPath, json.dumps(self.index, indent=4).encode("utf-8"))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Delta compressed archive of the extracted model snapshots.")
+    parser.add_argument("--store", default="archive/store", help="folder of the store (default: archive/store)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    addCommand = commands.add_parser("add", help="add snapshot files, oldest first")
+    addCommand.add_argument("files", nargs="+")
+    addCommand.add_argument("--remove", action="store_true", help="delete the files once they are stored")
+    addCommand.add_argument("--keyframe-interval", type=int, default=20, help="maximum versions between keyframes (default: 20)")
+    getCommand = commands.add_parser("get", help="reconstruct a snapshot")
+    getCommand.add_argument("name", help="file name of the snapshot, e.g. webern_20210920.json")
+    getCommand.add_argument("--output", help="file to write to (default: the snapshot's name)")
+    commands.add_parser("list", help="list the stored snapshots")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        store = SnapshotStore(args.store, args.keyframe_interval)
+        for path in sorted(args.files, key=lambda path: seriesOf(path)[::-1]):
+            print(f"{'Adding' if store.add(path) else 'Already stored'} {path}")
+            if args.remove:
+                os.remove(path)
+    elif args.command == "get":
+        store = SnapshotStore(args.store)
+        with open(args.output or args.name, "wb") as f:
+            f.write(store.get(args.name))
+    else:
+        store = SnapshotStore(args.store)
+        for series, versions in sorted(store.index["series"].items()):
+            for entry in versions:
+                size = os.path.getsize(os.path.join(store.directory, entry["object"]))
+                print(f"{entry['name']:<36} {'keyframe' if entry['keyframe'] else 'delta':<9} {size:>9} {entry['sha256'][:12]}")
+    sys.exit(0)
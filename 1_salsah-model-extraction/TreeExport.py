@@ -0,0 +1,155 @@
+from collections import deque
+from typing import List
+from VisualizeJson import newestSnapshot
+import argparse
+import glob
+import json
+import os
+
+# Levels below the top nodes of a chunk file; deeper nodes start a new chunk (json can not nest arbitrarily deep)
+maxChunkDepth = 100
+
+
+def treeNode(name: str, children: List[dict] = None) -> dict:
+    return {"name": name, "children": children if children is not None else []}
+
+
+def modelTree(document: dict) -> dict:
+    """
+    :return: the model as d3 hierarchy: project -> lists -> list nodes, and per ontology resources -> cardinalities
+    and properties -> object, super properties and gui element
+    """
+    project = document["project"]
+    lists = treeNode("lists")
+    # list nodes can be nested deeper than the recursion limit, they are converted with an explicit stack
+    stack = [(project["lists"], lists["children"])]
+    while stack:
+        nodes, container = stack.pop()
+        for node in nodes:
+            child = treeNode(node["name"])
+            if isinstance(node.get("nodes"), list):
+                stack.append((node["nodes"], child["children"]))
+            elif isinstance(node.get("nodes"), dict):
+                # large-list mode: the nodes are in a file of their own
+                child["children"].append(treeNode(f'file: {node["nodes"]["file"]}'))
+            container.append(child)
+
+    ontologies = []
+    for ontology in project["ontologies"]:
+        resources = [treeNode(resource["name"], [treeNode(f'{cardinality["propname"]} ({cardinality["cardinality"]})')
+                                                 for cardinality in resource.get("cardinalities", [])])
+                     for resource in ontology["resources"]]
+        properties = []
+        for prop in ontology["properties"]:
+            details = [treeNode(f'object: {prop.get("object", "")}'), treeNode(f'super: {", ".join(prop.get("super", []))}'),
+                       treeNode(f'gui_element: {prop.get("gui_element", "")}')]
+            hlist = (prop.get("gui_attributes") or {}).get("hlist")
+            if hlist is not None:
+                details.append(treeNode(f"hlist: {hlist}"))
+            properties.append(treeNode(prop["name"], details))
+        ontologies.append(treeNode(ontology["name"], [treeNode("resources", resources), treeNode("properties", properties)]))
+
+    return treeNode(project["shortname"], [lists] + ontologies)
+
+
+def groupChildren(root: dict, groupSize: int):
+    """
+    Put the children of nodes with more than groupSize children into groups of groupSize ("1-100", "101-200", ...),
+    so that no expanded node shows more than groupSize children.
+    """
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = node["children"]
+        if len(children) > groupSize:
+            node["children"] = [treeNode(f"{start + 1}-{min(start + groupSize, len(children))}", children[start:start + groupSize])
+                                for start in range(0, len(children), groupSize)]
+        stack.extend(children)
+
+
+def countDescendants(root: dict):
+    # post-order without recursion: a node is counted after all its children
+    stack, order = [root], []
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node["children"])
+    for node in reversed(order):
+        node["size"] = sum(child["size"] + 1 for child in node["children"])
+
+
+def summary(node: dict) -> dict:
+    return {"name": node["name"], "childCount": len(node["children"]), "size": node["size"]}
+
+
+def writeChunks(root: dict, directory: str, chunkSize: int = 500) -> int:
+    """
+    Write the tree into chunk files. A chunk file is a list of subtrees (root.json: the root only) with, breadth
+    first, as many levels as fit into chunkSize nodes (at most maxChunkDepth). When the grandchildren of a node do not fit any more, its
+    children get "chunk" (file name) and "index" (position of their subtree in that file) instead of "children";
+    their subtrees are written the same way, siblings share chunk files. Every node has its childCount and size
+    (number of descendants), so the viewer can show them before the children are loaded.
+    :return: number of chunk files
+    """
+    os.makedirs(directory, exist_ok=True)
+    for stale in glob.glob(os.path.join(glob.escape(directory), "*.json")):
+        os.remove(stale)
+
+    pending = deque([([root], "root.json")])
+    files = 1
+    while pending:
+        tops, fileName = pending.popleft()
+        copies = [summary(top) for top in tops]
+        budget = chunkSize
+        frontier = deque()
+        for top, copy in zip(tops, copies):
+            copy["children"] = [summary(child) for child in top["children"]]
+            budget -= len(top["children"])
+            frontier.append((top, copy, 1))
+
+        while frontier:
+            node, copy, depth = frontier.popleft()
+            parents = [(child, childCopy) for child, childCopy in zip(node["children"], copy["children"]) if child["children"]]
+            grandchildren = sum(len(child["children"]) for child, _ in parents)
+            if grandchildren <= budget and depth < maxChunkDepth:
+                budget -= grandchildren
+                for child, childCopy in parents:
+                    childCopy["children"] = [summary(grandchild) for grandchild in child["children"]]
+                    frontier.append((child, childCopy, depth + 1))
+                continue
+            # consecutive siblings share a chunk file while their children fit into it
+            groups, size = [[]], 0
+            for child, childCopy in parents:
+                if groups[-1] and size + len(child["children"]) > chunkSize:
+                    groups.append([])
+                    size = 0
+                groups[-1].append((child, childCopy))
+                size += len(child["children"])
+            for group in groups:
+                files += 1
+                for index, (child, childCopy) in enumerate(group):
+                    childCopy["chunk"] = f"{files - 1}.json"
+                    childCopy["index"] = index
+                pending.append(([child for child, _ in group], f"{files - 1}.json"))
+
+        with open(os.path.join(directory, fileName), "w") as f:
+            json.dump(copies, f, ensure_ascii=False, separators=(",", ":"))
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the newest extracted model as chunked d3 tree for index.html.")
+    parser.add_argument("--snapshot", help="model to export (default: newest <shortname>_<date>.json)")
+    parser.add_argument("--shortname", default="webern", help="project of the snapshot (default: webern)")
+    parser.add_argument("--output", default="tree", help="directory of the chunk files (default: tree, read by index.html)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="maximum number of nodes per chunk file (default: 500)")
+    parser.add_argument("--group-size", type=int, default=100, help="maximum number of children shown per node (default: 100)")
+    args = parser.parse_args()
+
+    jsonFile = args.snapshot or newestSnapshot(args.shortname)
+    with open(jsonFile) as f:
+        tree = modelTree(json.load(f))
+    groupChildren(tree, args.group_size)
+    countDescendants(tree)
+    count = writeChunks(tree, args.output, args.chunk_size)
+    print(f"{jsonFile}: {tree['size'] + 1} nodes in {count} chunk(s) -> {args.output}/root.json")
@@ -1,20 +1,162 @@
+from typing import Iterable, Iterator, List, TextIO, Tuple
+from OntologyModel import JsonReader, writeJson
+import argparse
 import glob
+import hashlib
+import io
 import json
-from datetime import datetime
+import os
+import re
+import shutil
+import subprocess
+import tempfile
 
-jsonFile = "./webern_*.json"
+# Rendered SVGs of the diagram parts, named by the sha256 of their PlantUML source (and of the PlantUML jar)
+cacheDir = ".plantuml_cache"
 
-# find json file and load json
-for fileName in glob.glob(jsonFile):
-    with open(fileName) as f:
-        file = json.load(f)
 
-# Get current date to append to file name
-now = datetime.today().strftime('%Y%m%d')
+def newestSnapshot(shortname: str = "webern") -> str:
+    # the date in the file name (<shortname>_YYYYMMDD.json) decides, not the order of glob
+    snapshots = [path for path in glob.glob(f"./{shortname}_*.json") if re.search(r"_\d{8}\.json$", path)]
+    if not snapshots:
+        raise SystemExit(f"No {shortname}_<date>.json snapshot in the working directory")
+    return max(snapshots, key=lambda path: path[-13:])
 
-with open("webern_" + now + "_plantuml.txt", 'w') as textFile:
+
+def plantUml(value) -> str:
+    textFile = io.StringIO()
     textFile.write("@startjson")
     textFile.write("\n")
-    textFile.write(json.dumps(file, indent=4))
+    # written with the model writer, which also reformats compact model files
+    writeJson(value, textFile, 4)
     textFile.write("\n")
     textFile.write("@endjson")
+    return textFile.getvalue()
+
+
+def chunks(name: str, key: str, elements: Iterable, maxLines: int) -> Iterator[Tuple[str, str]]:
+    """
+    The elements are taken one at a time; only the elements of the part that is being filled are kept.
+    :return: the parts (name, PlantUML source) of a section {key: elements}: one part, or consecutive runs of
+    elements of at most maxLines lines each (<name>_1, <name>_2, ...) if the section is longer
+    """
+    run, lines, number = [], 0, 0
+    for element in elements:
+        elementLines = json.dumps(element, indent=4).count("\n") + 1
+        if run and lines + elementLines > maxLines:
+            # the section is longer than maxLines, the run is a part of its own
+            number += 1
+            yield f"{name}_{number}", plantUml({key: run})
+            run, lines = [], 0
+        run.append(element)
+        lines += elementLines
+    text = plantUml({key: run})
+    if number == 0 and (text.count("\n") <= maxLines or len(run) <= 1):
+        yield name, text
+    else:
+        yield f"{name}_{number + 1}", text
+
+
+def diagramParts(jsonFile: TextIO, perResource: bool = False, maxLines: int = 1000) -> Iterator[Tuple[str, str]]:
+    """
+    Split a model into diagram parts: the lists, the properties and resources of every ontology (or one part per
+    resource class with perResource) and the project (with prefixes and the names of the ontologies). The model is
+    read section by section with JsonReader, only the elements of the current part are in memory.
+    :return: name and PlantUML source of every part, the project part last
+    """
+    reader = JsonReader(jsonFile)
+    header, projectHeader, ontologies = {}, {}, []
+    for key in reader.members():
+        if key != "project":
+            header[key] = reader.value()
+            continue
+        for projectKey in reader.members():
+            if projectKey == "lists":
+                yield from chunks("lists", "lists", (reader.value() for _ in reader.elements()), maxLines)
+            elif projectKey == "ontologies":
+                for _ in reader.elements():
+                    # the name of an ontology comes before its properties and resources
+                    ontology = {}
+                    for ontologyKey in reader.members():
+                        if ontologyKey not in ("properties", "resources"):
+                            ontology[ontologyKey] = reader.value()
+                            continue
+                        elements = (reader.value() for _ in reader.elements())
+                        if ontologyKey == "resources" and perResource:
+                            yield from ((f'{ontology["name"]}_{resource["name"]}', plantUml({"resources": [resource]}))
+                                        for resource in elements)
+                        else:
+                            yield from chunks(f'{ontology["name"]}_{ontologyKey}', ontologyKey, elements, maxLines)
+                    ontologies.append(ontology)
+            else:
+                projectHeader[projectKey] = reader.value()
+    projectHeader["ontologies"] = ontologies
+    header["project"] = projectHeader
+    yield "project", plantUml(header)
+
+
+def renderParts(parts: Iterable[Tuple[str, str]], prefix: str, plantumlJar: str, cacheDirectory: str = cacheDir) -> Tuple[int, int]:
+    """
+    Write <prefix><part>.svg for every part. Parts whose source was rendered before (by the same PlantUML jar)
+    are copied from the cache, the sources of all others are written as they come and rendered in a single
+    PlantUML run.
+    :return: number of parts and number of rendered parts
+    """
+    os.makedirs(cacheDirectory, exist_ok=True)
+    with open(plantumlJar, "rb") as f:
+        jarHash = hashlib.sha256(f.read()).hexdigest()
+
+    names: List[Tuple[str, str]] = []
+    with tempfile.TemporaryDirectory(dir=cacheDirectory) as tmpDir:
+        sources = {}
+        for name, text in parts:
+            key = hashlib.sha256((jarHash + text).encode("utf-8")).hexdigest()
+            names.append((key, name))
+            if key not in sources and not os.path.exists(os.path.join(cacheDirectory, key + ".svg")):
+                sources[key] = os.path.join(tmpDir, key + ".txt")
+                with open(sources[key], "w") as textFile:
+                    textFile.write(text)
+        if sources:
+            subprocess.run(["java", "-jar", plantumlJar, "-tsvg", "-o", os.path.abspath(tmpDir)] + list(sources.values()), check=True)
+            for key in sources:
+                os.replace(os.path.join(tmpDir, key + ".svg"), os.path.join(cacheDirectory, key + ".svg"))
+
+    for key, name in names:
+        shutil.copyfile(os.path.join(cacheDirectory, key + ".svg"), prefix + name + ".svg")
+    # the cache only keeps the parts of the current model
+    keys = {key for key, _ in names}
+    for entry in os.listdir(cacheDirectory):
+        if entry.endswith(".svg") and entry[:-4] not in keys:
+            os.remove(os.path.join(cacheDirectory, entry))
+    return len(names), len(sources)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Create PlantUML diagrams of the newest extracted model, one per section.")
+    parser.add_argument("--snapshot", help="model to visualize (default: newest <shortname>_<date>.json)")
+    parser.add_argument("--shortname", default="webern", help="project of the snapshot (default: webern)")
+    parser.add_argument("--plantuml", metavar="JAR", help="render the SVGs with this PlantUML jar (default: only write the .txt sources)")
+    parser.add_argument("--per-resource", action="store_true", help="one diagram per resource class")
+    parser.add_argument("--max-lines", type=int, default=1000, help="split longer sections into several diagrams (default: 1000)")
+    parser.add_argument("--cache-dir", default=cacheDir, help=f"cache of rendered SVGs (default: {cacheDir})")
+    args = parser.parse_args()
+
+    jsonFile = args.snapshot or newestSnapshot(args.shortname)
+
+    # the diagrams carry the date of the snapshot: webern_<date>_plantuml_<part>.svg
+    prefix = os.path.basename(jsonFile)[:-len(".json")] + "_plantuml_"
+    for stale in glob.glob(glob.escape(prefix) + "*"):
+        os.remove(stale)
+
+    with open(jsonFile) as f:
+        parts = diagramParts(f, args.per_resource, args.max_lines)
+        if args.plantuml:
+            count, rendered = renderParts(parts, prefix, args.plantuml, args.cache_dir)
+            print(f"{jsonFile}: {count} diagram(s), {rendered} rendered, {count - rendered} from the cache")
+        else:
+            count = 0
+            for name, text in parts:
+                with open(prefix + name + ".txt", 'w') as textFile:
+                    textFile.write(text)
+                count += 1
+            print(f"{jsonFile}: {count} diagram source(s) {prefix}*.txt")
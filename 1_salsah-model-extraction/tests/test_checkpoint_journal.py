@@ -0,0 +1,95 @@
+import json
+import time
+
+from CheckpointJournal import CheckpointJournal
+
+run = {"project": "6", "server": "https://www.salsah.org", "options": {"listDir": None}}
+
+
+def failedRun(path: str) -> None:
+    journal = CheckpointJournal(path, run)
+    journal.record("resourcetype/1", {"name": "webern:piece"})
+    journal.record("stage/lists", {"model": {}})
+    journal.close()
+
+
+def test_resume(tmp_path):
+    path = str(tmp_path / "webern.jsonl")
+    failedRun(path)
+    journal = CheckpointJournal(path, run, resume=True)
+    assert journal.get("resourcetype/1") == {"name": "webern:piece"}
+    assert "stage/lists" in journal
+    # the resumed run appends to the journal
+    journal.record("stage/resources", {"model": {}})
+    journal.close()
+    assert CheckpointJournal(path, run, resume=True).get("stage/resources") == {"model": {}}
+
+
+def test_without_resume_the_journal_starts_over(tmp_path):
+    path = str(tmp_path / "webern.jsonl")
+    failedRun(path)
+    journal = CheckpointJournal(path, run)
+    assert journal.get("resourcetype/1") is None
+    journal.close()
+    assert CheckpointJournal(path, run, resume=True).get("resourcetype/1") is None
+
+
+def test_journal_of_another_run_is_ignored(tmp_path):
+    path = str(tmp_path / "webern.jsonl")
+    failedRun(path)
+    otherServer = dict(run, server="http://localhost:8000")
+    assert CheckpointJournal(path, otherServer, resume=True).get("resourcetype/1") is None
+    otherOptions = dict(run, options={"listDir": "lists"})
+    assert CheckpointJournal(path, otherOptions, resume=True).get("resourcetype/1") is None
+
+
+def test_stale_journal_is_ignored(tmp_path):
+    path = tmp_path / "webern.jsonl"
+    failedRun(str(path))
+    lines = path.read_text().split("\n")
+    lines[0] = json.dumps({"run": run, "started": time.time() - 2 * 3600})
+    path.write_text("\n".join(lines))
+    assert CheckpointJournal(str(path), run, resume=True, maxAge=3600).get("resourcetype/1") is None
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    path = tmp_path / "webern.jsonl"
+    failedRun(str(path))
+    with open(path, "a") as f:
+        f.write('{"key": "resourcetype/2", "val')
+    journal = CheckpointJournal(str(path), run, resume=True)
+    assert journal.get("resourcetype/1") == {"name": "webern:piece"}
+    assert journal.get("resourcetype/2") is None
+
+
+def test_remove_and_disabled_journal(tmp_path):
+    path = tmp_path / "webern.jsonl"
+    failedRun(str(path))
+    CheckpointJournal(str(path), run, resume=True).remove()
+    assert not path.exists()
+    journal = CheckpointJournal(None, run)
+    journal.record("resourcetype/1", {})
+    assert journal.get("resourcetype/1") is None
+
+
+def test_resume_after_an_incomplete_line_keeps_the_new_records(tmp_path):
+    path = tmp_path / "webern.jsonl"
+    failedRun(str(path))
+    with open(path, "a") as f:
+        f.write('{"key": "resourcetype/2", "val')
+    journal = CheckpointJournal(str(path), run, resume=True)
+    journal.record("resourcetype/3", {"name": "webern:letter"})
+    journal.record("resourcetype/4", {"name": "webern:sketch"})
+    journal.close()
+    journal = CheckpointJournal(str(path), run, resume=True)
+    assert [journal.get(f"resourcetype/{number}") is not None for number in range(1, 5)] == [True, False, True, True]
+
+
+def test_unreadable_line_is_skipped(tmp_path):
+    path = tmp_path / "webern.jsonl"
+    failedRun(str(path))
+    with open(path, "a") as f:
+        f.write('{"key": "resourcetype/2"}\n')
+        f.write(json.dumps({"key": "resourcetype/3", "value": {}}) + "\n")
+    journal = CheckpointJournal(str(path), run, resume=True)
+    assert "resourcetype/1" in journal and "resourcetype/2" not in journal and "resourcetype/3" in journal
@@ -0,0 +1,29 @@
+import json
+import os
+
+from MockSalsahServer import FixtureBuilder, MockSalsahServer
+from SalsahDataExport import DataExporter, exportProject
+
+snapshotPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "webern_20210929.json")
+
+
+def test_interrupted_export_leaves_no_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(snapshotPath) as f:
+        builder = FixtureBuilder(json.load(f))
+    fixtures = builder.build()
+    server = MockSalsahServer(fixtures).start()
+    try:
+        project = next(project for project in fixtures["/api/projects"]["projects"] if project["id"] == builder.projectId)
+
+        def export(self, xmlFile):
+            xmlFile.write("<knora>\n")
+            raise ConnectionError("SALSAH went away")
+
+        monkeypatch.setattr(DataExporter, "export", export)
+        summary = exportProject(project, {"serverpath": server.url, "shortcodesUrl": server.url + "/shortcodes.csv"},
+                                {"retries": 0, "rateLimit": 0}, None, "20990101")
+    finally:
+        server.stop()
+    assert summary["error"] == "ConnectionError: SALSAH went away"
+    assert os.listdir(".") == []
@@ -0,0 +1,32 @@
+import json
+import os
+
+from DiffSnapshots import diffSnapshots, projectSnapshots, sortedSnapshots
+from SnapshotStore import SnapshotStore
+
+
+def model(resources: list) -> dict:
+    return {"project": {"shortname": "webern", "ontologies": [{"name": "webern", "resources": [{"name": name} for name in resources]}]}}
+
+
+def test_changelog_takes_only_the_snapshots_of_the_project(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("archive")
+    files = {
+        "archive/webern_20210901.json": model(["A"]),
+        "webern_20210902.json": model(["A", "B"]),
+        # run profile of --profile, and the snapshot of another project
+        "webern_20210902_profile.json": {"requests": {}},
+        "webern_x_20210903.json": model(["C"]),
+        "other_20210904.json": model(["D"])
+    }
+    for path, document in files.items():
+        with open(path, "w") as f:
+            json.dump(document, f)
+    store = SnapshotStore("store")
+    store.add("archive/webern_20210901.json")
+
+    paths = sortedSnapshots(projectSnapshots("webern", store))
+    assert [os.path.basename(path) for path in paths] == ["webern_20210901.json", "webern_20210902.json"]
+    assert diffSnapshots(*paths)["resources"]["added"] == ["webern:B"]
+    assert [os.path.basename(path) for path in projectSnapshots("other", store)] == ["other_20210904.json"]
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from MockSalsahServer import FixtureBuilder, MockSalsahServer
+from OntologyValidator import OntologyValidator
+from SalsahModelToJson import extractProject
+
+snapshotPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "webern_20210929.json")
+clientOptions = {"retries": 0, "rateLimit": 0}
+runOptions = {"validate": False, "store": None}
+# The lists part of the dsp-tools ontology schema
+listsSchema = {
+    "definitions": {
+        "langstring": {"type": "object", "patternProperties": {"^(en|de|fr|it)": {"type": "string"}}, "additionalProperties": False},
+        "node": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "labels": {"$ref": "#/definitions/langstring"},
+                "comments": {"$ref": "#/definitions/langstring"},
+                "nodes": {"type": "array", "items": {"$ref": "#/definitions/node"}}
+            },
+            "required": ["name", "labels"],
+            "additionalProperties": False
+        },
+        "excelfileref": {
+            "type": "object",
+            "properties": {"file": {"type": "string"}, "worksheet": {"type": "string"}, "startrow": {"type": "integer"}, "startcol": {"type": "integer"}},
+            "required": ["file", "worksheet"],
+            "additionalProperties": False
+        }
+    },
+    "type": "object",
+    "properties": {
+        "project": {
+            "type": "object",
+            "properties": {
+                "lists": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "labels": {"$ref": "#/definitions/langstring"},
+                            "comments": {"$ref": "#/definitions/langstring"},
+                            "nodes": {"oneOf": [{"type": "array", "items": {"$ref": "#/definitions/node"}},
+                                                {"$ref": "#/definitions/excelfileref"}]}
+                        },
+                        "required": ["name", "labels", "nodes"],
+                        "additionalProperties": False
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+@pytest.fixture
+def server():
+    with open(snapshotPath) as f:
+        builder = FixtureBuilder(json.load(f))
+    fixtures = builder.build()
+    server = MockSalsahServer(fixtures).start()
+    yield server, fixtures, next(project for project in fixtures["/api/projects"]["projects"] if project["id"] == builder.projectId)
+    server.stop()
+
+
+def extract(server, now: str, options: dict = None) -> dict:
+    server, _, project = server
+    converterOptions = {"serverpath": server.url, "shortcodesUrl": server.url + "/shortcodes.csv", "listDir": "lists"}
+    summary = extractProject(project, converterOptions, clientOptions, None, now, options or runOptions)
+    assert summary["error"] is None or options is not None, summary["error"]
+    return summary
+
+
+def listFiles() -> dict:
+    directory = os.path.join("lists", "webern")
+    return {name: open(os.path.join(directory, name), "rb").read() for name in sorted(os.listdir(directory))}
+
+
+def changeHlistNode(fixtures: dict):
+    hlist = next(response for path, response in fixtures.items() if path.startswith("/api/hlists/"))
+    hlist["hlist"][0]["label"] = [{"shortname": "en", "label": "changed"}]
+
+
+def test_manifest_holds_the_sha256_of_the_list_files(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    summary = extract(server, "20990101")
+    with open(summary["file"]) as f:
+        document = json.load(f)
+    files = listFiles()
+    assert files
+    assert sorted(os.path.basename(root["nodes"]["file"]) for root in document["project"]["lists"]) == list(files)
+    with open(os.path.join("lists", "webern.sha256.json")) as f:
+        assert json.load(f) == {name: hashlib.sha256(content).hexdigest() for name, content in files.items()}
+    assert not os.path.exists(os.path.join("lists", ".staging", "webern"))
+
+
+def test_list_references_pass_the_schema(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    summary = extract(server, "20990101", {"validate": True, "schema": listsSchema, "store": None})
+    assert summary["error"] is None, summary["error"]
+    with open(summary["file"]) as f:
+        document = json.load(f)
+    assert all(set(root["nodes"]) == {"file", "worksheet"} for root in document["project"]["lists"])
+    root = dict(document["project"]["lists"][0], nodes={"file": "lists/webern/a.json", "sha256": "0" * 64})
+    assert OntologyValidator(listsSchema).schemaProblems({"project": {"lists": [root]}})
+
+
+def test_unchanged_lists_are_not_rewritten(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    extract(server, "20990101")
+    mtimes = {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(os.path.join("lists", "webern"))}
+    summary = extract(server, "20990102")
+    assert summary["unchanged"] == "webern_20990101.json"
+    assert not os.path.exists("webern_20990102.json")
+    assert {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(os.path.join("lists", "webern"))} == mtimes
+    assert not os.path.exists(os.path.join("lists", ".staging", "webern"))
+
+
+def test_a_change_of_list_nodes_only_changes_the_model(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    extract(server, "20990101")
+    before = listFiles()
+    changeHlistNode(server[1])
+    summary = extract(server, "20990102")
+    assert summary["file"] == "webern_20990102.json"
+    after = listFiles()
+    assert [name for name in before if before[name] != after[name]] != []
+    assert b'"changed"' in b"".join(after.values())
+
+
+def test_lists_of_an_invalid_model_are_not_published(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    extract(server, "20990101")
+    before = listFiles()
+    changeHlistNode(server[1])
+    monkeypatch.setattr(OntologyValidator, "validate", lambda self, document: (["broken"], []))
+    summary = extract(server, "20990102", {"validate": True, "store": None})
+    assert summary["error"].startswith("OntologyValidationError")
+    assert listFiles() == before
+    assert not os.path.exists("webern_20990102.json")
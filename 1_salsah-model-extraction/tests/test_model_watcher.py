@@ -0,0 +1,37 @@
+import json
+import os
+
+from MockSalsahServer import FixtureBuilder, MockSalsahServer
+from SalsahClient import SalsahClient
+from SalsahModelToJson import Converter, ModelWatcher
+
+snapshotPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "webern_20210929.json")
+runOptions = {"validate": False, "store": None}
+
+
+def test_full_cycle_reloads_the_catalogs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(snapshotPath) as f:
+        snapshot = json.load(f)
+    responses = FixtureBuilder(snapshot).build()
+    server = MockSalsahServer(responses).start()
+    try:
+        project = [p for p in responses["/api/projects"]["projects"] if p["id"] == "6"][0]
+        # the vocabularies catalog is a local file, at first without the vocabularies of the project
+        catalog = tmp_path / "vocabularies.json"
+        catalog.write_text(json.dumps({"vocabularies": []}))
+        converter = Converter(SalsahClient(rateLimit=0), serverpath=server.url,
+                              shortcodesUrl=server.url + "/shortcodes.csv", vocabulariesUrl=str(catalog))
+        watcher = ModelWatcher(converter, project)
+        watcher.cycle("20990101", runOptions, full=True)
+        assert converter.vocabulariesOf(project) == []
+
+        catalog.write_text(json.dumps(responses["/api/vocabularies"]))
+        assert watcher.cycle("20990101", runOptions)["file"] is None
+        summary = watcher.cycle("20990101", runOptions, full=True)
+        assert summary["error"] is None and summary["file"] is not None
+        with open(summary["file"]) as f:
+            model = json.load(f)
+        assert [o["name"] for o in model["project"]["ontologies"]] == [o["name"] for o in snapshot["project"]["ontologies"]]
+    finally:
+        server.stop()
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from OntologyModel import Project
+from OntologyValidator import OntologyValidator
+
+snapshotPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "webern_20210929.json")
+schema = {
+    "definitions": {
+        "property": {"type": "object", "required": ["name", "object"], "properties": {"name": {"type": "string", "pattern": "^[a-z]"}}},
+        "ontology": {
+            "type": "object",
+            "properties": {
+                "properties": {"type": "array", "minItems": 1, "items": {"$ref": "#/definitions/property"}},
+                "resources": {"type": "array", "minItems": 1, "items": {"type": "object", "required": ["cardinalities"]}}
+            }
+        }
+    },
+    "type": "object",
+    "properties": {
+        "project": {
+            "type": "object",
+            "properties": {
+                "shortcode": {"type": "string", "pattern": "^[0-9A-F]{4}$"},
+                "ontologies": {"type": "array", "items": {"$ref": "#/definitions/ontology"}}
+            }
+        }
+    }
+}
+
+
+@pytest.fixture
+def model() -> Project:
+    with open(snapshotPath) as f:
+        model = Project.fromJson(json.load(f))
+    model.shortcode = "webern"
+    model.ontologies[0].properties[3].name = "Broken"
+    model.ontologies[0].resources[1].cardinalities[0].propname = ":missing"
+    return model
+
+
+def test_model_is_checked_element_by_element(model, monkeypatch):
+    expected = OntologyValidator(schema).validate(model.toJson())
+    assert 'project/ontologies/0/properties/3/name: \'Broken\' does not match \'^[a-z]\'' in expected[0]
+    assert "project/shortcode: 'webern' does not match '^[0-9A-F]{4}$'" in expected[0]
+    assert any(problem.endswith("cardinality: webern:missing does not exist") for problem in expected[0])
+    monkeypatch.setattr(Project, "toJson", lambda self: pytest.fail("the model is converted as a whole"))
+    assert OntologyValidator(schema).validate(model) == expected
+
+
+def test_array_constraints_are_checked(model):
+    model.ontologies[0].resources = []
+    errors, _ = OntologyValidator(schema).validate(model)
+    assert "project/ontologies/0/resources: [] should be non-empty" in errors
@@ -0,0 +1,80 @@
+import os
+import time
+
+from ResponseCache import ResponseCache, CachedResponse
+
+
+def response(url: str, text: str) -> CachedResponse:
+    return CachedResponse(url, text, 200, False)
+
+
+def directorySize(cache: ResponseCache) -> int:
+    return sum(entry.stat().st_size for entry in cache.entries())
+
+
+def test_store_and_load(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("http://server/api/hlists", {"vocabulary": "webern", "lang": "all"}, response("http://server/api/hlists", '{"hlists": []}'))
+    # the order of the parameters does not matter
+    cached = cache.load("http://server/api/hlists", {"lang": "all", "vocabulary": "webern"})
+    assert cached.json() == {"hlists": []}
+    assert cache.load("http://server/api/hlists", {"vocabulary": "other"}) is None
+
+
+def test_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.store("http://server/api/projects", None, response("http://server/api/projects", "{}"))
+    path = cache.path(cache.key("http://server/api/projects"))
+    old = time.time() - 120
+    with open(path) as f:
+        text = f.read().replace('"fetched": ', f'"fetched": {old}, "was": ', 1)
+    with open(path, "w") as f:
+        f.write(text)
+    assert cache.load("http://server/api/projects") is None
+    assert cache.load("http://server/api/projects", ignoreTtl=True).text == "{}"
+
+
+def test_overwritten_entries_are_counted_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for text in ("x" * 1000, "y" * 10, "z" * 500):
+        cache.store("http://server/api/projects", None, response("http://server/api/projects", text))
+    assert cache.size == directorySize(cache)
+    # a new instance counts the files on disk
+    assert ResponseCache(str(tmp_path)).size == cache.size
+
+
+def test_eviction_keeps_the_recently_used_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), maxSize=3000)
+    now = time.time()
+    for number in range(5):
+        cache.store(f"http://server/api/resourcetypes/{number}", None, response("url", "x" * 300))
+        # distinct access times within the ttl
+        os.utime(cache.path(cache.key(f"http://server/api/resourcetypes/{number}")), (now - 100 + number,) * 2)
+    cache.load("http://server/api/resourcetypes/0")
+    for number in range(5, 10):
+        cache.store(f"http://server/api/resourcetypes/{number}", None, response("url", "x" * 300))
+    assert cache.size <= cache.maxSize
+    assert cache.size == directorySize(cache)
+    assert cache.load("http://server/api/resourcetypes/0") is not None
+    assert cache.load("http://server/api/resourcetypes/1") is None
+
+
+def test_clear(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for number in range(3):
+        cache.store(f"http://server/{number}", None, response("url", "text"))
+    cache.clear()
+    assert cache.size == 0
+    assert list(cache.entries()) == []
+
+
+def test_eviction_in_batches(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), maxSize=10000)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+    for number in range(200):
+        cache.store(f"http://server/api/resources/{number}", None, response("url", "x" * 300))
+    assert cache.size <= cache.maxSize
+    # about 400 bytes per entry: one scan per 1000 bytes (10 % of maxSize) written, not one per entry
+    assert 0 < len(scans) <= 200 * 400 // 1000
@@ -0,0 +1,39 @@
+from RunProfile import RunProfile
+
+
+def test_percentile_nearest_rank():
+    assert RunProfile.percentile([1, 2], 50) == 1
+    assert RunProfile.percentile([1, 2], 90) == 2
+    assert RunProfile.percentile(list(range(1, 11)), 50) == 5
+    assert RunProfile.percentile(list(range(1, 11)), 90) == 9
+    assert RunProfile.percentile(list(range(1, 101)), 99) == 99
+    assert RunProfile.percentile(list(range(1, 101)), 100) == 100
+    assert RunProfile.percentile([7], 1) == 7
+
+
+def test_family():
+    assert RunProfile.family("https://www.salsah.org/api/resourcetypes/12?lang=all") == "resourcetypes"
+    assert RunProfile.family("https://www.salsah.org/api/hlists") == "hlists"
+    assert RunProfile.family("https://www.salsah.org/api/resources/1") == "other"
+
+
+def test_cache_hits_are_not_latencies():
+    profile = RunProfile()
+    profile.recordRequest("http://server/api/projects", 0.2, 100, False)
+    profile.recordRequest("http://server/api/projects", 0.001, 100, True)
+    report = profile.report()["requests"]["projects"]
+    assert report["calls"] == 2
+    assert report["cache_hits"] == 1
+    assert report["bytes"] == 200
+    assert report["latency_ms"]["total"] == report["latency_ms"]["p50"] == 200.0
+
+
+def test_report_of_families_without_completed_requests():
+    profile = RunProfile()
+    profile.recordRetry("http://server/files/1.jpg")
+    profile.recordRequest("http://server/api/vocabularies", 0.001, 10, True)
+    report = profile.report()
+    assert report["requests"]["other"]["retries"] == 1
+    assert report["requests"]["other"]["latency_ms"] is None
+    assert report["requests"]["vocabularies"]["latency_ms"] is None
+    assert report["totals"] == {"calls": 1, "cache_hits": 1, "retries": 1, "bytes": 10}
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from SnapshotStore import SnapshotStore, applyJsonDelta, jsonDelta
+
+
+def model(resources: list, extra: str = "") -> dict:
+    return {"project": {"shortname": "webern", "longname": "Webern" + extra,
+                        "ontologies": [{"name": "webern", "resources": [{"name": name, "labels": {"en": name}} for name in resources]}]}}
+
+
+def writeSnapshot(directory, name: str, document: dict, **fmt) -> bytes:
+    data = json.dumps(document, **fmt).encode("utf-8")
+    (directory / name).write_bytes(data)
+    return data
+
+
+def test_json_delta_round_trip():
+    old, new = model(["A", "B", "C"]), model(["A", "X", "C", "D"], " (new)")
+    assert applyJsonDelta(old, jsonDelta(old, new)) == new
+    assert jsonDelta(old, old) is None
+
+
+def test_keyframe_and_json_deltas(tmp_path):
+    store = SnapshotStore(str(tmp_path / "store"))
+    snapshots = {}
+    for day, resources in enumerate([["A"], ["A", "B"], ["B", "C"]], 1):
+        name = f"webern_2021090{day}.json"
+        snapshots[name] = writeSnapshot(tmp_path, name, model(resources), indent=4)
+        assert store.add(str(tmp_path / name))
+
+    assert [entry["keyframe"] for entry in store.versions("webern.json")] == [True, False, False]
+    assert all("format" in entry for entry in store.versions("webern.json"))
+    # a new store instance reconstructs every version from the files
+    store = SnapshotStore(str(tmp_path / "store"))
+    for name, data in snapshots.items():
+        assert store.get(name) == data
+
+
+def test_text_deltas_of_json_not_reproducible(tmp_path):
+    # indent=2 is none of the known formats: the snapshots are stored as text with text deltas
+    store = SnapshotStore(str(tmp_path / "store"))
+    snapshots = {}
+    for day, resources in enumerate([["A", "B"], ["A", "B", "C"], ["A", "C"]], 1):
+        name = f"webern_2021090{day}.json"
+        snapshots[name] = writeSnapshot(tmp_path, name, model(resources), indent=2)
+        store.add(str(tmp_path / name))
+
+    versions = store.versions("webern.json")
+    assert [entry["keyframe"] for entry in versions] == [True, False, False]
+    assert not any("format" in entry for entry in versions)
+    store = SnapshotStore(str(tmp_path / "store"))
+    for name, data in snapshots.items():
+        assert store.get(name) == data
+
+
+def test_mixed_formats(tmp_path):
+    store = SnapshotStore(str(tmp_path / "store"))
+    snapshots = {}
+    for day, (resources, fmt) in enumerate([(["A"], {"indent": 4}), (["A", "B"], {"indent": 2}), (["A", "B", "C"], {"indent": 2}),
+                                            (["C"], {"indent": 4}), (["C", "D"], {"indent": 4})], 1):
+        name = f"webern_2021090{day}.json"
+        snapshots[name] = writeSnapshot(tmp_path, name, model(resources), **fmt)
+        store.add(str(tmp_path / name))
+
+    # a change between JSON and text starts a keyframe
+    assert [entry["keyframe"] for entry in store.versions("webern.json")] == [True, True, False, True, False]
+    store = SnapshotStore(str(tmp_path / "store"))
+    for name in reversed(list(snapshots)):
+        assert store.get(name) == snapshots[name]
+    # sequential access reuses the last reconstructed version
+    for name, data in snapshots.items():
+        assert store.get(name) == data
+
+
+def test_svg_text_deltas(tmp_path):
+    store = SnapshotStore(str(tmp_path / "store"))
+    svgs = {}
+    for day, labels in enumerate([["a", "b", "c"], ["a", "b", "c", "d"]], 1):
+        name = f"webern_2021090{day}_plantuml.svg"
+        svgs[name] = ("<svg>" + "".join(f"<text>{label}</text>" for label in labels) + "</svg>").encode("utf-8")
+        (tmp_path / name).write_bytes(svgs[name])
+        store.add(str(tmp_path / name))
+
+    assert [entry["keyframe"] for entry in store.versions("webern_plantuml.svg")] == [True, False]
+    for name, data in svgs.items():
+        assert store.get(name) == data
+
+
+def test_add_rejects_changed_and_older_versions(tmp_path):
+    store = SnapshotStore(str(tmp_path / "store"))
+    writeSnapshot(tmp_path, "webern_20210902.json", model(["A"]), indent=4)
+    assert store.add(str(tmp_path / "webern_20210902.json"))
+    assert not store.add(str(tmp_path / "webern_20210902.json"))
+
+    writeSnapshot(tmp_path, "webern_20210902.json", model(["B"]), indent=4)
+    with pytest.raises(ValueError):
+        store.add(str(tmp_path / "webern_20210902.json"))
+    writeSnapshot(tmp_path, "webern_20210901.json", model(["A"]), indent=4)
+    with pytest.raises(ValueError):
+        store.add(str(tmp_path / "webern_20210901.json"))
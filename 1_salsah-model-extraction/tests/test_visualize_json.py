@@ -0,0 +1,51 @@
+import io
+import json
+import os
+
+from OntologyModel import Project, writeJson
+from VisualizeJson import diagramParts
+
+snapshotPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive", "webern_20210929.json")
+
+
+def parts(indent, **options) -> list:
+    with open(snapshotPath) as f:
+        text = io.StringIO()
+        writeJson(Project.fromJson(json.load(f)), text, indent)
+    text.seek(0)
+    return list(diagramParts(text, **options))
+
+
+def elements(text: str) -> list:
+    section = json.loads(text[len("@startjson\n"):-len("\n@endjson")])
+    return next(iter(section.values()))
+
+
+def test_compact_and_indented_models_give_the_same_parts():
+    assert parts(None, maxLines=300) == parts(4, maxLines=300)
+
+
+def test_long_sections_are_split():
+    with open(snapshotPath) as f:
+        document = json.load(f)
+    ontology = document["project"]["ontologies"][0]
+    split = dict(parts(4, maxLines=300))
+    for key in ("properties", "resources"):
+        names = sorted((name for name in split if name.startswith(f'{ontology["name"]}_{key}_')), key=lambda name: int(name.rsplit("_", 1)[1]))
+        assert len(names) > 1
+        assert [element for name in names for element in elements(split[name])] == ontology[key]
+        # the elements of a part have at most maxLines lines (plus the lines of @startjson and the section)
+        assert all(split[name].count("\n") <= 300 + 5 or len(elements(split[name])) == 1 for name in names)
+    whole = dict(parts(4, maxLines=100000))
+    assert elements(whole[f'{ontology["name"]}_properties']) == ontology["properties"]
+    assert elements(whole["lists"]) == document["project"]["lists"]
+    project = json.loads(whole["project"][len("@startjson\n"):-len("\n@endjson")])
+    assert project["project"]["ontologies"] == [{"name": ontology["name"], "label": ontology["label"]}]
+
+
+def test_a_part_per_resource():
+    with open(snapshotPath) as f:
+        ontology = json.load(f)["project"]["ontologies"][0]
+    names = [name for name, _ in parts(4, perResource=True)]
+    assert [name for name in names if name not in ("project", "lists") and not name.startswith(f'{ontology["name"]}_properties')] == \
+        [f'{ontology["name"]}_{resource["name"]}' for resource in ontology["resources"]]
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+
+import pytest
+
+from OntologyModel import JsonReader, ListNode, Project, jsonHash, writeJson
+from SalsahModelToJson import writeListNodes
+
+archive = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+
+
+@pytest.fixture(scope="module")
+def project() -> Project:
+    with open(os.path.join(archive, "webern_20210929.json")) as f:
+        return Project.fromJson(json.load(f))
+
+
+def written(value, indent) -> str:
+    text = io.StringIO()
+    writeJson(value, text, indent)
+    return text.getvalue()
+
+
+def test_indented_like_json_dumps(project):
+    assert written(project, 4) == json.dumps(project.toJson(), indent=4)
+    assert written(project, 2) == json.dumps(project.toJson(), indent=2)
+
+
+def test_compact_like_json_dumps(project):
+    assert written(project, None) == json.dumps(project.toJson(), separators=(",", ":"))
+
+
+def test_json_values_with_model_objects(project):
+    document = {"prefixes": {}, "project": project.ontologies[0], "lists": project.lists[:2], "empty": [], "none": None}
+    expected = {"prefixes": {}, "project": project.ontologies[0].toJson(), "lists": [lst.toJson() for lst in project.lists[:2]],
+                "empty": [], "none": None}
+    assert written(document, 4) == json.dumps(expected, indent=4)
+    assert written([], 4) == "[]"
+
+
+def test_list_files_like_json_dumps():
+    # SALSAH hlist nodes with children, written without building the list
+    children = [
+        {"id": "1", "name": "a", "label": "A", "children": [{"id": "2", "name": "b", "label": "B"}, {"id": "3", "name": "c", "label": "C", "children": []}]},
+        {"id": "4", "name": "d", "label": "D"}
+    ]
+
+    def nodeOf(node: dict):
+        return ListNode("H_" + node["id"], {"en": node["label"]}), node.get("children")
+
+    def tree(nodes: list) -> list:
+        result = []
+        for node in nodes:
+            listNode, nodeChildren = nodeOf(node)
+            if nodeChildren is not None:
+                listNode.nodes = tree(nodeChildren)
+            result.append(listNode)
+        return result
+
+    root = ListNode("list", {"en": "List"}, {"en": "comment"})
+    text = io.StringIO()
+    writeListNodes(text, root, children, nodeOf)
+    root.nodes = tree(children)
+    assert text.getvalue() == json.dumps(root.toJson(), indent=4)
+
+
+@pytest.mark.parametrize("indent", [4, None])
+def test_read_back_section_by_section(project, indent):
+    document = project.toJson()
+    # a small block size, so values are split across the blocks of the reader
+    reader = JsonReader(io.StringIO(written(project, indent)), blockSize=7)
+    read = {}
+    for key in reader.members():
+        if key != "project":
+            read[key] = reader.value()
+            continue
+        read["project"] = {}
+        for projectKey in reader.members():
+            if projectKey == "lists":
+                read["project"]["lists"] = [reader.value() for _ in reader.elements()]
+            else:
+                read["project"][projectKey] = reader.value()
+    assert read == document
+    assert JsonReader(io.StringIO(written(project, indent)), blockSize=7).hash() == jsonHash(project) == jsonHash(document)
+
+
+def test_read_values():
+    text = '[1, -2.5e3, "\\u00e9", true, null, {}, [], {"a": [0]}]'
+    for blockSize in (1, 2, 64):
+        assert JsonReader(io.StringIO(text), blockSize).value() == json.loads(text)
+        assert JsonReader(io.StringIO(text), blockSize).hash() == jsonHash(json.loads(text))
+    with pytest.raises(ValueError):
+        JsonReader(io.StringIO('[1, 2'), 2).hash()